@@ -1,310 +1,905 @@
+import math
 import os
-import random
-import glob
-import mutagen
-from mutagen.mp3 import MP3
-import pygame
+import queue
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from app.cache import MetadataCache
+from app.duplicates import DuplicateFinder
+from app.indexer import BulkIndexer
+from app.library import SORT_ORDERS, Library
+from app.mp3info import FileSlice, Unusual, seek_offset
+from app.notify import Notifier, choose_backend
+from app.playlists import PlaylistStore
+from app.search import SearchIndex
+from app.scanner import LibraryScanner
+from app.session import SAVED_HISTORY, Session
+from app.shuffle import History, Shuffler
+from app.watcher import LibraryWatcher
+
+# Imported by load_pygame(), it takes longer than the rest of startup
+pygame = None
+
+def load_pygame():
+    global pygame
+    import pygame
+    return pygame
 
 class MP3Player:
-    def __init__(self, music_dir):
+    def __init__(self, music_dir, scan_batch=500, scan_delay=0.0, wakeup=None):
         self.music_dir = music_dir
-        self.songs = []
+        self.wakeup = wakeup
+        self.scan_batch = scan_batch
+        self.scan_delay = scan_delay
+        self.library = Library()
         self.queue = []
-        self.current_song_index = 0
-        self.queue_index = 0
+        self.history = History()
+        self.shuffler = None
+        self.shuffle_spread = int(os.environ.get("PYTERMUSIC_SHUFFLE_SPREAD", 3))
+        self.current_id = None
+        # When the current song's file is deleted, the track that came after it
+        self.gone_before = None
+        self.prefetched = None
+        self.prefetching = None
+        self.prefetch_results = queue.Queue()
         self.is_playing = False
         self.paused = False
+        self.cache = MetadataCache()
+        self.notifier = Notifier(choose_backend())
+        self.notifier.start()
+        self.watcher = None
+        self.indexer = None
+        self.analyzer = None
+        self.normalize = os.environ.get("PYTERMUSIC_NORMALIZE", "1") != "0"
+        self.gain = None
+        self.analysis_stale = False
+        self.finder = None
+        self.duplicates = None
+        self.hiding_duplicates = os.environ.get("PYTERMUSIC_HIDE_DUPLICATES", "0") == "1"
+        self.duplicates_stale = False
         self.scan_songs()
-        pygame.mixer.init()
-        self.record_frames = self.create_record_frames()
-        self.current_frame = 0
+        # The mixer starts with the first song, pygame loads in the meantime
+        self.mixer_started = False
+        self.mixer_startup = None
+        self.music = None
+        self.crossfade = float(os.environ.get("PYTERMUSIC_CROSSFADE", 0))
+        self.pygame_loaded = threading.Event()
+        threading.Thread(target=self.preload, daemon=True).start()
         self.song_position = 0
         self.song_length = 0
+        self.started_from = 0.0
+        self.started_at = None
+        self.seek_index = None
         self.volume = 0.5
-        pygame.mixer.music.set_volume(self.volume)
         self.current_volume = str(int(self.volume * 100))
+        self.playlists = PlaylistStore(music_dir)
+        self.cursor_id = None
+        self.resume_at = None
+        self.session = Session()
+        self.resuming = None
+        self.restore_session(self.session.load())
         
     def scan_songs(self):
-        """Scan the music directory for MP3 files"""
-        self.songs = glob.glob(os.path.join(self.music_dir, "**/*.mp3"))
-        self.songs.sort()
+        """Start scanning the music directory for MP3 files in the background"""
+        self.library = Library()
+        self.search = SearchIndex(self.library, self.cache, self.music_dir)
+        self.scanner = LibraryScanner(self.music_dir, self.cache, self.scan_batch,
+                                      self.scan_delay, self.wakeup)
+        self.scanner.start()
+
+    def poll_scan(self):
+        """Add songs found by the scanner since the last call"""
+        found = self.scanner.get_batches()
+        for path in found:
+            self.library.add(path)
+        self.resume_session()
+        if self.current_id is None and self.gone_before is None and len(self.library):
+            self.current_id = self.library.id_at(0)
+        if found and self.search.ready.is_set():
+            self.search.build()
+
+        # Watch for changes once the whole tree is known
+        if self.watcher is None and not self.scanner.scanning:
+            self.watcher = LibraryWatcher(self.scanner.dirs, self.cache, notify=self.wakeup)
+            self.watcher.start()
+            self.analysis_stale = True
+            self.duplicates_stale = True
+        return bool(found)
+
+    def restore_session(self, saved):
+        """Apply what a saved session sets without the library, the rest waits for the scan"""
+        volume = saved.get("volume")
+        if isinstance(volume, (int, float)) and 0.0 < volume <= 1.0:
+            self.volume = volume
+            self.current_volume = str(int(self.volume * 100))
+        if saved.get("shuffle"):
+            self.shuffle()
+        saved["queue"] = deque(saved.get("queue") or ())
+        self.resuming = saved
+
+    def resume_session(self):
+        """Put the last session's tracks back as the scan finds them
+
+        The current song, list cursor and queue each wait for their paths to
+        turn up. The queue keeps its order, so it stops at the first path not
+        found yet. Once the scan is done, whatever it didn't find is dropped,
+        and the play history and sort order, which need every track, go back.
+        """
+        saved = self.resuming
+        if saved is None:
+            return
+        library = self.library
+        path = saved.get("current")
+        if path is not None and (self.is_playing or self.paused):
+            # Something else was started in the meantime
+            saved["current"] = None
+        elif path is not None:
+            track_id = library.id_for(path)
+            if track_id is not None:
+                self.current_id = track_id
+                self.resume_at = (track_id, saved.get("position") or 0.0)
+                saved["current"] = None
+        path = saved.get("cursor")
+        if path is not None:
+            track_id = library.id_for(path)
+            if track_id is not None:
+                self.cursor_id = track_id
+                saved["cursor"] = None
+        pending = saved["queue"]
+        while pending:
+            track_id = library.id_for(pending[0])
+            if track_id is None:
+                break
+            self.queue.append(track_id)
+            pending.popleft()
+        if self.scanner.scanning:
+            return
+
+        for path in pending:
+            track_id = library.id_for(path)
+            if track_id is not None:
+                self.queue.append(track_id)
+        history = [library.id_for(path) for path in saved.get("history") or ()]
+        self.history.restore([track_id for track_id in history if track_id is not None])
+        if saved.get("sort") in SORT_ORDERS and library.sorted_by is None:
+            self.sort(saved["sort"])
+        self.resuming = None
+
+    def session_state(self):
+        """What to pick up from next time, with tracks by path"""
+        path = self.library.path
+        saved = self.resuming or {}
+        current = path(self.current_id) if self.current_id is not None else None
+        position = 0.0
+        if self.started_at is not None:
+            position = self.started_from + time.monotonic() - self.started_at
+        elif self.paused:
+            position = self.song_position
+        elif self.resume_at is not None:
+            position = self.resume_at[1]
+        if saved.get("current") is not None:
+            current = saved["current"]
+            position = saved.get("position") or 0.0
+        history = list(saved.get("history") or ())
+        history += [path(track_id) for track_id in self.history.recent(SAVED_HISTORY)]
+        cursor = path(self.cursor_id) if self.cursor_id is not None else None
+        return {
+            "version": 1,
+            "current": current,
+            "position": round(position, 1),
+            "volume": round(self.volume, 2),
+            "shuffle": self.shuffling,
+            "sort": self.library.sorted_by or saved.get("sort"),
+            "queue": [path(track_id) for track_id in self.queue] + list(saved.get("queue") or ()),
+            "history": [track for track in history if track is not None][-SAVED_HISTORY:],
+            "cursor": saved.get("cursor") or cursor,
+        }
+
+    def save_session(self):
+        """Write the session out if it changed since the last save"""
+        try:
+            return self.session.save(self.session_state())
+        except OSError:
+            return False
+
+    def save_playlist(self, name):
+        """Store the queue as a named playlist"""
+        if not self.queue:
+            raise ValueError("the queue is empty")
+        self.playlists.save(name, [self.library.path(track_id) for track_id in self.queue])
+
+    def load_playlist(self, name):
+        """Replace the queue with a playlist, returning how many of its tracks are missing"""
+        entries = self.playlists.load(name)
+        id_in = self.library.id_in
+        found = [id_in(directory, file_name) for directory, file_name in entries]
+        self.queue = [track_id for track_id in found if track_id is not None]
+        return len(entries) - len(self.queue)
+
+    def export_playlist(self, name, path):
+        """Write a playlist out as an M3U file, with durations and titles where known"""
+        def describe(track):
+            track_id = self.library.id_for(track)
+            if track_id is None:
+                return None
+            tags = self.get_tags(track_id)
+            title = self.get_song_title(track_id)
+            return tags.duration, f"{tags.artist} - {title}" if tags.artist else title
+        return self.playlists.export_m3u(name, path, describe)
+
+    def poll_changes(self):
+        """Apply file changes seen by the watcher
+
+        Returns a function mapping old list positions to new ones, or None if
+        nothing changed. Track IDs are unaffected, renamed files keep theirs.
+        """
+        if self.watcher is None:
+            return None
+        changes = self.watcher.get_changes()
+        if not changes:
+            return None
+
+        stale = []
+        # Directory changes come first, the other paths are the ones after them
+        gone = []
+        for old, new in changes.dirs:
+            if new is None:
+                for track_id in self.library.ids_under(old):
+                    # Out of the way of a directory moved in under its name
+                    path = self.library.path(track_id)
+                    self.cache.invalidate(path)
+                    self.library.unlink(path)
+                    gone.append(track_id)
+                continue
+            for track_id in self.library.ids_under(old):
+                path = self.library.path(track_id)
+                self.cache.invalidate(path)
+                self.library.rename(path, new + path[len(old):])
+                stale.append(track_id)
+
+        for path in changes.modified:
+            self.cache.invalidate(path)
+            track_id = self.library.id_for(path)
+            if track_id is not None:
+                self.library.forget_tags(track_id)
+                stale.append(track_id)
+
+        for old, new in changes.renamed.items():
+            self.cache.invalidate(old)
+            track_id = self.library.rename(old, new)
+            if track_id is None:
+                changes.added.add(new)
+            else:
+                stale.append(track_id)
+
+        stale.extend(gone)
+        for path in changes.removed:
+            self.cache.invalidate(path)
+            track_id = self.library.id_for(path)
+            if track_id is not None:
+                stale.append(track_id)
+        current = self.current_position
+        removed = self.library.remove(changes.removed, gone)
+
+        for path in sorted(changes.added):
+            self.library.add(path)
+        for track_id in stale:
+            self.search.refresh(track_id)
+        self.search.reset()
+        self.analysis_stale = True
+        self.duplicates_stale = True
+
+        if removed:
+            live = self.library.position
+            self.queue = [track_id for track_id in self.queue if live(track_id) is not None]
+            if self.current_id is not None and live(self.current_id) is None:
+                # Keep playing the deleted file, but no other song is current,
+                # the next one is the one that came after it
+                position = current - bisect_left(removed, current)
+                self.gone_before = (self.library.id_at(position % len(self.library))
+                                    if len(self.library) else None)
+                self.current_id = None
+        return Library.remapper(removed, len(self.library))
+
+    def index_tags(self, workers=None):
+        """Read every track's tags in a process pool, once the scan is done"""
+        if self.scanning or self.indexing:
+            return False
+        paths = list(self.library.paths())
+        self.indexer = BulkIndexer(paths, self.cache, workers, notify=self.wakeup)
+        self.indexer.start()
+        return True
+
+    def poll_index(self):
+        """Rebuild the search index with the new tags once indexing finishes"""
+        if self.indexer is None or self.indexer.running:
+            return False
+        self.indexer = None
+        rebuild = self.search.ready.is_set()
+        self.search = SearchIndex(self.library, self.cache, self.music_dir)
+        if rebuild:
+            self.search.build()
+        return True
+
+    def analyze_loudness(self, workers=1):
+        """Work out the gain of new and changed tracks in the background
+
+        One worker process by default, it runs alongside playback.
+        """
+        if not self.normalize or self.scanning or self.analyzing:
+            return False
+        from app.loudness import LoudnessAnalyzer, numpy
+        if numpy is None:
+            return False
+        self.analysis_stale = False
+        paths = list(self.library.paths())
+        self.analyzer = LoudnessAnalyzer(paths, self.cache, workers, notify=self.wakeup)
+        self.analyzer.start()
+        return True
+
+    def poll_analysis(self):
+        """Pick up the current song's gain once it's known, and analyse new files"""
+        # Importing the analyser waits on pygame, so not before it has loaded
+        if self.analysis_stale and self.pygame_loaded.is_set():
+            self.analyze_loudness()
+        if self.analyzer is not None and not self.analyzer.running:
+            self.analyzer = None
+        if self.gain is None and self.current_id is not None and (self.is_playing or self.paused):
+            self.apply_gain(self.current_id)
+
+    def find_duplicates(self, workers=None):
+        """Look for tracks with the same audio in the background, once the scan is done"""
+        if self.scanning or self.finding_duplicates:
+            return False
+        self.duplicates_stale = False
+        paths = list(self.library.paths())
+        self.finder = DuplicateFinder(paths, self.cache, workers, notify=self.wakeup)
+        self.finder.start()
+        return True
+
+    def poll_duplicates(self):
+        """Pick up the duplicates found, and look again after files change while hiding them"""
+        if self.duplicates_stale and self.hiding_duplicates:
+            self.find_duplicates()
+        if self.finder is None or self.finder.running:
+            return False
+        groups = []
+        for paths in self.finder.duplicates():
+            ids = [self.library.id_for(path) for path in paths]
+            ids = [track_id for track_id in ids if track_id is not None]
+            if len(ids) > 1:
+                groups.append(ids)
+        self.finder = None
+        self.duplicates = groups
+        self.apply_hidden()
+        return True
+
+    def hide_duplicates(self):
+        """Turn hiding the extra copies of duplicate tracks on or off"""
+        self.hiding_duplicates = not self.hiding_duplicates
+        if self.hiding_duplicates and self.duplicates is None:
+            self.find_duplicates()
+        self.apply_hidden()
+
+    def apply_hidden(self):
+        """Hide all but one copy of each duplicate, the playing one or the first by path"""
+        hidden = []
+        if self.hiding_duplicates:
+            for group in self.duplicates or ():
+                keep = self.current_id if self.current_id in group else group[0]
+                hidden.extend(track_id for track_id in group if track_id != keep)
+        if self.library.set_hidden(hidden):
+            self.search.reset()
+
+    @property
+    def finding_duplicates(self):
+        return self.finder is not None and self.finder.running
+
+    @property
+    def analyzing(self):
+        return self.analyzer is not None and self.analyzer.running
+
+    @property
+    def indexing(self):
+        return self.indexer is not None and self.indexer.running
+
+    @property
+    def scanning(self):
+        return self.scanner.scanning
+
+    @property
+    def current_position(self):
+        """Position of the current song in the song list"""
+        if self.current_id is None:
+            return None
+        return self.library.position(self.current_id)
+
+    def gone_position(self):
+        """Position of the track after the deleted current song, or None"""
+        if self.current_id is not None or self.gone_before is None:
+            return None
+        return self.library.position(self.gone_before)
 
     def shuffle(self):
-        """Shuffle song list"""
-        random.shuffle(self.songs)
-        pygame.mixer.music.load(self.songs[self.current_song_index])
-        pygame.mixer.music.play()
-        self.song_length = MP3(self.songs[self.current_song_index]).info.length
-        self.is_playing = True
-        if self.is_playing:
-            self.song_position = pygame.mixer.music.get_pos() / 1000
+        """Turn shuffle on or off, leaving the song list and playback alone"""
+        if self.shuffler is None:
+            self.shuffler = Shuffler(self.library, self.current_id, self.shuffle_weight)
+        else:
+            self.shuffler = None
+
+    @property
+    def shuffling(self):
+        return self.shuffler is not None
+
+    def shuffle_weight(self, track_id):
+        """Pass over artists heard in the last shuffle_spread songs"""
+        if not self.shuffle_spread or not self.get_tags(track_id).artist:
+            return 1.0
+        library = self.library
+        artist = library.name_keys[library.artists[track_id]]
+        for recent in self.history.recent(self.shuffle_spread):
+            if library.position(recent) is not None:
+                self.get_tags(recent)
+                if library.name_keys[library.artists[recent]] == artist:
+                    return 0.0
+        return 1.0
             
-    def addsong(self, song_index):
+    def addsong(self, track_id):
         """Add selected song to queue"""
-        if 0 <= song_index < len(self.songs):
-            self.queue.append(song_index)
+        if self.library.position(track_id) is not None:
+            self.queue.append(track_id)
             return True
         return False
 
-    def sort(self):
-        """Sort song list window"""
-        self.songs.sort()
+    def remove_from_queue(self, index):
+        if 0 <= index < len(self.queue):
+            self.queue.pop(index)
+
+    def clear_queue(self):
+        self.queue.clear()
+
+    def sort(self, by=None):
+        """Sort the song list by one of SORT_ORDERS, or the one after the current order"""
+        if by is None:
+            current = self.library.sorted_by
+            by = SORT_ORDERS[(SORT_ORDERS.index(current) + 1) % len(SORT_ORDERS)
+                             if current in SORT_ORDERS else 0]
+        if by not in SORT_ORDERS:
+            raise ValueError(f"unknown sort order {by}")
+        if by != "path":
+            self.load_all_tags()
+        self.library.sort(by)
+
+    def load_all_tags(self):
+        """Fill in every track's tag columns, for sorting by them"""
+        for track_id in self.library.order:
+            if not self.library.has_tags(track_id):
+                self.get_tags(track_id)
+
+    def play_track(self, track_id):
+        """Play a song from the list, rather than resuming the current one"""
+        if self.library.path(track_id) is None:
+            return
+        self.stop()
+        self.current_id = track_id
+        self.play()
 
     def play(self):
         """Start playing the current song"""
-        if not self.songs:
+        # A deleted song can still be unpaused
+        if self.current_id is None and not self.paused:
             return
         
         # Unpause function
         if self.paused:
-            pygame.mixer.music.unpause()
+            self.music.unpause()
             self.paused = False
             self.is_playing = True
+            self.started_at = time.monotonic()
         else:
-            pygame.mixer.music.load(self.songs[self.current_song_index])
-
-            # Only pass is song has mp3 tags
+            self.gone_before = None
+            self.start_mixer()
+            # The file may have been deleted since the last scan
             try:
-                # Grab song info for notification daemon
-                self.songtitle = mutagen.File(self.songs[self.current_song_index], easy=True)
-                self.songartist = str(self.songtitle["artist"])[2:-2]
-                self.songtitle = str(self.songtitle["title"])[2:-2]
-                os.system(f'notify-send "󰎇 Now Playing:" "{self.songtitle} \n by {self.songartist}" -t 2000')
-            except KeyError:
-                pass
+                self.music.load(self.library.path(self.current_id))
+            except (pygame.error, TypeError):
+                self.is_playing = False
+                return
+
+            tags = self.get_tags(self.current_id)
+            self.announce(tags)
+            self.apply_gain(self.current_id)
 
             # Play song
-            pygame.mixer.music.play()
-            self.song_length = MP3(self.songs[self.current_song_index]).info.length
+            self.music.play()
+            self.anchor(0.0)
+            self.song_length = tags.duration
+            self.history.played(self.current_id)
+            self.load_seek_index(self.current_id)
+
+            # load() dropped anything queued in the mixer
+            self.prefetched = None
+            self.prefetching = None
                 
             self.is_playing = True
+
+            # Pick up where the last session left off
+            resume, self.resume_at = self.resume_at, None
+            if resume is not None and resume[0] == self.current_id and resume[1] > 0:
+                self.seek(resume[1])
+
+    def announce(self, tags):
+        """Send a now playing notification"""
+        # Only notify if song has mp3 tags
+        if tags.title and tags.artist:
+            self.notifier.notify("󰎇 Now Playing:", f"{tags.title} \n by {tags.artist}")
         
     def pause(self):
         """Pause the current song"""
         if self.is_playing and not self.paused:
-            pygame.mixer.music.pause()
+            self.music.pause()
+            self.started_from += time.monotonic() - self.started_at
+            self.song_position = self.started_from
+            self.started_at = None
             self.paused = True
             self.is_playing = False
-        elif self.paused:
+        elif self.paused or self.resume_at is not None:
             self.play()
             
     def stop(self):
         """Stop the current song"""
-        pygame.mixer.music.stop()
+        if self.mixer_started:
+            self.music.stop()
+            if self.end_events:
+                pygame.event.clear(self.track_end)
+        self.prefetched = None
+        self.prefetching = None
+        self.started_at = None
         self.is_playing = False
         self.paused = False
         
     def next_song(self):
         """Play the next song"""
-        if not self.songs:
+        if not len(self.library):
             return
         self.stop()
-        if self.queue:
-            self.current_song_index = self.queue.pop(0)
-        else:
-            self.current_song_index = (self.current_song_index + 1) % len(self.songs)
+        self.current_id = self.take_upcoming()
         self.play()
         
     def prev_song(self):
-        """Play the previous song"""
-        if not self.songs:
+        """Play the song that played before this one
+
+        Walks back through the history. Past its start, the song above in
+        the list, unless shuffling.
+        """
+        if not len(self.library):
             return
-            
+        track_id = self.history.previous()
+        while track_id is not None and self.library.position(track_id) is None:
+            track_id = self.history.previous()
+        if track_id is None:
+            if self.shuffling:
+                return
+            gone = self.gone_position()
+            position = (self.current_position or 0) - 1 if gone is None else gone - 1
+            track_id = self.library.id_at(position % len(self.library))
         self.stop()
-        self.current_song_index = (self.current_song_index - 1) % len(self.songs)
+        self.current_id = track_id
         self.play()
         
+    def get_tags(self, track_id):
+        """Get tags for a track, loading them from the cache on first use"""
+        if not self.library.has_tags(track_id):
+            tags = self.cache.get(self.library.path(track_id))
+            self.store_tags(track_id, tags)
+            return tags
+        return self.library.tags(track_id)
+
+    def store_tags(self, track_id, tags):
+        """Put a track's tags in the library, with its file's mtime as the date added"""
+        self.library.set_tags(track_id, tags, self.cache.mtime(self.library.path(track_id)) or 0)
+        # Tracks indexed before their tags were cached are searchable by them now
+        self.search.refresh(track_id)
+
+    def get_song_title(self, track_id):
+        """Get a song's title, falling back to its filename if untagged"""
+        title = self.get_tags(track_id).title
+        if title:
+            return title
+        return os.path.splitext(os.path.basename(self.library.path(track_id)))[0]
+
     def get_current_song_info(self):
-        """Get the current song filename"""
-        if not self.songs:
-            return "No songs available"
-            
-        self.songtitle = mutagen.File(self.songs[self.current_song_index], easy=True)
-        
-        return self.songtitle
-    
-    def get_default_current_song_info(self):
-        """Get current song info if there are no tags"""
-        self.songtitle = os.path.basename(self.songs[self.current_song_index])
-        self.songtitle = self.songtitle.strip(".mp3")
-        
-        return self.songtitle
+        """Get the current song's tags"""
+        if self.current_id is None:
+            return None
+
+        return self.get_tags(self.current_id)
+
+    def preload(self):
+        """Loader thread: import pygame, NumPy with it, ahead of the first song"""
+        load_pygame()
+        self.pygame_loaded.set()
+        if self.wakeup is not None:
+            self.wakeup()
+
+    def start_mixer(self):
+        """Open the audio device, the first time a song plays"""
+        if self.mixer_started:
+            return
+        start = time.perf_counter()
+        load_pygame()
+        pygame.mixer.init()
+        self.end_events = self.init_end_event()
+        self.music = self.create_output()
+        self.mixer_started = True
+        self.apply_volume()
+        self.mixer_startup = time.perf_counter() - start
+
+    def init_end_event(self):
+        """Ask the mixer to post track_end, needs the (dummy) video system"""
+        # Posted by the mixer when a song finishes
+        self.track_end = pygame.USEREVENT + 1
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        try:
+            pygame.display.init()
+        except pygame.error:
+            return False
+        pygame.mixer.music.set_endevent(self.track_end)
+        return True
+
+    def create_output(self):
+        """pygame's music stream, or a Crossfader standing in for it
+
+        Crossfading needs NumPy, and the end event to follow the songs it
+        moves on to.
+        """
+        if self.crossfade > 0 and self.end_events:
+            from app.crossfade import Crossfader, numpy
+            if numpy is not None:
+                crossfader = Crossfader(self.crossfade, self.cache, self.track_end, self.wakeup)
+                crossfader.start()
+                return crossfader
+        return pygame.mixer.music
+
+    @property
+    def crossfading(self):
+        return self.music is not None and self.music is not pygame.mixer.music
+
+    def time_remaining(self):
+        """Seconds left in the current song"""
+        return max(0.0, self.song_length - self.song_position)
 
-        
     def update_position(self):
         """Update the current song position"""
         if self.is_playing:
-            self.song_position = pygame.mixer.music.get_pos() / 1000
-            
-            # Check if song ended
-            if not pygame.mixer.music.get_busy() and self.is_playing:
+            # The mixer moves on to a prefetched song by itself
+            if self.end_events and pygame.event.get(self.track_end):
+                if self.music.get_busy():
+                    self.advance()
+                else:
+                    self.next_song()
+            elif not self.end_events and not self.music.get_busy():
                 self.next_song()
 
-    def get_volume(self):
-        return self.current_volume
+            self.prefetch()
+        if self.started_at is not None:
+            self.song_position = self.started_from + time.monotonic() - self.started_at
+
+    def anchor(self, position):
+        """Restart the position clock, the mixer's own only counts from play()"""
+        self.started_from = position
+        self.started_at = time.monotonic()
+        self.song_position = position
+
+    def upcoming(self):
+        """The song that plays after the current one
+
+        The queue comes first, then the way forward after stepping back with
+        b, then the shuffle or the song list.
+        """
+        if self.queue:
+            return self.queue[0]
+        if not len(self.library):
+            return None
+        following = self.history.following()
+        while following is not None and self.library.position(following) is None:
+            # Deleted since it played
+            self.history.forward()
+            following = self.history.following()
+        if following is not None:
+            return following
+        if self.shuffler is not None:
+            return self.shuffler.peek()
+        gone = self.gone_position()
+        if gone is not None:
+            return self.library.id_at(gone)
+        position = (self.current_position or 0) + 1
+        return self.library.id_at(position % len(self.library))
+
+    def take_upcoming(self):
+        """upcoming(), taken off the queue, history or shuffle it came from"""
+        track_id = self.upcoming()
+        if self.queue:
+            self.queue.pop(0)
+        elif self.history.following() is not None:
+            self.history.forward()
+        elif self.shuffler is not None:
+            self.shuffler.take()
+        return track_id
+
+    def prefetch(self):
+        """Hand the upcoming song to the mixer ahead of time for gapless playback
+
+        Its tags are read and the file warmed up on a worker thread, then the
+        main thread queues it with pygame. If the queue or song order changes
+        the upcoming song is worked out again and replaces the old one.
+        """
+        if not self.end_events:
+            return
+        while True:
+            try:
+                track_id, tags = self.prefetch_results.get_nowait()
+            except queue.Empty:
+                break
+            if track_id == self.prefetching and track_id == self.upcoming():
+                try:
+                    self.music.queue(self.library.path(track_id))
+                except (pygame.error, TypeError):
+                    continue
+                self.store_tags(track_id, tags)
+                self.prefetched = track_id
+
+        track_id = self.upcoming()
+        if track_id is None or track_id in (self.prefetched, self.prefetching):
+            return
+        self.prefetched = None
+        self.prefetching = track_id
+        path = self.library.path(track_id)
+        threading.Thread(target=self.read_ahead, args=(track_id, path), daemon=True).start()
+
+    def read_ahead(self, track_id, path):
+        """Worker thread: read a song's tags and first blocks before it's needed"""
+        tags = self.cache.get(path)
+        try:
+            with open(path, "rb") as f:
+                f.read(256 * 1024)
+        except OSError:
+            pass
+        self.prefetch_results.put((track_id, tags))
+        if self.wakeup is not None:
+            self.wakeup()
+
+    def advance(self):
+        """Catch up after the mixer started the queued song"""
+        track_id = self.prefetched
+        self.prefetched = None
+        self.prefetching = None
+        if track_id is None or track_id != self.upcoming():
+            # Whatever the mixer queued is stale, switch to the right song
+            self.next_song()
+            return
+        self.take_upcoming()
+        self.current_id = track_id
+        self.gone_before = None
+        self.apply_gain(track_id)
+        self.anchor(0.0)
+        tags = self.get_tags(track_id)
+        self.song_length = tags.duration
+        self.history.played(track_id)
+        self.announce(tags)
+        self.load_seek_index(track_id)
+
+    def load_seek_index(self, track_id):
+        """Have the seek index of a song that just started ready on a worker thread"""
+        self.seek_index = None
+        path = self.library.path(track_id)
+
+        def load():
+            index = self.cache.get_seek_index(path)
+            if self.current_id == track_id:
+                self.seek_index = (track_id, index)
+
+        threading.Thread(target=load, daemon=True).start()
+
+    def seek(self, seconds):
+        """Jump to a time in the current song, starting from the frame holding it"""
+        if not (self.is_playing or self.paused) or self.current_id is None:
+            return
+        seconds = max(0.0, seconds)
+        if self.song_length > 0:
+            seconds = min(seconds, self.song_length)
+        path = self.library.path(self.current_id)
+        if self.seek_index is not None and self.seek_index[0] == self.current_id:
+            index = self.seek_index[1]
+        else:
+            index = self.cache.get_seek_index(path)
+
+        try:
+            if index is not None and not self.crossfading:
+                # Hand the mixer the file from that frame on, it never has
+                # to decode or scan its way there
+                offset, seconds = seek_offset(path, index, seconds)
+                self.music.load(FileSlice(path, offset), "mp3")
+                self.music.play()
+            else:
+                self.music.load(path)
+                self.music.play(start=seconds)
+        except (pygame.error, OSError, TypeError, Unusual):
+            return
+        if self.end_events:
+            pygame.event.clear(self.track_end)
+        if self.paused:
+            self.music.pause()
+
+        # load() dropped anything queued in the mixer
+        self.prefetched = None
+        self.prefetching = None
+        self.anchor(seconds)
+        if self.paused:
+            self.started_at = None
+
+    def seek_by(self, seconds):
+        """Jump forwards or, with a negative number, backwards"""
+        self.update_position()
+        self.seek(self.song_position + seconds)
+
+    def seek_percent(self, percent):
+        """Jump to a percentage of the way through the current song"""
+        self.seek(self.song_length * percent / 100)
+
+    def apply_gain(self, track_id):
+        """Turn a song up or down to the reference loudness, if it's been analysed"""
+        self.gain = None
+        if self.normalize:
+            self.gain = self.cache.get_loudness(self.library.path(track_id))
+        self.apply_volume()
+
+    def apply_volume(self):
+        """Set the mixer to the user's volume with the song's gain on top
+
+        The mixer can't go past full volume, so a quiet song is only
+        brought all the way up when the volume is below that.
+        """
+        if self.mixer_started:
+            from app.loudness import gain_factor
+            self.music.set_volume(min(1.0, self.volume * gain_factor(self.gain)))
+
+    @property
+    def gain_db(self):
+        """The gain applied to the current song in dB, or None"""
+        if self.gain is None or self.gain[0] is None:
+            return None
+        from app.loudness import gain_factor
+        factor = min(1.0, self.volume * gain_factor(self.gain)) / self.volume
+        return 20 * math.log10(factor)
 
     def volume_up(self):
         if self.volume < 1.0:
             self.volume += 0.05
-            pygame.mixer.music.set_volume(self.volume)
+            self.apply_volume()
             self.current_volume = str(int(self.volume * 100))
 
     def volume_down(self):
         if self.volume > 0.05:
             self.volume -= 0.05
-            pygame.mixer.music.set_volume(self.volume)
+            self.apply_volume()
             self.current_volume = str(int(self.volume * 100))
-                
-    def create_record_frames(self):
-        """Create frames for the spinning record animation"""
-        frames = []
-        
-        # Frame 1
-        frames.append([
-            "⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⢀⣀⣀⣀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⢀⣠⣴⢶⣾⣿⣿⣿⣿⣿⣿⣿⣿⣿⣷⣶⣦⣤⣀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⣠⡴⠞⠋⠁⡀⠘⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣶⣄⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⡀⡀⡀⡀⢀⣴⠞⠁⡀⡀⡀⢀⣀⠤⢿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣦⡀⡀⡀⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⡀⡀⡀⣴⠟⠁⡀⡀⡀⡠⠖⠉⡀⠄⠘⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣦⡀⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⡀⢠⠞⠁⡀⡀⢀⡴⠋⡀⡀⡀⡀⡀⣄⣻⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⡇⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⣰⠏⡀⡀⡀⣠⠊⡀⡀⡀⡀⢀⡴⠞⠿⣽⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣶⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⢠⠏⡀⡀⡀⡼⠁⡀⡀⡀⢀⡴⠋⢀⡀⢚⣽⣿⣿⡿⠿⢿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⡀⢀⡀⡀⡀",
-            "⡀⡀⢀⣿⣄⣄⡀⣼⠁⡀⡀⢠⣠⡟⡀⡀⢫⣶⠟⠉⡀⡀⡀⡀⡀⡀⠈⠙⠻⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⡀⣿⡄⡀⡀",
-            "⡀⡀⢸⣿⣿⣿⣿⣿⣾⣶⣦⣴⣏⣻⣾⣴⡟⠁⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⠘⢿⣿⣿⣿⣿⣿⣿⣿⣿⣿⡿⠃⣰⣿⣧⡀⡀",
-            "⡀⡀⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⡿⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⠈⣿⣿⣿⣿⣿⣿⣿⣿⡿⠁⣼⣿⣿⣿⡀⡀",
-            "⡀⡀⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⡇⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⣿⣿⣿⣿⣿⣿⣿⡟⢁⣾⣿⣿⣿⣿⡀⡀",
-            "⡀⡀⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣇⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⣿⣿⣿⣿⣿⣿⠟⢀⣾⣿⣿⣿⣿⣿⡀⡀",
-            "⡀⡀⢹⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⡄⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⣰⣿⢿⣿⠿⠋⡀⡀⢿⣿⣿⣿⣿⣿⡿⡀⡀",
-            "⡀⡀⠸⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣦⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⣠⣾⡿⠁⠉⠙⡀⡀⡀⡀⠉⠙⠛⠻⠿⢿⠇⡀⡀",
-            "⡀⡀⡀⢻⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣶⣤⣄⣀⣀⣀⣤⣴⣾⠟⠉⠛⠁⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⢻⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⡿⣏⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡐⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⡀⠻⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣷⡩⡐⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⡀⡀⠙⢿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⡇⠈⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⡀⡀⡀⡀⠙⢿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⡀⡀⡀⡀⡀⡀⡀⡀⢀⠔⠁⡀⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⠙⠻⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣇⡀⡀⡀⡀⢀⠠⠂⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⠉⠛⠿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣀⠠⠔⠊⠁⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⠈⠉⠙⠛⠛⠛⠛⠛⠛⠛⠛⠉⠁⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀"
-        ])
-        
-        # Frame 2
-        frames.append([
-            "⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⢀⣀⣀⣀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⢀⣠⣴⠶⠒⠛⠉⠉⠉⠉⠉⠉⠉⠙⠓⠲⠦⣤⣀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⣠⣴⡞⠉⠁⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⢀⣿⣿⣶⣄⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⡀⡀⡀⡀⢀⣴⣾⣿⣿⣿⣄⡀⣀⡤⠖⠂⡀⡀⠈⠁⡀⡀⡀⡀⠐⡀⢀⣾⣿⣿⣿⣿⣿⣦⡀⡀⡀⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⡀⡀⡀⣴⣿⣿⣿⣿⣿⣿⣿⣏⡀⠠⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⠂⢠⣾⣿⣿⣿⣿⣿⣿⣿⣿⣦⡀⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⡀⢠⣾⣿⣿⣿⣿⣿⣿⣿⣿⣿⣷⡀⣄⣂⡤⠤⠒⠒⠒⠂⢠⠔⣠⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⡇⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⢰⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣝⣟⡀⡀⡀⡤⡀⢀⣬⣧⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣶⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⢠⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣶⣶⡾⠿⢶⣶⣾⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⡀⢀⡀⡀⡀",
-            "⡀⡀⢀⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⠟⠉⡀⡀⡀⡀⡀⡀⠈⠙⠻⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⡀⣿⡄⡀⡀",
-            "⡀⡀⢸⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⡟⠁⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⠈⢿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⠃⣰⣿⣧⡀⡀",
-            "⡀⡀⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⡿⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⣿⣿⣿⣿⣿⣿⣿⣿⡿⠁⣼⣿⣿⣿⡀⡀",
-            "⡀⡀⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⡇⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⢹⣿⣿⣿⣿⣿⣿⡟⢁⣾⣿⣿⣿⣿⡀⡀",
-            "⡀⡀⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⡇⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⣿⣿⣿⣿⣿⣿⠟⢠⣾⣿⣿⣿⣿⣿⡀⡀",
-            "⡀⡀⢻⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⡄⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⣰⣿⣿⣿⣿⠋⠈⡀⣿⣿⣿⣿⣿⣿⣿⡀⡀",
-            "⡀⡀⠸⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣦⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⣠⣾⣿⣿⣿⡿⠁⡀⡀⣰⣿⣿⣿⣿⣿⣿⡇⡀⡀",
-            "⡀⡀⡀⢻⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣶⣤⣄⣀⣀⣀⣤⣴⣾⣿⣿⣿⣿⣿⣷⣄⣀⣾⣿⣿⣿⣿⣿⣿⡿⡀⡀⡀",
-            "⡀⡀⡀⡀⢻⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⡿⣿⠭⠉⢹⡋⠉⠭⢿⡻⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⡿⠁⡀⡀⡀",
-            "⡀⡀⡀⡀⡀⠻⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⡿⢵⣳⡀⡀⡀⡀⡀⡀⢚⡫⠙⢿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⡿⠁⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⡀⡀⠙⢿⣿⣿⣿⣿⣿⣿⣿⣿⣿⡟⠁⠈⠁⡀⡀⡀⡀⡀⡀⡀⡀⢀⠈⠿⣿⣿⣿⣿⣿⣿⣿⣿⠏⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⡀⡀⡀⡀⠙⢿⣿⣿⣿⣿⣿⣿⣿⣀⣀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⠹⣿⣿⣿⣿⣿⠟⠁⡀⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⠙⠿⣿⣿⣿⡿⡀⡀⠈⠉⠐⠒⠂⡀⡀⠒⠒⡀⡀⡀⡀⡀⡀⠙⣿⠿⠋⠁⡀⡀⡀⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⠉⠻⠤⣀⣀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⣀⠤⠔⠊⠁⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⠈⠉⠑⠒⠒⠒⠂⠐⠒⠒⠒⠉⠁⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀",
-            "..............................................."
-        ])
-        
-        # Frame 3
-        frames.append([
-            "⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⢀⣀⣀⣀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⢀⣠⣴⣶⣾⣿⣿⣿⣿⣿⣿⣿⣿⣿⠓⠲⠦⣤⣀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⣠⣴⣾⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⡟⡀⡀⡀⡀⠈⠙⠲⢄⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⡀⡀⡀⡀⢀⣴⣾⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⡏⠐⠠⡀⡀⡀⡀⡀⡀⠙⠢⡀⡀⡀⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⡀⡀⡀⣴⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⠁⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⠈⠢⡀⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⡀⢠⣾⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣯⠔⠢⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⣰⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣧⡟⠃⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⢠⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⡿⠿⢿⣿⣿⣭⡁⢠⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⣀⡀⢀⡀⡀⡀",
-            "⡀⡀⢀⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⠟⠉⡀⡀⡀⡀⡀⡀⠈⠙⠻⣷⣄⠠⣀⣶⡀⢂⣀⣤⣤⣶⣿⣿⡀⣸⡄⡀⡀",
-            "⡀⡀⢸⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⡟⠁⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⠈⢻⣷⣿⣶⣿⣿⣿⣿⣿⣿⡿⠃⣰⣿⣧⡀⡀",
-            "⡀⡀⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⡿⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⣿⣿⣿⣿⣿⣿⣿⣿⡿⠁⣼⣿⣿⣿⡀⡀",
-            "⡀⡀⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⡇⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⢹⣿⣿⣿⣿⣿⣿⡟⢁⣾⣿⣿⣿⣿⡀⡀",
-            "⡀⡀⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣇⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⣾⣿⣿⣿⣿⣿⠟⢠⣾⣿⣿⣿⣿⣿⡀⡀",
-            "⡀⡀⢻⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⡄⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⣰⣿⣿⣿⣿⠋⡀⡀⣿⣿⣿⣿⣿⣿⣿⡀⡀",
-            "⡀⡀⠸⣿⣿⣿⣿⣿⣿⣿⠿⠟⢿⣭⡿⠏⠻⣦⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⣠⣾⣿⣿⣿⡿⠁⡀⡀⣰⣿⣿⣿⣿⣿⣿⡇⡀⡀",
-            "⡀⡀⡀⢻⡿⠿⠛⠛⣇⡀⠠⡀⠃⠻⣄⡀⠐⣝⠛⢶⣤⣄⣀⣀⣀⣤⣴⣾⣿⣿⣿⣿⣿⣷⣄⣀⣾⣿⣿⣿⣿⣿⣿⡿⡀⡀⡀",
-            "⡀⡀⡀⡀⢣⡀⡀⡀⠘⢧⡀⡀⡀⡀⠈⠳⣄⡀⡀⢰⣾⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⡿⠁⡀⡀⡀",
-            "⡀⡀⡀⡀⡀⠳⡀⡀⡀⡀⠳⣄⡀⡀⡀⡀⡀⠙⠲⣿⣩⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⡿⠁⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⡀⡀⠙⢆⡀⡀⡀⠈⠳⢄⡀⡀⡀⡀⠐⡀⣼⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⠏⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⡀⡀⡀⡀⠑⢄⡀⡀⡀⡀⠉⠒⢤⣀⡀⡀⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⠟⠁⡀⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⠙⠦⣀⡀⡀⡀⡀⡀⠈⢩⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⠿⠋⠁⡀⡀⡀⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⠉⠲⠤⣄⡀⡀⢸⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⠿⠟⠋⠁⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⠈⠉⠙⠛⠛⠛⠛⠛⠛⠛⠛⠉⠁⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀"
-        ])
-        
-        # Frame 4
-        frames.append([
-            "⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⢀⣀⣀⣀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⢀⣠⣴⣶⣶⣿⣿⣿⣿⣿⣿⣿⣿⣿⣷⣶⣦⣤⣀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⣠⣴⣾⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣶⣄⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⡀⡀⡀⡀⢀⣴⣾⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣦⡀⡀⡀⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⡀⡀⡀⣴⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣦⡀⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⡀⢠⣾⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⠇⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⣰⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⡿⠟⠁⡀⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⢠⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⡿⠿⢿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⠟⠋⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⢀⡟⠛⠿⢿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⠟⠉⡀⡀⡀⡀⡀⡀⠈⠙⠻⣿⣿⣿⣿⢟⡁⡀⡀⡀⡀⡀⡀⡀⡀⠈⠄⡀⡀",
-            "⡀⡀⢸⠁⡀⡀⢸⠇⠙⠛⠿⢿⣿⣿⣿⣿⡟⠁⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⠈⢿⣿⠻⠋⠁⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡟⡀⡀⡀⢿⡀⡀⡀⠂⣾⡾⣽⣿⡿⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⣿⣇⢁⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡇⡀⡀⡀⡇⡀⡀⡀⡀⡿⡀⠉⢸⡇⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⢹⣟⠈⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡇⡀⡀⡀⢰⡀⡀⡀⡀⣿⡀⠲⠸⣇⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⣾⣿⣰⣄⡤⢀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⢳⡀⡀⡀⢸⡀⡀⡀⡀⢸⡀⡀⣄⣿⡄⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⣰⣿⣿⣿⣶⠃⡀⡀⡀⡀⡀⡀⡀⡀⠘⡀⡀",
-            "⡀⡀⠸⡄⡀⡀⡀⣧⡀⡀⡀⢀⢷⡶⣻⣿⣿⣦⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⣀⣼⣿⣿⣿⡿⠁⡀⡀⣰⣷⣦⣤⣀⡀⡀⠃⡀⡀",
-            "⡀⡀⡀⢳⡀⡀⡀⠘⣆⡀⡀⢀⣴⣿⣿⣿⣿⣿⣿⣶⣤⣄⣀⣀⣀⣤⣴⣾⣿⣿⣿⣿⣿⣷⣄⣀⣾⣿⣿⣿⣿⣿⣿⡟⡀⡀⡀",
-            "⡀⡀⡀⡀⢳⡀⡀⡀⠘⣧⣴⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⡿⠁⡀⡀⡀",
-            "⡀⡀⡀⡀⡀⠳⣄⣴⣾⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⡟⠁⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⡀⡀⠙⢿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⠏⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⡀⡀⡀⡀⠙⢿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⠟⠁⡀⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⠙⠿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⠿⠋⠁⡀⡀⡀⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⠙⠻⠿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⠿⠟⠋⠁⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⠈⠉⠙⠛⠛⠛⠛⠛⠛⠛⠛⠉⠁⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀"
-        ])
-        
-        # Frame 5
-        frames.append([
-            "⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⢀⣀⣀⣀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⢀⣠⣴⣶⣶⣿⣿⣿⣿⣿⣿⣿⣿⣿⣷⣶⣦⣤⣀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⣠⡴⢾⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣶⣄⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⡀⡀⡀⡀⢀⣴⠞⠉⡀⡀⠻⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣦⡀⡀⡀⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⡀⡀⡀⡴⠋⡀⡀⡀⢀⣠⠞⢻⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣦⡀⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⡀⢠⠞⠁⡀⡀⢀⡴⠋⡀⠂⡀⢻⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⡇⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⣰⠏⡀⡀⡀⣠⠊⡀⡀⡀⡀⢲⣴⢿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣶⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⢠⠃⡀⡀⡀⡼⠁⡀⡀⡀⢀⡴⠋⢉⣿⣿⣿⣿⣿⡿⠿⢿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⡀⢀⡀⡀⡀",
-            "⡀⡀⢀⡟⡀⡀⡀⣼⡀⡀⡀⡀⢠⠟⡀⣀⢀⣾⠟⠉⡀⡀⡀⡀⡀⡀⠈⠙⠻⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⡀⣿⡄⡀⡀",
-            "⡀⡀⢸⠁⡀⡀⢸⠇⢀⡀⢀⢠⡏⡀⠈⢱⡟⠁⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⠘⢿⣿⣿⣿⣿⣿⣿⣿⣿⣿⡿⠃⣰⣿⣧⡀⡀",
-            "⡀⡀⣿⣤⣤⣀⣼⣀⣀⣀⣈⣾⣛⣾⣦⡿⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⣿⣿⣿⣿⣿⣿⣿⣿⡿⠁⣼⣿⣿⣿⡀⡀",
-            "⡀⡀⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⡇⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⢹⣿⣿⣿⣿⣿⣿⡟⢁⣾⣿⣿⣿⣿⡀⡀",
-            "⡀⡀⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣇⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⣾⣿⣿⣿⠻⠿⠏⡀⠾⠿⠿⢿⣿⣿⡀⡀",
-            "⡀⡀⢻⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⡄⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⣰⣿⠃⠋⠙⠃⡀⡀⢀⡀⡀⡀⡀⡀⠈⡀⡀",
-            "⡀⡀⠸⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣦⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⢀⣼⡟⠣⠆⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⠇⡀⡀",
-            "⡀⡀⡀⢻⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣶⣤⣄⣀⣀⣀⣤⣴⣾⣿⣯⡄⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⢻⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣟⠿⠂⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⡀⠻⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣆⠈⢀⡀⡀⡀⡀⡀⡀⡀⡀⡐⠁⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⡀⡀⠙⢿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣆⡀⡀⡀⡀⡀⡀⡀⡀⠌⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⡀⡀⡀⡀⠛⢿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⡄⡀⡀⡀⡀⣀⠔⠁⡀⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⠙⠻⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣇⢀⠠⠊⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⠙⠻⠿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⠿⠟⠋⠁⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀",
-            "⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⠈⠉⠙⠛⠛⠛⠛⠛⠛⠛⠛⠉⠁⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀⡀"
-        ])
-        
-        return frames
-        
-    def get_current_record_frame(self):
-        """Get the current frame of the spinning record"""
-        if self.is_playing:
-            self.current_frame = (self.current_frame + 1) % len(self.record_frames)
-            return self.record_frames[self.current_frame]
-        else:
-            return self.record_frames[0]
+
+    def close(self):
+        """Save the session, then stop playback and every background worker"""
+        self.save_session()
+        self.stop()
+        self.scanner.cancel()
+        for job in (self.indexer, self.analyzer, self.finder):
+            if job is not None:
+                job.cancel()
+                job.join()
+        self.notifier.stop()
+        if self.watcher is not None:
+            self.watcher.stop()
+        self.cache.close()
+        if self.crossfading:
+            self.music.close()
+        if self.mixer_started:
+            pygame.mixer.quit()
@@ -0,0 +1,383 @@
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import namedtuple
+from app.mp3info import SeekIndex, build_seek_index, read_fast
+
+# Everything the UI and player need to know about a track, and sort it by
+Tags = namedtuple("Tags", ["title", "artist", "album", "tracknumber", "duration",
+                           "albumartist", "discnumber"], defaults=(None, None))
+
+# Columns of the tracks table, an older table without all of them is dropped
+TRACK_COLUMNS = ("path", "size", "mtime") + Tags._fields
+
+EMPTY_TAGS = Tags(None, None, None, None, 0.0)
+
+def cache_dir():
+    """Directory for pytermusic's on-disk caches"""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "pytermusic")
+
+def split_names(joined):
+    """Undo the NUL-joined name lists stored in the dirs table"""
+    return joined.split("\0") if joined else []
+
+def first_tag(tags, key):
+    """Return the first value of an easy tag, or None if missing"""
+    try:
+        values = tags[key]
+    except (KeyError, TypeError):
+        return None
+    return str(values[0]) if values else None
+
+def parse_tracknumber(value):
+    """Turn '3' or '3/12' into 3, disc numbers too"""
+    if not value:
+        return None
+    try:
+        return int(value.split("/")[0])
+    except ValueError:
+        return None
+
+def read_tags(path):
+    """Read a file's tags and duration, from the headers if they are simple"""
+    fields = read_fast(path)
+    if fields is None:
+        return read_tags_mutagen(path)
+    title, artist, album, tracknumber, albumartist, discnumber, duration = fields
+    return Tags(title, artist, album, parse_tracknumber(tracknumber), duration,
+                albumartist, parse_tracknumber(discnumber))
+
+def read_tags_mutagen(path):
+    """Parse a file's tags and duration with a single mutagen call"""
+    # Only needed for files the header reader can't handle, and slow to import
+    import mutagen
+    try:
+        audio = mutagen.File(path, easy=True)
+    except (mutagen.MutagenError, OSError):
+        return EMPTY_TAGS
+    if audio is None:
+        return EMPTY_TAGS
+
+    duration = audio.info.length if audio.info else 0.0
+    return Tags(
+        first_tag(audio, "title"),
+        first_tag(audio, "artist"),
+        first_tag(audio, "album"),
+        parse_tracknumber(first_tag(audio, "tracknumber")),
+        duration,
+        first_tag(audio, "albumartist"),
+        parse_tracknumber(first_tag(audio, "discnumber")),
+    )
+
+class MetadataCache:
+    """Persistent tag store keyed by path, validated by size + mtime
+
+    Cached rows are read into memory on a worker thread, so opening a big
+    cache doesn't hold up startup. Anything that needs them waits until
+    they're in.
+    """
+
+    COMMIT_EVERY = 200
+
+    def __init__(self, path=None):
+        if path is None:
+            os.makedirs(cache_dir(), exist_ok=True)
+            path = os.path.join(cache_dir(), "library.db")
+        self.path = path
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        columns = tuple(row[1] for row in self.db.execute("PRAGMA table_info(tracks)"))
+        if columns and columns != TRACK_COLUMNS:
+            # Written before some tags were kept, read them all again
+            self.db.execute("DROP TABLE tracks")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS tracks (
+                path TEXT PRIMARY KEY,
+                size INTEGER,
+                mtime INTEGER,
+                title TEXT,
+                artist TEXT,
+                album TEXT,
+                tracknumber INTEGER,
+                duration REAL,
+                albumartist TEXT,
+                discnumber INTEGER
+            )""")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS dirs (
+                path TEXT PRIMARY KEY,
+                mtime INTEGER,
+                files TEXT,
+                subdirs TEXT
+            )""")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS seek_index (
+                path TEXT PRIMARY KEY,
+                size INTEGER,
+                mtime INTEGER,
+                interval REAL,
+                exact INTEGER,
+                offsets BLOB
+            )""")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS loudness (
+                path TEXT PRIMARY KEY,
+                size INTEGER,
+                mtime INTEGER,
+                gain REAL,
+                peak REAL
+            )""")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS audio_hash (
+                path TEXT PRIMARY KEY,
+                size INTEGER,
+                mtime INTEGER,
+                audio_size INTEGER,
+                digest TEXT
+            )""")
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.dirs = {}
+        self.loudness = {}
+        self.hashes = None
+        self.checked = set()
+        self.pending = 0
+        self.hits = 0
+        self.misses = 0
+        self.loaded = threading.Event()
+        self.load_time = None
+        threading.Thread(target=self.load, daemon=True).start()
+
+    def load(self):
+        """Read every cached row into memory once at startup"""
+        start = time.perf_counter()
+        with self.lock:
+            for row in self.db.execute("SELECT * FROM tracks"):
+                self.entries[row[0]] = (row[1], row[2], Tags(*row[3:]))
+            for path, mtime, files, subdirs in self.db.execute("SELECT * FROM dirs"):
+                self.dirs[path] = (mtime, split_names(files), split_names(subdirs))
+            for path, size, mtime, gain, peak in self.db.execute("SELECT * FROM loudness"):
+                self.loudness[path] = (size, mtime, (gain, peak))
+        self.load_time = time.perf_counter() - start
+        self.loaded.set()
+
+    def get(self, path):
+        """Return Tags for path, parsing the file only on a miss"""
+        self.loaded.wait()
+        entry = self.entries.get(path)
+        if entry is not None and path in self.checked:
+            self.hits += 1
+            return entry[2]
+
+        # First look at this path this session, make sure it hasn't changed
+        try:
+            st = os.stat(path)
+        except OSError:
+            return EMPTY_TAGS
+        if entry is not None and entry[0] == st.st_size and entry[1] == st.st_mtime_ns:
+            self.checked.add(path)
+            self.hits += 1
+            return entry[2]
+
+        self.misses += 1
+        tags = read_tags(path)
+        self.store(path, st.st_size, st.st_mtime_ns, tags)
+        return tags
+
+    def peek(self, path):
+        """Return cached Tags without checking the file, or None"""
+        self.loaded.wait()
+        entry = self.entries.get(path)
+        return entry[2] if entry is not None else None
+
+    def mtime(self, path):
+        """Modification time in ns of the file the cached tags came from, or None"""
+        self.loaded.wait()
+        entry = self.entries.get(path)
+        return entry[1] if entry is not None else None
+
+    def store(self, path, size, mtime, tags):
+        """Save tags for a file in memory and on disk"""
+        self.loaded.wait()
+        self.entries[path] = (size, mtime, tags)
+        self.checked.add(path)
+        self.write(
+            "INSERT OR REPLACE INTO tracks VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (path, size, mtime) + tuple(tags))
+
+    def store_many(self, rows):
+        """Save (path, size, mtime, tags) rows in a single transaction"""
+        self.loaded.wait()
+        for path, size, mtime, tags in rows:
+            self.entries[path] = (size, mtime, tags)
+            self.checked.add(path)
+        with self.lock:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO tracks VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(path, size, mtime) + tuple(tags) for path, size, mtime, tags in rows])
+            self.db.commit()
+            self.pending = 0
+
+    def fresh(self, path):
+        """True if the cached tags for path still match the file"""
+        self.loaded.wait()
+        entry = self.entries.get(path)
+        if entry is None:
+            return False
+        if path in self.checked:
+            return True
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        if entry[0] == st.st_size and entry[1] == st.st_mtime_ns:
+            self.checked.add(path)
+            return True
+        return False
+
+    def get_seek_index(self, path):
+        """Return the SeekIndex for path, building it on a miss, or None"""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        with self.lock:
+            row = self.db.execute(
+                "SELECT size, mtime, interval, exact, offsets FROM seek_index WHERE path = ?",
+                (path,)).fetchone()
+        if row is not None and row[0] == st.st_size and row[1] == st.st_mtime_ns and row[3]:
+            offsets = array("Q")
+            offsets.frombytes(row[4])
+            return SeekIndex(row[2], bool(row[3]), offsets)
+
+        index = build_seek_index(path)
+        if index is not None:
+            self.write(
+                "INSERT OR REPLACE INTO seek_index VALUES (?, ?, ?, ?, ?, ?)",
+                (path, st.st_size, st.st_mtime_ns, index.interval, int(index.exact),
+                 index.offsets.tobytes()))
+        return index
+
+    def get_loudness(self, path):
+        """Return (gain in dB, peak) for path if it's been analysed since it last changed
+
+        Either value is None for a file that couldn't be decoded.
+        """
+        self.loaded.wait()
+        entry = self.loudness.get(path)
+        if entry is None:
+            return None
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        if entry[0] == st.st_size and entry[1] == st.st_mtime_ns:
+            return entry[2]
+        return None
+
+    def store_loudness_many(self, rows):
+        """Save (path, size, mtime, (gain, peak)) rows in a single transaction"""
+        self.loaded.wait()
+        for path, size, mtime, loudness in rows:
+            self.loudness[path] = (size, mtime, tuple(loudness))
+        with self.lock:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO loudness VALUES (?, ?, ?, ?, ?)",
+                [(path, size, mtime) + tuple(loudness) for path, size, mtime, loudness in rows])
+            self.db.commit()
+            self.pending = 0
+
+    def load_hashes(self):
+        """The audio_hash rows by path, read the first time they're needed
+
+        Most runs never look for duplicates, so startup doesn't load them.
+        """
+        with self.lock:
+            if self.hashes is None:
+                self.hashes = {row[0]: (row[1], row[2], (row[3], row[4]))
+                               for row in self.db.execute("SELECT * FROM audio_hash")}
+            return self.hashes
+
+    def get_audio_hash(self, path):
+        """Return (audio size, digest) for path if known since it last changed
+
+        The digest is None while only the size has been looked at, and empty
+        for a file that couldn't be read.
+        """
+        entry = self.load_hashes().get(path)
+        if entry is None:
+            return None
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        if entry[0] == st.st_size and entry[1] == st.st_mtime_ns:
+            return entry[2]
+        return None
+
+    def store_audio_hashes(self, rows):
+        """Save (path, size, mtime, (audio size, digest)) rows in a single transaction"""
+        hashes = self.load_hashes()
+        for path, size, mtime, audio_hash in rows:
+            hashes[path] = (size, mtime, tuple(audio_hash))
+        with self.lock:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO audio_hash VALUES (?, ?, ?, ?, ?)",
+                [(path, size, mtime) + tuple(audio_hash) for path, size, mtime, audio_hash in rows])
+            self.db.commit()
+            self.pending = 0
+
+    def get_dir(self, path):
+        """Return (mtime, files, subdirs) from the last scan of a directory"""
+        self.loaded.wait()
+        return self.dirs.get(path)
+
+    def store_dir(self, path, mtime, files, subdirs):
+        """Remember a directory's listing so unchanged dirs can be skipped"""
+        self.loaded.wait()
+        self.dirs[path] = (mtime, files, subdirs)
+        self.write(
+            "INSERT OR REPLACE INTO dirs VALUES (?, ?, ?, ?)",
+            (path, mtime, "\0".join(files), "\0".join(subdirs)))
+
+    def write(self, sql, params):
+        """Queue a write, committing every COMMIT_EVERY rows"""
+        with self.lock:
+            self.db.execute(sql, params)
+            self.pending += 1
+            if self.pending >= self.COMMIT_EVERY:
+                self.db.commit()
+                self.pending = 0
+
+    def invalidate(self, path):
+        """Forget a file so its tags are re-read on next access"""
+        self.loaded.wait()
+        self.checked.discard(path)
+        if self.entries.pop(path, None) is not None:
+            self.write("DELETE FROM tracks WHERE path = ?", (path,))
+            self.write("DELETE FROM seek_index WHERE path = ?", (path,))
+        if self.loudness.pop(path, None) is not None:
+            self.write("DELETE FROM loudness WHERE path = ?", (path,))
+        if self.hashes is not None and self.hashes.pop(path, None) is not None:
+            self.write("DELETE FROM audio_hash WHERE path = ?", (path,))
+
+    def flush(self):
+        """Commit pending writes"""
+        with self.lock:
+            if self.pending:
+                self.db.commit()
+                self.pending = 0
+
+    def close(self):
+        self.loaded.wait()
+        self.flush()
+        with self.lock:
+            self.db.close()
+
+    def stats(self):
+        """Hit and miss counters"""
+        total = self.hits + self.misses
+        rate = (self.hits / total * 100) if total else 0.0
+        return f"Tag cache: {self.hits} hits, {self.misses} misses ({rate:.1f}% hit rate)"
@@ -0,0 +1,379 @@
+import queue
+import threading
+import time
+from bisect import bisect_right
+from app.cache import MetadataCache, Tags
+from app.perf import format_phases
+from app.protocol import decode, encode
+
+class RemoteLibrary:
+    """The daemon's browse order, as much of the Library as the UI uses"""
+
+    def __init__(self, order=(), version=None, groups=()):
+        self.order = list(order)
+        self.version = version
+        self.positions = None
+        self.group_starts = [position for position, _ in groups]
+        self.group_labels = [label for _, label in groups]
+
+    def __len__(self):
+        return len(self.order)
+
+    def id_at(self, position):
+        return self.order[position]
+
+    def position(self, track_id):
+        if self.positions is None:
+            self.positions = {track_id: position for position, track_id in enumerate(self.order)}
+        return self.positions.get(track_id)
+
+    def group_at(self, position):
+        """(first position, label) of the album a position is in, or None"""
+        index = bisect_right(self.group_starts, position) - 1
+        if index < 0:
+            return None
+        return self.group_starts[index], self.group_labels[index]
+
+class RemoteSearch:
+    """Searches run in the daemon, next to its trigram index"""
+
+    def __init__(self, player):
+        self.player = player
+
+    def search(self, query):
+        return self.player.call("search", query=query)["results"]
+
+    def build(self):
+        self.player.call("prepare_search")
+
+    def reset(self):
+        # The daemon resets its own index when the order changes
+        pass
+
+class RemoteCache:
+    """The daemon's tag cache counters"""
+
+    stats = MetadataCache.stats
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+class RemotePlayer:
+    """Client side of the daemon, standing in for MP3Player in the UI
+
+    A reader thread takes state pushes and replies off the socket. Pushes
+    are applied by poll() on the UI thread, which returns the keys that
+    changed. Commands wait for their reply, and the daemon sends the state
+    they changed before that, so the player reads as up to date as soon as
+    a command returns. Titles are fetched for the rows on screen only.
+    """
+
+    TIMEOUT = 10.0
+
+    def __init__(self, sock, wakeup=None):
+        self.sock = sock
+        self.wakeup = wakeup
+        self.stream = sock.makefile("rb")
+        self.send_lock = threading.Lock()
+        self.replied = threading.Condition()
+        self.replies = {}
+        self.seq = 0
+        self.pushes = queue.Queue()
+        self.connected = True
+        self.state = {}
+        self.changed = set()
+        self.received_at = time.monotonic()
+        self.song_position = 0.0
+        self.titles = {}
+        self.levels_supported = True
+        self.library = RemoteLibrary()
+        self.search = RemoteSearch(self)
+        self.cache = RemoteCache()
+        self.reader = threading.Thread(target=self.read, daemon=True)
+        self.reader.start()
+
+        self.apply(self.call("subscribe")["state"], time.monotonic())
+        self.load_order()
+        self.changed.clear()
+
+    def read(self):
+        """Reader thread: sort incoming lines into replies and pushes"""
+        try:
+            for line in self.stream:
+                message = decode(line)
+                if "seq" in message:
+                    with self.replied:
+                        self.replies[message["seq"]] = message
+                        self.replied.notify_all()
+                elif "state" in message:
+                    self.pushes.put((message["state"], time.monotonic()))
+                    if self.wakeup is not None:
+                        self.wakeup()
+        except (OSError, ValueError):
+            pass
+        with self.replied:
+            self.connected = False
+            self.replied.notify_all()
+        if self.wakeup is not None:
+            self.wakeup()
+
+    def call(self, command, **args):
+        """Send a command and wait for its reply"""
+        with self.send_lock:
+            self.seq += 1
+            seq = self.seq
+            self.sock.sendall(encode(dict(args, cmd=command, seq=seq)))
+        deadline = time.monotonic() + self.TIMEOUT
+        with self.replied:
+            while seq not in self.replies:
+                remaining = deadline - time.monotonic()
+                if not self.connected or remaining <= 0:
+                    raise ConnectionError("lost the pytermusic daemon")
+                self.replied.wait(remaining)
+            reply = self.replies.pop(seq)
+        # Take in the state the command changed
+        self.drain()
+        if "error" in reply:
+            raise ValueError(reply["error"])
+        return reply
+
+    def drain(self):
+        while True:
+            try:
+                self.apply(*self.pushes.get_nowait())
+            except queue.Empty:
+                return
+
+    def apply(self, state, received_at):
+        self.state.update(state)
+        self.changed.update(state)
+        if "position" in state:
+            self.received_at = received_at
+        if "cache" in state:
+            self.cache.hits, self.cache.misses = state["cache"]
+        if "tags" in state:
+            self.titles.clear()
+
+    def poll(self):
+        """Apply state pushed since the last call, returning the keys that changed"""
+        self.drain()
+        self.poll_order()
+        changed = self.changed
+        self.changed = set()
+        return changed
+
+    def load_order(self):
+        reply = self.call("order")
+        self.library = RemoteLibrary(reply["order"], reply["version"], reply["groups"])
+
+    def load_titles(self, track_ids):
+        """Fetch the titles of tracks about to be drawn"""
+        missing = [track_id for track_id in track_ids if track_id not in self.titles]
+        if missing:
+            for track_id, title in self.call("titles", ids=missing)["titles"]:
+                self.titles[track_id] = title
+
+    def fetch_levels(self, track_id, start, count):
+        """Visualizer rows from the daemon, see app.levels"""
+        levels = self.call("levels", id=track_id, start=start, count=count)["levels"]
+        if levels is None:
+            self.levels_supported = False
+            return b""
+        return bytes.fromhex(levels)
+
+    def startup_report(self):
+        """The daemon's --startup-trace table"""
+        reply = self.call("startup")
+        return format_phases("Daemon startup", reply["phases"], reply["later"])
+
+    def get_song_title(self, track_id):
+        return self.titles.get(track_id, "")
+
+    def get_current_song_info(self):
+        """The current song's tags, as far as the UI shows them"""
+        state = self.state
+        if state["current"] is None:
+            return None
+        return Tags(state["title"], state["artist"], state["album"], None, state["length"])
+
+    @property
+    def current_id(self):
+        return self.state["current"]
+
+    @property
+    def current_position(self):
+        if self.current_id is None:
+            return None
+        return self.library.position(self.current_id)
+
+    @property
+    def is_playing(self):
+        return self.state["playing"]
+
+    @property
+    def paused(self):
+        return self.state["paused"]
+
+    @property
+    def song_length(self):
+        return self.state["length"]
+
+    @property
+    def current_volume(self):
+        return self.state["volume"]
+
+    @property
+    def gain(self):
+        return self.state["gain"]
+
+    @property
+    def queue(self):
+        return self.state["queue"]
+
+    @property
+    def scanning(self):
+        return self.state["scanning"]
+
+    @property
+    def indexing(self):
+        return self.state["indexing"] is not None
+
+    @property
+    def clients(self):
+        return self.state["clients"]
+
+    def index_progress(self):
+        return self.state["indexing"]
+
+    def analysis_progress(self):
+        return self.state["analyzing"]
+
+    def duplicate_progress(self):
+        return self.state["finding"]
+
+    @property
+    def duplicate_count(self):
+        """Groups of duplicates found, None before anyone looked"""
+        return self.state["duplicates"]
+
+    @property
+    def hiding_duplicates(self):
+        return self.state["hiding"]
+
+    def duplicate_groups(self):
+        """Track IDs of each set of copies of the same audio"""
+        return self.call("duplicates")["groups"]
+
+    def find_duplicates(self):
+        self.call("find_duplicates")
+
+    def hide_duplicates(self):
+        self.call("hide_duplicates")
+        self.poll_order()
+
+    @property
+    def cursor_id(self):
+        """The track the list cursor was on when a player last quit"""
+        return self.state["cursor"]
+
+    def remember_cursor(self, track_id):
+        self.call("cursor", id=track_id)
+
+    def playlists(self):
+        return self.call("playlists")["playlists"]
+
+    def save_playlist(self, name):
+        self.call("save_playlist", name=name)
+
+    def load_playlist(self, name):
+        """Replace the queue with a playlist, returning how many of its tracks are missing"""
+        return self.call("load_playlist", name=name)["missing"]
+
+    def update_position(self):
+        """Carry the last position the daemon sent forward by the clock"""
+        position = self.state["position"]
+        if self.is_playing:
+            position += time.monotonic() - self.received_at
+            if self.song_length > 0:
+                position = min(position, self.song_length)
+        self.song_position = position
+
+    def time_remaining(self):
+        return max(0.0, self.song_length - self.song_position)
+
+    def play(self):
+        self.call("play")
+
+    def play_track(self, track_id):
+        self.call("play", id=track_id)
+
+    def pause(self):
+        self.call("pause")
+
+    def stop(self):
+        self.call("stop")
+
+    def next_song(self):
+        self.call("next")
+
+    def prev_song(self):
+        self.call("prev")
+
+    def seek_by(self, seconds):
+        self.call("seek", offset=seconds)
+
+    def seek_percent(self, percent):
+        self.call("seek", percent=percent)
+
+    def shuffle(self):
+        self.call("shuffle")
+
+    @property
+    def shuffling(self):
+        return self.state["shuffle"]
+
+    @property
+    def sorted_by(self):
+        return self.state["sort"]
+
+    def sort(self, by=None):
+        if by is None:
+            self.call("sort")
+        else:
+            self.call("sort", by=by)
+        self.poll_order()
+
+    def poll_order(self):
+        """Pick up a new order right away, so the view matches the daemon's"""
+        if self.state["order"] != self.library.version:
+            self.load_order()
+            self.changed.add("order")
+
+    def volume_up(self):
+        self.call("volume_up")
+
+    def volume_down(self):
+        self.call("volume_down")
+
+    def addsong(self, track_id):
+        self.call("enqueue", id=track_id)
+
+    def remove_from_queue(self, index):
+        self.call("dequeue", index=index)
+
+    def clear_queue(self):
+        self.call("clear_queue")
+
+    def index_tags(self, workers=None):
+        # The daemon was started with its own worker count
+        self.call("index")
+
+    def close(self, quit=False):
+        """Disconnect, stopping the daemon too if quit is set"""
+        try:
+            if quit:
+                self.call("quit")
+        except (OSError, ValueError):
+            pass
+        self.sock.close()
@@ -0,0 +1,297 @@
+import threading
+import pygame
+from app.decode import decode, decode_file, numpy
+
+# Longest crossfade PYTERMUSIC_CROSSFADE can ask for
+MAX_FADE = 12.0
+
+# Fade used when a song is skipped, stopped or seeked instead of a hard cut
+SKIP_FADE = 0.4
+
+# Seconds decoded from a track at a time, and mixed and handed to the
+# channel at a time. Each track holds two chunks, the one playing and the
+# next, the channel two blocks.
+CHUNK_SECONDS = 2
+BLOCK_SECONDS = 0.2
+
+class Stream:
+    """A track decoded CHUNK_SECONDS at a time and read out in blocks
+
+    The next chunk is decoded by decode_ahead() while the last one plays.
+    level is the volume the track plays at, with its gain applied.
+    """
+
+    def __init__(self, path, cache, start=0.0, level=1.0):
+        self.path = path
+        self.cache = cache
+        self.index = None
+        self.next_start = start
+        self.position = start
+        self.duration = cache.get(path).duration
+        self.level = level
+        self.chunk = None
+        self.offset = 0
+        self.ahead = None
+        self.last_chunk = False
+        self.drained = False
+        self.ended = False
+
+    def decode_next(self, rate):
+        """The next chunk of samples, None once the track is over"""
+        if self.last_chunk:
+            return None
+        if self.index is None:
+            self.index = self.cache.get_seek_index(self.path) or False
+        if self.index is False:
+            # No frame index to decode pieces by, only whole, so this one
+            # track takes its full length in memory
+            self.last_chunk = True
+            return decode_file(self.path)[0]
+        samples, _ = decode(self.path, self.index, self.next_start, CHUNK_SECONDS)
+        self.next_start += CHUNK_SECONDS
+        # A chunk can come up short before the end, only the duration says
+        # where that is, or without one the decoder running dry
+        self.last_chunk = 0 < self.duration <= self.next_start
+        return samples
+
+    def short(self):
+        """Whether the chunk after the playing one is still to be decoded"""
+        return self.ahead is None and not self.drained
+
+    def decode_ahead(self, rate):
+        """Decode the chunk after the playing one, drained once there are no more"""
+        try:
+            chunk = self.decode_next(rate)
+        except (OSError, ValueError, pygame.error):
+            chunk = None
+        if chunk is None or not len(chunk):
+            self.drained = True
+        else:
+            self.ahead = chunk
+
+    def read_into(self, out, rate):
+        """Fill out with the next frames, silence past the end"""
+        filled = 0
+        while filled < len(out) and not self.ended:
+            if self.chunk is None or self.offset >= len(self.chunk):
+                if self.ahead is None:
+                    self.ended = self.drained
+                    break
+                self.chunk, self.ahead, self.offset = self.ahead, None, 0
+            count = min(len(out) - filled, len(self.chunk) - self.offset)
+            out[filled:filled + count] = self.chunk[self.offset:self.offset + count]
+            self.offset += count
+            filled += count
+        out[filled:] = 0
+        self.position += filled / rate
+        return filled
+
+class Crossfader(threading.Thread):
+    """Plays songs on a mixer Channel, fading each one into the next
+
+    Stands in for pygame.mixer.music with the calls MP3Player makes of it.
+    A feeder thread decodes the playing song, and the one fading out, a
+    chunk at a time and mixes them in blocks with equal-power curves into
+    buffers made once, keeping the channel a block ahead. A queued song
+    starts fading in `fade` seconds before the playing one ends, and
+    `end_event` is posted as it takes over, as the mixer does when it moves
+    on to a queued song. Decoding happens with the lock let go, so the
+    calls MP3Player makes never wait on it. Memory is two chunks per track
+    and a few blocks, however long the tracks are, except for a file with
+    no MPEG frames to index, which can only be decoded whole.
+
+    Skips, stops and seeks fade over SKIP_FADE instead of cutting off.
+    """
+
+    def __init__(self, fade, cache, end_event, notify=None):
+        super().__init__(daemon=True)
+        self.fade = min(max(fade, SKIP_FADE), MAX_FADE)
+        self.cache = cache
+        self.end_event = end_event
+        self.notify = notify
+        self.lock = threading.Lock()
+        self.ready = threading.Condition(self.lock)
+        self.running = True
+        self.loaded = None
+        self.queued = None
+        self.current = None
+        self.outgoing = None
+        self.faded = 0
+        self.fade_frames = 0
+        self.paused = False
+        self.level = 1.0
+        self.underruns = 0
+        self.started = False
+
+        self.rate, _, self.channels = pygame.mixer.get_init()
+        frames = int(self.rate * BLOCK_SECONDS)
+        self.incoming_block = numpy.zeros((frames, self.channels))
+        self.outgoing_block = numpy.zeros((frames, self.channels))
+        self.ramp = numpy.arange(frames, dtype=float)
+        self.curve = numpy.zeros(frames)
+        self.pcm = numpy.zeros((frames, self.channels), dtype=numpy.int16)
+        self.full_scale = float(numpy.iinfo(numpy.int16).max)
+        pygame.mixer.set_reserved(1)
+        self.channel = pygame.mixer.Channel(0)
+
+    # The pygame.mixer.music calls MP3Player makes
+
+    def load(self, path):
+        with self.lock:
+            self.loaded = path
+            self.queued = None
+
+    def play(self, start=0.0):
+        with self.lock:
+            if self.loaded is None:
+                return
+            if self.current is not None:
+                self.fade_out(SKIP_FADE)
+            self.current = Stream(self.loaded, self.cache, start, self.level)
+            self.paused = False
+            self.channel.unpause()
+            self.ready.notify()
+
+    def queue(self, path):
+        with self.lock:
+            self.queued = path
+
+    def stop(self):
+        with self.lock:
+            if self.current is not None:
+                self.fade_out(SKIP_FADE)
+            self.current = None
+            self.queued = None
+
+    def pause(self):
+        with self.lock:
+            self.paused = True
+            self.channel.pause()
+
+    def unpause(self):
+        with self.lock:
+            self.paused = False
+            self.channel.unpause()
+            self.ready.notify()
+
+    def get_busy(self):
+        with self.lock:
+            return self.current is not None and not self.paused
+
+    def set_volume(self, level):
+        """Volume of the playing song, a song fading out keeps its own"""
+        with self.lock:
+            self.level = level
+            if self.current is not None:
+                self.current.level = level
+
+    def close(self):
+        with self.lock:
+            self.running = False
+            self.ready.notify()
+        self.join()
+        self.channel.stop()
+
+    # Mixing
+
+    def fade_out(self, seconds):
+        """Start fading the playing song out, and whatever plays next in"""
+        self.outgoing = self.current
+        self.faded = 0
+        self.fade_frames = max(1, int(seconds * self.rate))
+
+    def take_over(self):
+        """Fade the playing song into the queued one, or end it, once it's time"""
+        current = self.current
+        if current is None:
+            return False
+        due = current.duration > 0 and current.position >= current.duration - self.fade
+        if self.queued is not None and (due or current.ended) and self.outgoing is None:
+            self.fade_out(self.fade)
+            self.current = Stream(self.queued, self.cache, 0.0, self.level)
+            self.queued = None
+            return True
+        if current.ended:
+            self.current = None
+            return True
+        return False
+
+    def decode_ahead(self):
+        """Decode the next chunk of each song that needs one, letting go of the lock
+
+        Called holding the lock. The songs can change while it's let go, so
+        it goes round again until none of the ones playing is short.
+        """
+        while True:
+            short = [stream for stream in (self.current, self.outgoing)
+                     if stream is not None and stream.short()]
+            if not short:
+                return
+            self.lock.release()
+            try:
+                for stream in short:
+                    stream.decode_ahead(self.rate)
+            finally:
+                self.lock.acquire()
+
+    def render(self):
+        """Mix the next block into pcm, False when there's nothing to play
+
+        Called holding the lock, which decode_ahead() lets go of meanwhile.
+        """
+        if self.take_over():
+            pygame.event.post(pygame.event.Event(self.end_event))
+            if self.notify is not None:
+                self.notify()
+        if self.current is None and self.outgoing is None:
+            return False
+        self.decode_ahead()
+        if self.current is None and self.outgoing is None:
+            return False
+
+        mixed = self.incoming_block
+        if self.current is not None:
+            self.current.read_into(mixed, self.rate)
+            mixed *= self.current.level
+        else:
+            mixed[:] = 0
+
+        if self.outgoing is not None:
+            # Equal power: sin for the song coming in, cos for the one going
+            numpy.add(self.ramp, self.faded, out=self.curve)
+            numpy.minimum(self.curve * (numpy.pi / 2 / self.fade_frames), numpy.pi / 2,
+                          out=self.curve)
+            mixed *= numpy.sin(self.curve)[:, None]
+            self.outgoing.read_into(self.outgoing_block, self.rate)
+            self.outgoing_block *= self.outgoing.level
+            self.outgoing_block *= numpy.cos(self.curve)[:, None]
+            mixed += self.outgoing_block
+            self.faded += len(mixed)
+            if self.faded >= self.fade_frames or self.outgoing.ended:
+                self.outgoing = None
+
+        numpy.clip(mixed, -1.0, 1.0, out=mixed)
+        numpy.multiply(mixed, self.full_scale, out=mixed)
+        self.pcm[:] = mixed
+        return True
+
+    def run(self):
+        """Feeder thread: keep a block queued on the channel behind the playing one"""
+        with self.lock:
+            while self.running:
+                if self.paused or self.channel.get_queue() is not None:
+                    self.ready.wait(BLOCK_SECONDS / 4)
+                    continue
+                if not self.render():
+                    self.started = False
+                    self.ready.wait(BLOCK_SECONDS / 4)
+                    continue
+                sound = pygame.sndarray.make_sound(self.pcm)
+                if self.channel.get_busy():
+                    self.channel.queue(sound)
+                else:
+                    if self.started:
+                        # Ran dry while there was something to play
+                        self.underruns += 1
+                    self.channel.play(sound)
+                self.started = True
@@ -0,0 +1,365 @@
+import asyncio
+import os
+import signal
+import time
+import traceback
+from app.application import MP3Player
+from app.perf import StartupTrace, format_phases
+from app.protocol import connect, decode, encode, socket_path
+from app.session import SAVE_INTERVAL
+
+# Least time between order changes sent while the scan is adding tracks
+ORDER_INTERVAL = 0.5
+
+class Daemon:
+    """Runs MP3Player headless and serves it on a Unix socket
+
+    Commands from any number of clients run one at a time on the event loop.
+    After each one, and whenever a worker thread or the track end timer
+    wakes the loop, the player's state is compared with what was last sent
+    and only the keys that changed go out to subscribed clients. The
+    position is only resent when it drifts from what clients work out from
+    the clock.
+    """
+
+    # Drop clients that stop reading rather than buffer for them forever
+    MAX_BUFFER = 4 * 1024 * 1024
+
+    def __init__(self, music_dir, scan_batch=500, scan_delay=0.0, workers=None, path=None,
+                 trace=None, print_trace=False):
+        self.music_dir = music_dir
+        self.scan_batch = scan_batch
+        self.scan_delay = scan_delay
+        self.workers = workers
+        self.path = path or socket_path()
+        self.clients = set()
+        self.connections = set()
+        self.state = {}
+        self.pushed_at = 0.0
+        self.order_version = 0
+        self.order_seen = None
+        self.order_at = 0.0
+        self.order_timer = None
+        self.tags_version = 0
+        self.refresh_pending = False
+        self.tick = None
+        self.autosave = None
+        self.trace = trace or StartupTrace()
+        self.print_trace = print_trace
+        self.visualizer = None
+
+    def run(self):
+        if not self.claim_socket():
+            raise SystemExit(f"pytermusic is already running on {self.path}")
+        asyncio.run(self.serve_forever())
+
+    def claim_socket(self):
+        """Remove a socket left behind by a dead daemon, False if one is alive"""
+        try:
+            connect(self.path, timeout=1.0).close()
+        except OSError:
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+            return True
+        return False
+
+    async def serve_forever(self):
+        self.loop = asyncio.get_running_loop()
+        self.stopped = asyncio.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM, signal.SIGHUP):
+            self.loop.add_signal_handler(signum, self.stopped.set)
+
+        self.player = MP3Player(self.music_dir, self.scan_batch, self.scan_delay, self.wake)
+        self.actions = self.create_actions()
+        self.trace.mark("player")
+        server = await asyncio.start_unix_server(self.serve, self.path)
+        os.chmod(self.path, 0o600)
+        self.refresh()
+        self.save_session()
+        self.trace.mark("listening")
+        if self.print_trace:
+            print(format_phases("Daemon startup", self.trace.phases), flush=True)
+        try:
+            await self.stopped.wait()
+        finally:
+            server.close()
+            for task in list(self.connections):
+                task.cancel()
+            await asyncio.gather(*self.connections)
+            if self.tick is not None:
+                self.tick.cancel()
+            if self.order_timer is not None:
+                self.order_timer.cancel()
+            self.autosave.cancel()
+            os.unlink(self.path)
+            if self.visualizer is not None:
+                self.visualizer.stop()
+            self.player.close()
+            if self.print_trace:
+                print(self.player.cache.stats())
+
+    def create_actions(self):
+        """Commands that change the player, by name"""
+        player = self.player
+
+        def play(message):
+            if "id" in message:
+                player.play_track(message["id"])
+            else:
+                player.play()
+
+        def seek(message):
+            if "percent" in message:
+                player.seek_percent(message["percent"])
+            elif "offset" in message:
+                player.seek_by(message["offset"])
+            else:
+                player.seek(message["position"])
+
+        def reorder(method):
+            def action(message):
+                method(message)
+                # Remembered search results are in the old order
+                player.search.reset()
+            return action
+
+        return {
+            "play": play,
+            "pause": lambda message: player.pause(),
+            "stop": lambda message: player.stop(),
+            "next": lambda message: player.next_song(),
+            "prev": lambda message: player.prev_song(),
+            "seek": seek,
+            "shuffle": lambda message: player.shuffle(),
+            "sort": reorder(lambda message: player.sort(message.get("by"))),
+            "volume_up": lambda message: player.volume_up(),
+            "volume_down": lambda message: player.volume_down(),
+            "enqueue": lambda message: player.addsong(message["id"]),
+            "dequeue": lambda message: player.remove_from_queue(message["index"]),
+            "clear_queue": lambda message: player.clear_queue(),
+            "index": lambda message: player.index_tags(self.workers),
+            "analyze": lambda message: player.analyze_loudness(self.workers),
+            "find_duplicates": lambda message: player.find_duplicates(self.workers),
+            "hide_duplicates": lambda message: player.hide_duplicates(),
+            "prepare_search": lambda message: player.search.build(),
+            "cursor": lambda message: setattr(player, "cursor_id", message["id"]),
+            "save_playlist": lambda message: player.save_playlist(message["name"]),
+            "delete_playlist": lambda message: player.playlists.delete(message["name"]),
+        }
+
+    async def serve(self, reader, writer):
+        """Handle one client connection"""
+        task = asyncio.current_task()
+        self.connections.add(task)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                message = {}
+                try:
+                    message = decode(line)
+                    reply = self.handle(message, writer)
+                except (ValueError, KeyError, TypeError, IndexError, OSError) as e:
+                    # Still answered under its seq, so the sender sees the error
+                    reply = {"error": str(e)}
+                except Exception as e:
+                    # A bug, not a bad command, it goes in the daemon's log
+                    # and the daemon carries on
+                    traceback.print_exc()
+                    reply = {"error": f"{type(e).__name__}: {e}"}
+
+                # Push the state change before the reply, so a client
+                # waiting on the reply already has the new state
+                self.refresh(commanded=True)
+                if "seq" in message:
+                    reply["seq"] = message["seq"]
+                writer.write(encode(reply))
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            # Cancelled means the daemon is shutting down
+            pass
+        finally:
+            self.connections.discard(task)
+            self.clients.discard(writer)
+            writer.close()
+            self.refresh()
+
+    def handle(self, message, writer):
+        """Run one command, returning its reply"""
+        command = message["cmd"]
+        player = self.player
+        if command == "subscribe":
+            self.clients.add(writer)
+            return {"state": self.snapshot()}
+        if command == "status":
+            return {"state": self.snapshot()}
+        if command == "order":
+            return {"order": list(player.library.order), "version": self.order_version,
+                    "groups": player.library.groups()}
+        if command == "titles":
+            titles = [[track_id, player.get_song_title(track_id)] for track_id in message["ids"]
+                      if player.library.path(track_id) is not None]
+            return {"titles": titles}
+        if command == "search":
+            results = player.search.search(message["query"])
+            return {"results": None if results is None else list(results)}
+        if command == "duplicates":
+            return {"groups": player.duplicates or []}
+        if command == "playlists":
+            return {"playlists": player.playlists.names()}
+        if command == "load_playlist":
+            return {"missing": player.load_playlist(message["name"])}
+        if command == "import_playlist":
+            name, count = player.playlists.import_m3u(message["file"], message.get("name"))
+            return {"name": name, "tracks": count}
+        if command == "export_playlist":
+            return {"tracks": player.export_playlist(message["name"], message["file"])}
+        if command == "levels":
+            return {"levels": self.levels(message["id"], message["start"], message["count"])}
+        if command == "startup":
+            return {"phases": self.trace.phases, "later": self.deferred_phases()}
+        if command == "quit":
+            self.stopped.set()
+            return {"ok": True}
+
+        action = self.actions.get(command)
+        if action is None:
+            return {"error": f"unknown command {command}"}
+        action(message)
+        return {"ok": True}
+
+    def levels(self, track_id, start, count):
+        """Analysed level rows of a track as hex, None without NumPy"""
+        if self.visualizer is None:
+            # Started the first time a client shows levels
+            from app.visualizer import Visualizer, numpy
+            if numpy is None:
+                return None
+            self.visualizer = Visualizer(self.player.cache)
+            self.visualizer.start()
+        path = self.player.library.path(track_id)
+        if path is None:
+            return ""
+        duration = self.player.get_tags(track_id).duration
+        return self.visualizer.levels(path, duration, start, count).hex()
+
+    def deferred_phases(self):
+        """Startup work put off until after the socket was listening"""
+        phases = []
+        cache = self.player.cache
+        if cache.load_time is not None:
+            phases.append(("cache rows (background)", cache.load_time))
+        if self.player.mixer_startup is not None:
+            phases.append(("mixer (first play)", self.player.mixer_startup))
+        return phases
+
+    def save_session(self):
+        """Save the session every SAVE_INTERVAL seconds, on top of on the way out"""
+        self.player.save_session()
+        self.autosave = self.loop.call_later(SAVE_INTERVAL, self.save_session)
+
+    def wake(self):
+        """Called from worker threads when they have something for the player"""
+        self.loop.call_soon_threadsafe(self.schedule_refresh)
+
+    def schedule_refresh(self):
+        if not self.refresh_pending:
+            self.refresh_pending = True
+            self.loop.call_soon(self.refresh)
+
+    def refresh(self, commanded=False):
+        """Catch the player up with its workers and tell clients what changed
+
+        commanded is True after a client's command, whose effect on the
+        order goes out at once.
+        """
+        self.refresh_pending = False
+        player = self.player
+        player.poll_scan()
+        changed = player.poll_changes() is not None
+        player.poll_analysis()
+        player.poll_duplicates()
+        if player.poll_index() or changed:
+            self.tags_version += 1
+        player.update_position()
+
+        seen = (player.library, player.library.version)
+        if seen != self.order_seen:
+            wait = self.order_at + ORDER_INTERVAL - time.monotonic()
+            if player.scanning and not commanded and wait > 0:
+                # Every scan batch changes the order, and clients fetch all
+                # of it after each change
+                if self.order_timer is None:
+                    self.order_timer = self.loop.call_later(wait, self.send_order)
+            else:
+                self.order_seen = seen
+                self.order_version += 1
+                self.order_at = time.monotonic()
+        self.push()
+
+        # Wake up for the end of the song
+        if self.tick is not None:
+            self.tick.cancel()
+            self.tick = None
+        if player.is_playing:
+            remaining = player.time_remaining() if player.song_length > 0 else 1.0
+            self.tick = self.loop.call_later(min(max(remaining, 0.05), 1.0), self.schedule_refresh)
+
+    def send_order(self):
+        self.order_timer = None
+        self.schedule_refresh()
+
+    def snapshot(self):
+        player = self.player
+        tags = player.get_current_song_info()
+        return {
+            "current": player.current_id,
+            "title": player.get_song_title(player.current_id) if tags else None,
+            "artist": tags.artist if tags else None,
+            "album": tags.album if tags else None,
+            "playing": player.is_playing,
+            "paused": player.paused,
+            "length": player.song_length,
+            "position": round(player.song_position, 2),
+            "volume": player.current_volume,
+            "gain": None if player.gain_db is None else round(player.gain_db, 1),
+            "queue": list(player.queue),
+            "tracks": len(player.library),
+            "order": self.order_version,
+            "sort": player.library.sorted_by,
+            "shuffle": player.shuffling,
+            "tags": self.tags_version,
+            "scanning": player.scanning,
+            "indexing": player.indexer.progress() if player.indexing else None,
+            "analyzing": player.analyzer.progress() if player.analyzing else None,
+            "finding": player.finder.progress() if player.finding_duplicates else None,
+            "duplicates": None if player.duplicates is None else len(player.duplicates),
+            "hiding": player.hiding_duplicates,
+            "cursor": player.cursor_id,
+            "cache": [player.cache.hits, player.cache.misses],
+            "clients": len(self.clients),
+        }
+
+    def push(self):
+        """Send subscribed clients whatever changed since the last push"""
+        snapshot = self.snapshot()
+        changed = {key: value for key, value in snapshot.items()
+                   if key != "position" and self.state.get(key) != value}
+        now = time.monotonic()
+        expected = self.state.get("position", 0.0)
+        if self.state.get("playing"):
+            expected += now - self.pushed_at
+        if not changed and abs(snapshot["position"] - expected) < 0.5:
+            return
+
+        changed["position"] = snapshot["position"]
+        self.state = snapshot
+        self.pushed_at = now
+        message = encode({"state": changed})
+        for writer in list(self.clients):
+            if writer.transport.get_write_buffer_size() > self.MAX_BUFFER:
+                self.clients.discard(writer)
+                writer.close()
+            else:
+                writer.write(message)
@@ -0,0 +1,51 @@
+import io
+import pygame
+from app.mp3info import seek_offset
+
+try:
+    import numpy
+    import pygame.sndarray
+except ImportError:
+    numpy = None
+
+# Decoded ahead of the start and thrown away, the decoder needs a frame or
+# two to settle after starting mid-stream
+LEAD_SECONDS = 0.1
+
+# An empty ID3v2 tag with a little padding, so the decoder recognises a bare
+# run of frames as MP3
+EMPTY_TAG = b"ID3\x03\x00\x00\x00\x00\x02\x00" + bytes(256)
+
+def decode(path, index, start, seconds):
+    """Decode `seconds` of a track from `start` on, as float samples per channel
+
+    Only the frames covering that span are read, found through the track's
+    seek index. Returns (samples, rate), samples shaped (frames, channels)
+    and scaled to -1..1.
+    """
+    offset, at = seek_offset(path, index, max(0.0, start - LEAD_SECONDS))
+    end, _ = seek_offset(path, index, start + seconds + LEAD_SECONDS)
+    rate, _, channels = pygame.mixer.get_init()
+    if end <= offset:
+        # Past the last frame
+        return numpy.zeros((0, channels)), rate
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read(max(end - offset, 0) + 4096)
+    sound = pygame.mixer.Sound(file=io.BytesIO(EMPTY_TAG + data))
+    # at is where the frame at offset really starts, seek_offset() counts
+    # the frames up to it
+    skip = max(0, int(round((start - at) * rate)))
+    return scale(pygame.sndarray.array(sound)[skip:skip + int(round(seconds * rate))]), rate
+
+def decode_file(path):
+    """Decode a whole track, for files without a seek index"""
+    sound = pygame.mixer.Sound(file=path)
+    return scale(pygame.sndarray.array(sound)), pygame.mixer.get_init()[0]
+
+def scale(samples):
+    if samples.ndim == 1:
+        samples = samples[:, None]
+    if samples.dtype.kind == "i":
+        return samples / numpy.iinfo(samples.dtype).max
+    return samples.astype(float)
@@ -0,0 +1,105 @@
+import hashlib
+import mmap
+import os
+from app.indexer import BulkIndexer
+from app.mp3info import Unusual, audio_span
+
+def read_span(path):
+    """(size, mtime, audio start, audio end) of a file, reading only its tag headers"""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        st = os.fstat(fd)
+        return (st.st_size, st.st_mtime_ns) + audio_span(fd, st.st_size)
+    finally:
+        os.close(fd)
+
+def hash_audio(path):
+    """(audio size, digest) of the MPEG frames of a file, its tags left out"""
+    with open(path, "rb") as f:
+        start, end = audio_span(f.fileno(), os.fstat(f.fileno()).st_size)
+        digest = hashlib.blake2b(digest_size=16)
+        if end > start:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                if hasattr(mmap, "MADV_SEQUENTIAL"):
+                    data.madvise(mmap.MADV_SEQUENTIAL)
+                with memoryview(data) as view, view[start:end] as audio:
+                    digest.update(audio)
+        return end - start, digest.hexdigest()
+
+def hash_files(paths):
+    """Worker process: hash the audio of a chunk of files"""
+    rows = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        try:
+            result = hash_audio(path)
+        except (OSError, ValueError, Unusual):
+            result = DuplicateFinder.UNREADABLE
+        rows.append((path, st.st_size, st.st_mtime_ns, result))
+    return rows
+
+class DuplicateFinder(BulkIndexer):
+    """Find files holding the same audio under different paths and tags
+
+    A first pass reads only the tag headers at either end of each file to
+    learn the size of the audio between them. Only files sharing that size
+    with another can be copies, and only those are hashed, by BulkIndexer's
+    process pool mapping each file and hashing its frames. Sizes and hashes
+    are kept in the cache, so a rerun only reads new and changed files.
+    """
+
+    work = staticmethod(hash_files)
+    UNREADABLE = (0, "")
+
+    def __init__(self, paths, cache, workers=None, notify=None):
+        super().__init__(paths, cache, workers, chunk_size=16, notify=notify)
+
+    def run(self):
+        self.paths = self.candidates()
+        super().run()
+
+    def candidates(self):
+        """Paths whose audio is the same size as another's"""
+        by_size = {}
+        rows = []
+        for path in self.paths:
+            if self.cancelled.is_set():
+                return []
+            known = self.cache.get_audio_hash(path)
+            if known is None:
+                try:
+                    size, mtime, start, end = read_span(path)
+                except (OSError, Unusual):
+                    continue
+                known = (end - start, None)
+                rows.append((path, size, mtime, known))
+            if known[0]:
+                by_size.setdefault(known[0], []).append(path)
+        if rows:
+            self.cache.store_audio_hashes(rows)
+        return [path for paths in by_size.values() if len(paths) > 1 for path in paths]
+
+    def progress(self):
+        """Progress as text, e.g. 'hashing 40/100 (40%)'"""
+        if self.running and not self.total:
+            return "comparing sizes"
+        return "hashing " + super().progress()
+
+    def fresh(self, path):
+        known = self.cache.get_audio_hash(path)
+        return known is not None and known[1] is not None
+
+    def save(self, rows):
+        self.cache.store_audio_hashes(rows)
+
+    def duplicates(self):
+        """Lists of paths with the same audio, each in path order, once finished"""
+        groups = {}
+        for path in self.paths:
+            known = self.cache.get_audio_hash(path)
+            if known is not None and known[1]:
+                groups.setdefault(known, []).append(path)
+        return sorted(sorted(paths) for paths in groups.values() if len(paths) > 1)
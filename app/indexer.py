@@ -0,0 +1,158 @@
+import os
+import signal
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from app.cache import EMPTY_TAGS, Tags, read_tags
+
+def ignore_interrupts():
+    """Worker initializer, Ctrl-C is handled by the parent"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+def extract(paths):
+    """Worker process: stat and parse a chunk of files
+
+    A file mutagen can't make sense of gets empty tags, it never takes the
+    rest of the chunk down with it.
+    """
+    rows = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        try:
+            tags = read_tags(path)
+        except Exception:
+            tags = EMPTY_TAGS
+        rows.append((path, st.st_size, st.st_mtime_ns, tuple(tags)))
+    return rows
+
+class BulkIndexer(threading.Thread):
+    """Read the tags of many files in a process pool
+
+    Paths whose cached tags are still fresh are skipped, so an interrupted
+    run picks up where it left off. Chunks go out to the workers, and each
+    chunk's results are written to the cache in one transaction as they come
+    back. If a file crashes a worker outright, its chunk is retried one file
+    at a time and the culprit is stored with empty tags.
+
+    Subclasses run other per-file jobs the same way by overriding work,
+    fresh, save and UNREADABLE.
+    """
+
+    work = staticmethod(extract)
+    UNREADABLE = tuple(EMPTY_TAGS)
+
+    def __init__(self, paths, cache, workers=None, chunk_size=256, notify=None):
+        super().__init__(daemon=True)
+        self.paths = paths
+        self.cache = cache
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.notify = notify
+        self.total = 0
+        self.done = 0
+        self.failed = 0
+        self.finished = threading.Event()
+        self.cancelled = threading.Event()
+
+    def run(self):
+        try:
+            todo = [path for path in self.paths if not self.fresh(path)]
+            self.total = len(todo)
+            chunks = [(todo[i:i + self.chunk_size], False)
+                      for i in range(0, len(todo), self.chunk_size)]
+            chunks.reverse()
+            if chunks:
+                self.process(chunks)
+        finally:
+            self.finished.set()
+            self.ping()
+
+    def process(self, chunks):
+        pool = self.new_pool()
+        pending = {}
+        try:
+            while not self.cancelled.is_set():
+                # Keep every worker busy without queueing the whole library
+                broken = False
+                while chunks and len(pending) < self.workers * 2:
+                    chunk = chunks.pop()
+                    try:
+                        pending[pool.submit(self.work, chunk[0])] = chunk
+                    except BrokenProcessPool:
+                        chunks.append(chunk)
+                        broken = True
+                        break
+                if not pending and not broken:
+                    return
+
+                done, _ = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                for future in done:
+                    paths, retried = pending.pop(future)
+                    try:
+                        rows = future.result()
+                    except BrokenProcessPool:
+                        broken = True
+                        self.retry(chunks, paths, retried)
+                        continue
+                    self.save(rows)
+                    self.done += len(paths)
+                    self.ping()
+
+                if broken:
+                    # Everything still pending died with the pool
+                    for paths, retried in pending.values():
+                        self.retry(chunks, paths, retried)
+                    pending.clear()
+                    pool.shutdown(wait=False)
+                    pool = self.new_pool()
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def retry(self, chunks, paths, retried):
+        """Send a chunk lost to a crashed worker again, one file at a time"""
+        if len(paths) == 1 and retried:
+            self.give_up(paths[0])
+        else:
+            chunks.extend(([path], True) for path in paths)
+
+    def new_pool(self):
+        return ProcessPoolExecutor(self.workers, initializer=ignore_interrupts)
+
+    def fresh(self, path):
+        return self.cache.fresh(path)
+
+    def save(self, rows):
+        """Store a chunk's (path, size, mtime, result) rows from a worker"""
+        self.cache.store_many([(path, size, mtime, Tags(*tags))
+                               for path, size, mtime, tags in rows])
+
+    def give_up(self, path):
+        """Cache an empty result for a file that keeps crashing workers"""
+        try:
+            st = os.stat(path)
+        except OSError:
+            pass
+        else:
+            self.save([(path, st.st_size, st.st_mtime_ns, self.UNREADABLE)])
+        self.failed += 1
+        self.done += 1
+        self.ping()
+
+    def ping(self):
+        if self.notify is not None:
+            self.notify()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    @property
+    def running(self):
+        return not self.finished.is_set()
+
+    def progress(self):
+        """Progress as text, e.g. '1200/3000 (40%)'"""
+        percent = self.done / self.total * 100 if self.total else 100.0
+        return f"{self.done}/{self.total} ({percent:.0f}%)"
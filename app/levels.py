@@ -0,0 +1,88 @@
+import time
+from collections import deque
+
+# Level frames per second, spectrum bands, and bytes per frame (the overall
+# level, then one byte per band)
+FPS = 20
+BANDS = 16
+ROW = 1 + BANDS
+
+# Quietest level shown, 0 in a frame, loudest is 0 dB at 255
+FLOOR_DB = -70.0
+
+BLOCKS = " ▁▂▃▄▅▆▇█"
+
+class LevelFeed:
+    """Level frames of the playing track for the visualizer
+
+    Frames are fetched from the daemon a few seconds at a time into a ring
+    buffer ahead of the playback position, so drawing a frame only reads
+    it. The analysis itself runs in the daemon.
+    """
+
+    AHEAD = FPS
+    BATCH = 3 * FPS
+    RETRY = 0.25
+
+    def __init__(self, fetch, capacity=10 * FPS):
+        self.fetch = fetch
+        self.track_id = None
+        self.start = 0
+        self.frames = deque(maxlen=capacity)
+        self.retry_at = 0.0
+
+    def covers(self, track_id, frame):
+        return track_id == self.track_id and self.start <= frame < self.start + len(self.frames)
+
+    def frame(self, track_id, position):
+        """Levels at position seconds, or None until the daemon has them"""
+        frame = int(position * FPS)
+        if not self.covers(track_id, frame + self.AHEAD) and time.monotonic() >= self.retry_at:
+            if self.covers(track_id, frame):
+                start = self.start + len(self.frames)
+            else:
+                start = frame
+            rows = self.fetch(track_id, start, self.BATCH)
+            if rows:
+                self.fill(track_id, start, rows)
+            else:
+                self.retry_at = time.monotonic() + self.RETRY
+        if self.covers(track_id, frame):
+            return self.frames[frame - self.start]
+        return None
+
+    def fill(self, track_id, start, rows):
+        if track_id != self.track_id or start != self.start + len(self.frames):
+            self.track_id = track_id
+            self.start = start
+            self.frames.clear()
+        for i in range(0, len(rows) - ROW + 1, ROW):
+            if len(self.frames) == self.frames.maxlen:
+                self.start += 1
+            self.frames.append(rows[i:i + ROW])
+
+def spectrum_lines(row, height, bar=2, gap=1):
+    """Rows of text drawing a frame's bands as bars, top row first"""
+    levels = row[1:] if row is not None else bytes(BANDS)
+    # Eighths of a row filled by each bar
+    filled = [level * height * 8 // 255 for level in levels]
+    lines = []
+    for y in range(height - 1, -1, -1):
+        cells = []
+        for amount in filled:
+            block = BLOCKS[max(0, min(8, amount - y * 8))]
+            cells.append(block * bar)
+        lines.append((" " * gap).join(cells))
+    return lines
+
+def level_meter(row, width):
+    """The overall level as a bar, with its value in dB"""
+    level = row[0] if row is not None else 0
+    db = FLOOR_DB - level * FLOOR_DB / 255
+    label = f" {db:4.0f} dB" if level else "   - dB"
+    bar_width = width - len(label)
+    eighths = level * bar_width * 8 // 255
+    bar = "█" * (eighths // 8)
+    if len(bar) < bar_width:
+        bar += BLOCKS[eighths % 8]
+    return bar.ljust(bar_width) + label
@@ -0,0 +1,525 @@
+import os
+import random
+import re
+import unicodedata
+from array import array
+from bisect import bisect_left
+from itertools import chain
+from app.cache import Tags
+
+# positions[] value for a removed track
+NO_POSITION = 0xFFFFFFFF
+
+# track_dirs[] value for a removed track
+NO_DIR = 0xFFFFFFFF
+
+# Browse orders the list can be sorted in, 1 steps through them
+SORT_ORDERS = ("path", "artist", "albumartist", "duration", "added")
+
+# Orders that keep albums together, the list shows a header above each one
+GROUPED_ORDERS = ("artist", "albumartist")
+
+DIGITS = re.compile(r"(\d+)")
+
+def collation_key(name):
+    """Sort key for a tag value
+
+    Case and accents are folded, a leading "The" is dropped and runs of
+    digits compare as numbers, so "the Beatles" sits with "Beatles" and
+    "Disc 10" comes after "Disc 9". Missing values sort last.
+    """
+    if not name:
+        return (1,)
+    text = unicodedata.normalize("NFKD", name.casefold())
+    text = "".join(c for c in text if not unicodedata.combining(c)).strip()
+    if text.startswith("the ") and len(text) > 4:
+        text = text[4:]
+    parts = DIGITS.split(text)
+    parts[1::2] = [int(part) for part in parts[1::2]]
+    return (0, *parts)
+
+def split_path(path):
+    """('/music/Artist/Album/', '01 Song.mp3')"""
+    directory, sep, name = path.rpartition(os.sep)
+    return directory + sep, name
+
+class Library:
+    """Columnar track store addressed by permanent integer track IDs
+
+    A track's ID is its index into the column arrays and never changes, so
+    IDs held by the queue, history or UI keep pointing at the same song.
+    Removing a track leaves a hole instead of renumbering. Artist and album
+    names are interned once and stored as small integers. `order` is the
+    browse order, a permutation of the live IDs, with `positions` as its
+    inverse. `version` goes up whenever the browse order changes.
+
+    Each interned name gets its collation key once, when it's first seen.
+    Sorting ranks the names by those keys and then compares small integers
+    per track, never the tags themselves.
+
+    Hidden tracks, like all but one copy of a duplicate, keep their IDs and
+    paths but are left out of the browse order as if they'd been removed.
+
+    Paths are never stored whole. Each directory is kept once, and a track
+    is its directory's ID and its file name, with the path put back
+    together when something asks for it. The file names are encoded one
+    after the other in a single bytearray, found by offset and length, and
+    a path is looked up through an open addressing hash table of track IDs
+    rather than a dict, so a track costs a few array slots and no Python
+    objects of its own.
+    """
+
+    def __init__(self):
+        self.dirs = []
+        self.dir_ids = {}
+        self.dir_files = []
+        self.dir_ranks = None
+        self.track_dirs = array("I")
+        self.file_names = bytearray()
+        self.file_starts = array("I")
+        self.file_lengths = array("H")
+        # Low 32 bits of each track's hash((directory ID, file name))
+        self.file_hashes = array("I")
+        # Track ID + 1 per slot, 0 for an empty one. Slots of renamed or
+        # removed tracks stay until the table grows and are skipped.
+        self.slots = array("I", bytes(4 * 8))
+        self.slots_used = 0
+        self.titles = []
+        self.artists = array("I")
+        self.albums = array("I")
+        self.tracknumbers = array("H")
+        self.durations = array("f")
+        self.albumartists = array("I")
+        self.discnumbers = array("H")
+        self.added = array("q")
+        self.loaded = bytearray()
+        self.hidden = bytearray()
+        self.names = [None]
+        self.name_ids = {None: 0}
+        self.name_keys = [collation_key(None)]
+        self.name_ranks = None
+        self.order = array("I")
+        self.positions = array("I")
+        self.id_ordered = True
+        self.sorted_by = None
+        self.orders = {}
+        self.version = 0
+
+    def __len__(self):
+        return len(self.order)
+
+    def __contains__(self, path):
+        return self.id_for(path) is not None
+
+    def split(self, path):
+        """(directory ID, file name) of a path, adding the directory if it's new"""
+        directory, name = split_path(path)
+        dir_id = self.dir_ids.get(directory)
+        if dir_id is None:
+            dir_id = len(self.dirs)
+            self.dirs.append(directory)
+            self.dir_ids[directory] = dir_id
+            self.dir_files.append(array("I"))
+            self.dir_ranks = None
+        return dir_id, name
+
+    def lookup(self, dir_id, name):
+        """(track ID or None, hash) of an encoded file name in a directory"""
+        hashed = hash((dir_id, name)) & 0xFFFFFFFF
+        slots = self.slots
+        hashes = self.file_hashes
+        mask = len(slots) - 1
+        slot = hashed & mask
+        while True:
+            entry = slots[slot]
+            if not entry:
+                return None, hashed
+            track_id = entry - 1
+            if (hashes[track_id] == hashed and self.track_dirs[track_id] == dir_id
+                    and self.file_lengths[track_id] == len(name)):
+                start = self.file_starts[track_id]
+                if self.file_names[start:start + len(name)] == name:
+                    return track_id, hashed
+            slot = (slot + 1) & mask
+
+    def index(self, track_id):
+        """Give a track with a new name a slot, making more room first if need be"""
+        self.slots_used += 1
+        slots = self.slots
+        if 2 * self.slots_used > len(slots):
+            self.rehash()
+            return
+        mask = len(slots) - 1
+        slot = self.file_hashes[track_id] & mask
+        while slots[slot]:
+            slot = (slot + 1) & mask
+        slots[slot] = track_id + 1
+
+    def rehash(self):
+        """Rebuild the slots with room for as many tracks again, dropping stale ones"""
+        track_dirs = self.track_dirs
+        live = [track_id for track_id in range(self.id_limit) if track_dirs[track_id] != NO_DIR]
+        size = 8
+        while size < 4 * len(live):
+            size *= 2
+        slots = self.slots = array("I", bytes(4 * size))
+        self.slots_used = len(live)
+        mask = size - 1
+        hashes = self.file_hashes
+        for track_id in live:
+            slot = hashes[track_id] & mask
+            while slots[slot]:
+                slot = (slot + 1) & mask
+            slots[slot] = track_id + 1
+
+    def file_name(self, track_id):
+        """A track's encoded file name"""
+        start = self.file_starts[track_id]
+        return self.file_names[start:start + self.file_lengths[track_id]]
+
+    def add(self, path):
+        """Add a track to the end of the browse order, returning its ID"""
+        dir_id, name = self.split(path)
+        name = name.encode("utf-8", "surrogateescape")
+        track_id, hashed = self.lookup(dir_id, name)
+        if track_id is not None:
+            return track_id
+        track_id = len(self.track_dirs)
+        self.track_dirs.append(dir_id)
+        self.file_starts.append(len(self.file_names))
+        self.file_lengths.append(len(name))
+        self.file_hashes.append(hashed)
+        self.file_names += name
+        self.dir_files[dir_id].append(track_id)
+        self.index(track_id)
+        self.titles.append(None)
+        self.artists.append(0)
+        self.albums.append(0)
+        self.tracknumbers.append(0)
+        self.durations.append(0.0)
+        self.albumartists.append(0)
+        self.discnumbers.append(0)
+        self.added.append(0)
+        self.loaded.append(0)
+        self.hidden.append(0)
+        self.positions.append(len(self.order))
+        self.order.append(track_id)
+        self.orders.clear()
+        self.version += 1
+        return track_id
+
+    def remove(self, paths, track_ids=()):
+        """Drop tracks, returning the sorted browse positions they had
+
+        track_ids are dropped as well, for tracks already unlink()ed.
+        """
+        removed = []
+        for track_id in chain(map(self.unlink, paths), track_ids):
+            if track_id is None:
+                continue
+            if self.positions[track_id] != NO_POSITION:
+                removed.append(self.positions[track_id])
+            self.positions[track_id] = NO_POSITION
+            self.hidden[track_id] = 0
+            self.titles[track_id] = None
+        if not removed:
+            return removed
+        removed.sort()
+        self.orders.clear()
+        self.version += 1
+
+        # Compact the browse order from the first hole onwards
+        first = removed[0]
+        tail = array("I", (track_id for track_id in self.order[first:]
+                           if self.positions[track_id] != NO_POSITION))
+        del self.order[first:]
+        self.order.extend(tail)
+        for position in range(first, len(self.order)):
+            self.positions[self.order[position]] = position
+        return removed
+
+    def set_hidden(self, track_ids):
+        """Hide exactly these tracks from the browse order, showing any others
+
+        Tracks shown again go back where the current sort puts them, or at
+        the end. Returns False if nothing changed.
+        """
+        hidden = bytearray(self.id_limit)
+        for track_id in track_ids:
+            if self.track_dirs[track_id] != NO_DIR:
+                hidden[track_id] = 1
+        if hidden == self.hidden:
+            return False
+        shown = [track_id for track_id in range(self.id_limit)
+                 if self.hidden[track_id] and not hidden[track_id]]
+        self.hidden = hidden
+        for track_id in range(self.id_limit):
+            if hidden[track_id]:
+                self.positions[track_id] = NO_POSITION
+        self.orders.clear()
+        if self.sorted_by is not None:
+            self.set_order(self.sorted_ids(self.sorted_by))
+        else:
+            self.set_order([track_id for track_id in self.order if not hidden[track_id]] + shown)
+        return True
+
+    def unlink(self, path):
+        """Take a path out of its directory, returning the track ID it had
+
+        The track has no path from then on, until it's linked again.
+        """
+        track_id = self.id_for(path)
+        if track_id is None:
+            return None
+        self.dir_files[self.track_dirs[track_id]].remove(track_id)
+        self.track_dirs[track_id] = NO_DIR
+        return track_id
+
+    def rename(self, old, new):
+        """Point a track at a new path, keeping its ID and position
+
+        The new name goes on the end of file_names, the old one is left
+        where it was.
+        """
+        track_id = self.unlink(old)
+        if track_id is None:
+            return None
+        dir_id, name = self.split(new)
+        name = name.encode("utf-8", "surrogateescape")
+        existing, hashed = self.lookup(dir_id, name)
+        if existing is not None:
+            # Renamed over another track, which keeps its path but can no
+            # longer be found by it
+            self.dir_files[dir_id].remove(existing)
+            self.file_hashes[existing] ^= 1
+        self.track_dirs[track_id] = dir_id
+        self.file_starts[track_id] = len(self.file_names)
+        self.file_lengths[track_id] = len(name)
+        self.file_hashes[track_id] = hashed
+        self.file_names += name
+        self.dir_files[dir_id].append(track_id)
+        self.index(track_id)
+        self.orders.clear()
+        return track_id
+
+    def intern(self, name):
+        name_id = self.name_ids.get(name)
+        if name_id is None:
+            name_id = len(self.names)
+            self.names.append(name)
+            self.name_ids[name] = name_id
+            self.name_keys.append(collation_key(name))
+            self.name_ranks = None
+        return name_id
+
+    def set_tags(self, track_id, tags, added=0):
+        """Fill in a track's columns, added being its file's mtime in ns"""
+        self.titles[track_id] = tags.title
+        self.artists[track_id] = self.intern(tags.artist)
+        self.albums[track_id] = self.intern(tags.album)
+        # Unsigned 16 bit columns, a negative or huge number would overflow them
+        self.tracknumbers[track_id] = max(0, min(tags.tracknumber or 0, 0xFFFF))
+        self.durations[track_id] = tags.duration or 0.0
+        self.albumartists[track_id] = self.intern(tags.albumartist)
+        self.discnumbers[track_id] = max(0, min(tags.discnumber or 0, 0xFFFF))
+        self.added[track_id] = added
+        self.loaded[track_id] = 1
+
+    def forget_tags(self, track_id):
+        """Mark a track's columns stale so they are reloaded"""
+        self.loaded[track_id] = 0
+        self.orders.clear()
+
+    def has_tags(self, track_id):
+        return bool(self.loaded[track_id])
+
+    def tags(self, track_id):
+        return Tags(
+            self.titles[track_id],
+            self.names[self.artists[track_id]],
+            self.names[self.albums[track_id]],
+            self.tracknumbers[track_id] or None,
+            self.durations[track_id],
+            self.names[self.albumartists[track_id]],
+            self.discnumbers[track_id] or None,
+        )
+
+    def path(self, track_id):
+        """A track's full path, or None if it was removed"""
+        dir_id = self.track_dirs[track_id]
+        if dir_id == NO_DIR:
+            return None
+        return self.dirs[dir_id] + self.file_name(track_id).decode("utf-8", "surrogateescape")
+
+    def paths(self):
+        """Full paths of the live tracks, in ID order"""
+        for track_id in range(self.id_limit):
+            if self.track_dirs[track_id] != NO_DIR:
+                yield self.path(track_id)
+
+    @property
+    def id_limit(self):
+        """One past the highest track ID handed out"""
+        return len(self.track_dirs)
+
+    def id_for(self, path):
+        return self.id_in(*split_path(path))
+
+    def id_in(self, directory, name):
+        """Track ID of a file name in a directory as split_path() gives it"""
+        dir_id = self.dir_ids.get(directory)
+        if dir_id is None:
+            return None
+        return self.lookup(dir_id, name.encode("utf-8", "surrogateescape"))[0]
+
+    def ids_under(self, directory):
+        """Track IDs of the files in a directory and every directory below it"""
+        prefix = os.path.join(directory, "")
+        return [track_id for dir_id, path in enumerate(self.dirs) if path.startswith(prefix)
+                for track_id in self.dir_files[dir_id]]
+
+    def id_at(self, position):
+        """Track ID at a browse position"""
+        return self.order[position]
+
+    def position(self, track_id):
+        """Browse position of a track, or None if it was removed"""
+        position = self.positions[track_id]
+        return None if position == NO_POSITION else position
+
+    def set_order(self, ids):
+        """Replace the browse order with a permutation of the live IDs"""
+        self.order = array("I", ids)
+        self.version += 1
+        for position, track_id in enumerate(self.order):
+            self.positions[track_id] = position
+
+        # Lets callers sort by ID instead of looking up positions
+        self.id_ordered = all(a < b for a, b in zip(self.order, self.order[1:]))
+
+    def sort(self, by="path"):
+        """Order tracks by one of SORT_ORDERS
+
+        Each order is worked out once and kept as a permutation until tracks
+        are added, removed, renamed or retagged. Orders other than path read
+        the tag columns, so every track's tags should be loaded first.
+        """
+        order = self.orders.get(by)
+        if order is None:
+            order = self.orders[by] = array("I", self.sorted_ids(by))
+        self.set_order(order)
+        self.sorted_by = by
+
+    def sorted_ids(self, by):
+        """Live track IDs in a SORT_ORDERS order, ties kept in path order"""
+        if by not in SORT_ORDERS:
+            raise ValueError(f"unknown sort order {by}")
+        ids = self.orders.get("path")
+        if ids is None:
+            ids = self.orders["path"] = array("I", self.path_order())
+        if by == "path":
+            return ids
+
+        path_ranks = array("I", bytes(4 * self.id_limit))
+        for rank, track_id in enumerate(ids):
+            path_ranks[track_id] = rank
+        ranks = self.collation_ranks()
+        artists, albums, albumartists = self.artists, self.albums, self.albumartists
+        discs, numbers = self.discnumbers, self.tracknumbers
+        if by == "artist":
+            def key(t):
+                return ranks[artists[t]], ranks[albums[t]], discs[t], numbers[t], path_ranks[t]
+        elif by == "albumartist":
+            def key(t):
+                return (ranks[albumartists[t] or artists[t]], ranks[albums[t]], discs[t],
+                        numbers[t], path_ranks[t])
+        elif by == "duration":
+            durations = self.durations
+
+            def key(t):
+                return durations[t], path_ranks[t]
+        else:
+            # Newest first
+            added = self.added
+
+            def key(t):
+                return -added[t], path_ranks[t]
+        return sorted(ids, key=key)
+
+    def path_order(self):
+        """Track IDs by directory, then file name
+
+        Directories are ranked once, each file name is only compared with
+        the others in its directory.
+        """
+        if self.dir_ranks is None:
+            self.dir_ranks = sorted(range(len(self.dirs)), key=self.dirs.__getitem__)
+        # Every name cut out of file_names once, UTF-8 bytes sort in the same
+        # order as the names they encode
+        names = self.file_names
+        keys = [names[start:start + length]
+                for start, length in zip(self.file_starts, self.file_lengths)]
+        by_name = keys.__getitem__
+        order = []
+        for dir_id in self.dir_ranks:
+            order.extend(sorted(self.dir_files[dir_id], key=by_name))
+        hidden = self.hidden
+        if 1 in hidden:
+            order = [track_id for track_id in order if not hidden[track_id]]
+        return order
+
+    def collation_ranks(self):
+        """Each interned name's place in collation order, by name ID
+
+        Names that collate the same, like "The Beatles" and "beatles", share
+        a rank.
+        """
+        if self.name_ranks is None:
+            ranks = array("I", bytes(4 * len(self.names)))
+            rank = -1
+            last = None
+            for name_id in sorted(range(len(self.names)), key=self.name_keys.__getitem__):
+                if self.name_keys[name_id] != last:
+                    last = self.name_keys[name_id]
+                    rank += 1
+                ranks[name_id] = rank
+            self.name_ranks = ranks
+        return self.name_ranks
+
+    def groups(self):
+        """(browse position, "Artist - Album") where each album starts
+
+        Empty unless the list is sorted by artist or album artist.
+        """
+        if self.sorted_by not in GROUPED_ORDERS:
+            return []
+        by_albumartist = self.sorted_by == "albumartist"
+        ranks = self.collation_ranks()
+        groups = []
+        last = None
+        for position, track_id in enumerate(self.order):
+            artist = self.artists[track_id]
+            if by_albumartist:
+                artist = self.albumartists[track_id] or artist
+            album = self.albums[track_id]
+            group = (ranks[artist], ranks[album])
+            if group != last:
+                last = group
+                groups.append((position, f"{self.names[artist] or 'Unknown artist'} - "
+                                         f"{self.names[album] or 'Unknown album'}"))
+        return groups
+
+    def shuffle(self):
+        """Order tracks randomly"""
+        ids = list(self.order)
+        random.shuffle(ids)
+        self.set_order(ids)
+        self.sorted_by = None
+
+    @staticmethod
+    def remapper(removed, size):
+        """Map browse positions from before a remove() to after it"""
+        def remap(position):
+            position -= bisect_left(removed, position)
+            return max(0, min(position, size - 1))
+        return remap
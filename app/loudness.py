@@ -0,0 +1,185 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+import mutagen
+import pygame
+from mutagen.id3 import ID3
+from app.decode import decode, decode_file, numpy
+from app.indexer import BulkIndexer, ignore_interrupts
+from app.mp3info import build_seek_index
+
+# ReplayGain 2.0 reference level in LUFS, tracks are turned up or down to it
+TARGET_LUFS = -18.0
+
+# Seconds decoded at a time, which bounds the memory a long mix needs
+CHUNK_SECONDS = 30
+
+# ITU-R BS.1770 gating: 400 ms blocks every 100 ms, dropping blocks below
+# -70 LUFS and then those 10 LU under the loudness of what's left
+STEP_SECONDS = 0.1
+BLOCK_STEPS = 4
+ABSOLUTE_GATE = -70.0
+RELATIVE_GATE = -10.0
+
+def parse_gain(text):
+    """Turn '-6.20 dB' into -6.2"""
+    return float(text.split()[0])
+
+def read_replaygain(path):
+    """(gain in dB, peak) from a file's ReplayGain tags, or None if it has none"""
+    try:
+        tags = ID3(path)
+    except (mutagen.MutagenError, OSError):
+        return None
+    values = {frame.desc.lower(): frame.text[0] for frame in tags.getall("TXXX") if frame.text}
+    try:
+        if "replaygain_track_gain" in values:
+            return (parse_gain(values["replaygain_track_gain"]),
+                    float(values.get("replaygain_track_peak", 0.0)) or None)
+    except ValueError:
+        pass
+    for frame in tags.getall("RVA2"):
+        if frame.desc.lower() == "track" and frame.channel == 1:
+            return frame.gain, frame.peak or None
+    return None
+
+def k_weighting(size, rate, weights={}):
+    """Power gain of the BS.1770 K-weighting filter at each rfft bin, made once"""
+    if (size, rate) not in weights:
+        z = numpy.exp(-2j * numpy.pi * numpy.arange(size // 2 + 1) / size)
+
+        def biquad(b, a):
+            return (b[0] + b[1] * z + b[2] * z * z) / (a[0] + a[1] * z + a[2] * z * z)
+
+        # High shelf modelling the head, then the RLB high pass
+        k = numpy.tan(numpy.pi * 1681.974450955533 / rate)
+        q = 0.7071752369554196
+        vh = 10 ** (3.999843853973347 / 20)
+        vb = vh ** 0.4996667741545416
+        shelf = biquad((vh + vb * k / q + k * k, 2 * (k * k - vh), vh - vb * k / q + k * k),
+                       (1 + k / q + k * k, 2 * (k * k - 1), 1 - k / q + k * k))
+        k = numpy.tan(numpy.pi * 38.13547087602444 / rate)
+        q = 0.5003270373238773
+        high_pass = biquad((1, -2, 1), (1 + k / q + k * k, 2 * (k * k - 1), 1 - k / q + k * k))
+        # BS.1770 gives the high pass with only its a coefficients normalised
+        high_pass *= 1 + k / q + k * k
+
+        power = numpy.abs(shelf * high_pass) ** 2
+        # Every bin but DC and Nyquist stands for a pair of frequencies
+        power[1:(size + 1) // 2] *= 2
+        weights[(size, rate)] = power / size ** 2
+    return weights[(size, rate)]
+
+def chunks(path):
+    """Decoded CHUNK_SECONDS pieces of a track, (samples, rate) each"""
+    index = build_seek_index(path)
+    if index is None:
+        yield decode_file(path)
+        return
+    start = 0
+    while True:
+        samples, rate = decode(path, index, start, CHUNK_SECONDS)
+        # A chunk can come up short before the end, only an empty one is past it
+        if not len(samples):
+            return
+        yield samples, rate
+        start += CHUNK_SECONDS
+
+def step_powers(samples, rate):
+    """K-weighted mean square of every STEP_SECONDS of samples, channels summed"""
+    step = int(rate * STEP_SECONDS)
+    count = len(samples) // step
+    # A mono track comes out of the mixer on both channels, count it once
+    if samples.shape[1] == 2 and numpy.array_equal(samples[:, 0], samples[:, 1]):
+        samples = samples[:, :1]
+    steps = samples[:count * step].reshape(count, step, samples.shape[1])
+    spectrum = numpy.abs(numpy.fft.rfft(steps, axis=1)) ** 2
+    return numpy.einsum("sbc,b->s", spectrum, k_weighting(step, rate))
+
+def measure(path):
+    """Integrated loudness in LUFS and sample peak of a track
+
+    The loudness is None for a track that is silent throughout.
+    """
+    powers = []
+    peak = 0.0
+    for samples, rate in chunks(path):
+        powers.append(step_powers(samples, rate))
+        peak = max(peak, float(numpy.abs(samples).max()))
+    powers = numpy.concatenate(powers) if powers else numpy.zeros(0)
+    if len(powers) >= BLOCK_STEPS:
+        blocks = numpy.convolve(powers, numpy.ones(BLOCK_STEPS) / BLOCK_STEPS, "valid")
+    else:
+        blocks = powers.mean(keepdims=True) if len(powers) else powers
+
+    def loudness(power):
+        return -0.691 + 10 * numpy.log10(power)
+
+    with numpy.errstate(divide="ignore"):
+        gated = blocks[loudness(blocks) > ABSOLUTE_GATE]
+        if not len(gated):
+            return None, peak
+        gated = gated[loudness(gated) > loudness(gated.mean()) + RELATIVE_GATE]
+    return float(loudness(gated.mean())), peak
+
+def analyse(paths):
+    """Worker process: the (gain, peak) of a chunk of files
+
+    ReplayGain tags are used where a file has them, the rest are measured.
+    """
+    rows = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        try:
+            result = read_replaygain(path)
+            if result is None:
+                lufs, peak = measure(path)
+                result = (TARGET_LUFS - lufs if lufs is not None else 0.0, peak or None)
+        except Exception:
+            result = LoudnessAnalyzer.UNREADABLE
+        rows.append((path, st.st_size, st.st_mtime_ns, result))
+    return rows
+
+def start_worker():
+    """Worker initializer, a mixer of its own to decode with and no sound card"""
+    ignore_interrupts()
+    os.environ["SDL_AUDIODRIVER"] = "dummy"
+    pygame.mixer.init(44100, -16, 2)
+
+def gain_factor(loudness):
+    """Volume multiplier for a (gain, peak) pair, never pushing the peak past full scale"""
+    if loudness is None or loudness[0] is None:
+        return 1.0
+    gain, peak = loudness
+    factor = 10 ** (gain / 20)
+    if peak:
+        factor = min(factor, 1.0 / peak)
+    return factor
+
+class LoudnessAnalyzer(BulkIndexer):
+    """Work out the gain of many files in a process pool
+
+    Runs like BulkIndexer, only the workers decode each file and measure it
+    with NumPy. Files analysed since they last changed are skipped, so only
+    new and changed ones cost anything.
+    """
+
+    work = staticmethod(analyse)
+    UNREADABLE = (None, None)
+
+    def __init__(self, paths, cache, workers=None, notify=None):
+        super().__init__(paths, cache, workers, chunk_size=4, notify=notify)
+
+    def new_pool(self):
+        # A forked copy of the player's mixer can't be used, start afresh
+        return ProcessPoolExecutor(self.workers, multiprocessing.get_context("spawn"),
+                                   initializer=start_worker)
+
+    def fresh(self, path):
+        return self.cache.get_loudness(path) is not None
+
+    def save(self, rows):
+        self.cache.store_loudness_many(rows)
@@ -0,0 +1,405 @@
+import io
+import mmap
+import os
+from array import array
+from collections import namedtuple
+
+# Bytes mapped past the ID3v2 tag, enough for the Xing/VBRI header and the
+# four frame headers checked on files without one
+MAP_AFTER_TAG = 8192
+
+# Text frames shown in the UI or sorted on, by ID3v2.2 and ID3v2.3/2.4 frame ID
+FIELDS = {b"TT2": 0, b"TP1": 1, b"TAL": 2, b"TRK": 3, b"TP2": 4, b"TPA": 5,
+          b"TIT2": 0, b"TPE1": 1, b"TALB": 2, b"TRCK": 3, b"TPE2": 4, b"TPOS": 5}
+FIELD_COUNT = 6
+ENCODINGS = ("latin-1", "utf-16", "utf-16-be", "utf-8")
+
+# Frame flags meaning the frame body can't be read as-is
+V23_UNREADABLE = 0x00E0  # compression, encryption, grouping
+V24_UNREADABLE = 0x004F  # grouping, compression, encryption, unsync, data length
+
+BITRATES = {
+    (1, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (1, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (1, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (2, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (2, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+BITRATES[(2, 3)] = BITRATES[(2, 2)]
+for layer in (1, 2, 3):
+    BITRATES[(2.5, layer)] = BITRATES[(2, layer)]
+
+SAMPLE_RATES = {1: (44100, 48000, 32000), 2: (22050, 24000, 16000), 2.5: (11025, 12000, 8000)}
+
+# Byte offsets of the frames starting every `interval` seconds, from a frame
+# scan. exact is False on indexes an older version read from a Xing TOC,
+# which the cache rebuilds.
+SeekIndex = namedtuple("SeekIndex", ["interval", "exact", "offsets"])
+
+# Frames between seek index entries from a scan, about a second of audio
+INDEX_STEP = 38
+
+class Unusual(Exception):
+    """Something the fast reader doesn't handle, mutagen gets the file"""
+
+def synchsafe(data):
+    if (data[0] | data[1] | data[2] | data[3]) & 0x80:
+        raise Unusual("not synchsafe")
+    return data[0] << 21 | data[1] << 14 | data[2] << 7 | data[3]
+
+def read_fast(path):
+    """Title, artist, album, track number, album artist and disc number text
+    and duration of an MP3
+
+    Only the ID3v2 tag and the first audio frames are memory-mapped. The
+    duration comes from the Xing/Info or VBRI frame count, less the LAME
+    encoder delay and padding, or from the bitrate and file size for plain
+    CBR files, the same way mutagen works it out. Returns None for anything
+    unusual (ID3v1 tags, unsynchronisation, compressed frames, junk before
+    the first frame...) so the caller can ask mutagen instead.
+    """
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return None
+    try:
+        size = os.fstat(fd).st_size
+        # mutagen merges ID3v1 tags in, leave those files to it
+        if size >= 128 and os.pread(fd, 3, size - 128) == b"TAG":
+            return None
+
+        head = os.pread(fd, 10, 0)
+        tag_end = 0
+        if head[:3] == b"ID3":
+            tag_end = 10 + synchsafe(head[6:10])
+        length = min(size, tag_end + MAP_AFTER_TAG)
+        with mmap.mmap(fd, length, access=mmap.ACCESS_READ) as data:
+            fields = read_id3(data, tag_end) if tag_end else [None] * FIELD_COUNT
+            fields.append(read_duration(data, tag_end, size))
+            return fields
+    except (OSError, ValueError, IndexError, UnicodeDecodeError, Unusual):
+        return None
+    finally:
+        os.close(fd)
+
+def read_id3(data, tag_end):
+    """The first value of each wanted text frame in an ID3v2 tag"""
+    major, flags = data[3], data[5]
+    if major not in (2, 3, 4) or flags & 0x80 or flags & 0x10 or tag_end <= 10:
+        # Unsynchronised, footer, or a version mutagen would reject
+        raise Unusual("tag header")
+    if len(data) < tag_end + 3 or data[tag_end:tag_end + 3] == b"ID3":
+        raise Unusual("truncated or stacked tags")
+
+    pos = 10
+    if flags & 0x40:
+        if major == 2:
+            raise Unusual("compressed v2.2 tag")
+        if major == 3:
+            pos += 4 + int.from_bytes(data[10:14], "big")
+        else:
+            pos += synchsafe(data[10:14])
+
+    header_size = 6 if major == 2 else 10
+    id_size = 3 if major == 2 else 4
+    values = [None] * FIELD_COUNT
+    while pos + header_size <= tag_end:
+        frame_id = data[pos:pos + id_size]
+        if frame_id[0] == 0:
+            break  # padding
+        if not frame_id.isalnum() or not frame_id.upper() == frame_id:
+            # Usually a v2.4 tag with plain integer sizes, mutagen guesses those
+            raise Unusual("bad frame id")
+        if major == 2:
+            size = int.from_bytes(data[pos + 3:pos + 6], "big")
+            frame_flags = 0
+        elif major == 3:
+            size = int.from_bytes(data[pos + 4:pos + 8], "big")
+            frame_flags = data[pos + 8] << 8 | data[pos + 9]
+            if frame_flags & V23_UNREADABLE:
+                frame_flags = -1
+        else:
+            size = synchsafe(data[pos + 4:pos + 8])
+            frame_flags = data[pos + 8] << 8 | data[pos + 9]
+            if frame_flags & V24_UNREADABLE:
+                frame_flags = -1
+        pos += header_size
+        if pos + size > tag_end:
+            raise Unusual("frame overruns tag")
+
+        field = FIELDS.get(bytes(frame_id))
+        if field is not None and values[field] is None and size > 1:
+            if frame_flags == -1:
+                raise Unusual("unreadable text frame")
+            encoding = data[pos]
+            if encoding > 3:
+                raise Unusual("text encoding")
+            text = data[pos + 1:pos + size].decode(ENCODINGS[encoding])
+            values[field] = text.split("\x00", 1)[0]
+        pos += size
+    return values
+
+def frame_header(data, pos):
+    """Parse an MPEG audio frame header
+
+    Returns (version, layer, mode, bitrate, sample_rate, samples per frame,
+    frame length in bytes).
+    """
+    if pos + 4 > len(data):
+        raise Unusual("truncated frame")
+    header = int.from_bytes(data[pos:pos + 4], "big")
+    version_bits = header >> 19 & 3
+    layer_bits = header >> 17 & 3
+    bitrate_index = header >> 12 & 0xF
+    rate_index = header >> 10 & 3
+    if (header >> 21 != 0x7FF or version_bits == 1 or layer_bits == 0
+            or rate_index == 3 or bitrate_index in (0, 15)):
+        raise Unusual("no frame sync")
+
+    version = (2.5, None, 2, 1)[version_bits]
+    layer = 4 - layer_bits
+    bitrate = BITRATES[(version, layer)][bitrate_index] * 1000
+    sample_rate = SAMPLE_RATES[version][rate_index]
+    if layer == 1:
+        samples, slot = 384, 4
+    elif version >= 2 and layer == 3:
+        samples, slot = 576, 1
+    else:
+        samples, slot = 1152, 1
+    length = ((samples // 8 * bitrate) // sample_rate + (header >> 9 & 1)) * slot
+    return version, layer, header >> 6 & 3, bitrate, sample_rate, samples, length
+
+def read_duration(data, start, size):
+    """Length in seconds of the audio starting at start"""
+    version, layer, mode, bitrate, sample_rate, samples, length = frame_header(data, start)
+    if layer != 3:
+        raise Unusual("not layer III")
+
+    xing = xing_offset(data, start, version, mode)
+    if data[xing:xing + 4] in (b"Xing", b"Info"):
+        frames = xing_frames(data, xing)
+        if frames is not None:
+            frames, delay = frames
+            return max(0, samples * frames - delay) / sample_rate
+    elif data[start + 36:start + 40] == b"VBRI":
+        return samples * vbri_frames(data, start + 36) / sample_rate
+    else:
+        # No header to trust, mutagen wants four good frames in a row
+        pos = start + length
+        for _ in range(3):
+            pos += frame_header(data, pos)[-1]
+
+    # CBR, or a Xing header without a frame count
+    return 8 * (size - start) / bitrate
+
+def xing_frames(data, pos):
+    """(frame count, LAME delay + padding) from a Xing/Info header, None without a count"""
+    flags = int.from_bytes(data[pos + 4:pos + 8], "big")
+    pos += 8
+    frames = None
+    if flags & 1:
+        frames = int.from_bytes(data[pos:pos + 4], "big")
+        pos += 4
+    pos += 4 * bool(flags & 2) + 100 * bool(flags & 4) + 4 * bool(flags & 8)
+    if pos > len(data):
+        raise Unusual("truncated Xing header")
+    if frames is None:
+        return None
+
+    delay = 0
+    if lame_header_follows(data[pos:pos + 20]) and pos + 36 <= len(data):
+        lame = data[pos + 9:pos + 36]
+        if lame[0] >> 4 == 0:
+            delay = (lame[12] << 4 | lame[13] >> 4) + ((lame[13] & 0xF) << 8 | lame[14])
+    return frames, delay
+
+def lame_header_follows(version):
+    """Whether a LAME version string is followed by the extended LAME tag
+
+    Mirrors mutagen's version check, the tag only exists from LAME 3.90.
+    """
+    if len(version) != 20 or not version.startswith((b"LAME", b"L3.99")):
+        return False
+    rest = version.lstrip(b"EMAL")
+    major, rest = rest[0:1], rest[1:].lstrip(b".")
+    minor = b""
+    for c in rest:
+        if not 48 <= c <= 57:
+            break
+        minor += bytes([c])
+    rest = rest[len(minor):]
+    try:
+        major = int(major.decode("ascii"))
+        minor = int(minor.decode("ascii"))
+    except ValueError:
+        return False
+    if (major, minor) < (3, 90) or ((major, minor) == (3, 90) and rest[-11:-10] == b"("):
+        return False
+    return len(rest) >= 11
+
+def vbri_frames(data, pos):
+    """Frame count from a Fraunhofer VBRI header"""
+    header = data[pos:pos + 26]
+    if len(header) != 26 or int.from_bytes(header[4:6], "big") != 1:
+        raise Unusual("VBRI version")
+    entries = int.from_bytes(header[18:20], "big")
+    entry_size = int.from_bytes(header[22:24], "big")
+    if entry_size not in (2, 4) or pos + 26 + entries * entry_size > len(data):
+        raise Unusual("VBRI table")
+    return int.from_bytes(header[14:18], "big")
+
+def xing_offset(data, start, version, mode):
+    if version == 1:
+        return start + (36 if mode != 3 else 21)
+    return start + (21 if mode != 3 else 13)
+
+def sync(data, pos, limit=65536):
+    """First offset from pos where two valid frames follow each other"""
+    end = min(len(data) - 4, pos + limit)
+    while pos < end:
+        pos = data.find(b"\xff", pos, end)
+        if pos < 0:
+            break
+        try:
+            length = frame_header(data, pos)[-1]
+            frame_header(data, pos + length)
+            return pos
+        except Unusual:
+            pos += 1
+    raise Unusual("no frames")
+
+def build_seek_index(path):
+    """Seek index for an MP3, from a scan of every frame header
+
+    A Xing TOC would save the scan, but it only places each percent of the
+    song to within 1/256 of the file size, about half a minute into a two
+    hour mix, so neither the frame nor the time a seek lands on is known.
+
+    Returns None if the file has no MPEG audio frames to follow.
+    """
+    try:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            start = 0
+            if data[:3] == b"ID3":
+                start = 10 + synchsafe(data[6:10]) + (10 if data[5] & 0x10 else 0)
+            start = sync(data, start)
+            return scan_index(data, start)
+    except (OSError, ValueError, IndexError, Unusual):
+        return None
+
+def scan_index(data, start):
+    """The offset of every INDEX_STEP-th frame, walking the frame headers"""
+    version, layer, mode, bitrate, sample_rate, samples, length = frame_header(data, start)
+    xing = xing_offset(data, start, version, mode)
+    if data[xing:xing + 4] in (b"Xing", b"Info") or data[start + 36:start + 40] == b"VBRI":
+        # The header frame holds no audio
+        start += length
+
+    # Frame lengths by header bytes, a file only uses a handful of headers
+    lengths = {}
+    offsets = array("Q")
+    pos, end, frame = start, len(data) - 4, 0
+    while pos <= end:
+        if frame % INDEX_STEP == 0:
+            offsets.append(pos)
+        header = data[pos:pos + 4]
+        length = lengths.get(header)
+        if length is None:
+            try:
+                length = lengths[header] = frame_header(data, pos)[-1]
+            except Unusual:
+                break  # an ID3v1 tag or trailing junk
+        pos += length
+        frame += 1
+    return SeekIndex(INDEX_STEP * samples / sample_rate, True, offsets)
+
+def seek_offset(path, index, seconds):
+    """(byte offset, start time) of the frame holding `seconds`"""
+    entry = max(0, min(int(seconds / index.interval), len(index.offsets) - 1))
+    at, pos = entry * index.interval, index.offsets[entry]
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        # Step over whole frames to the one holding the target
+        while True:
+            try:
+                header = frame_header(data, pos)
+            except Unusual:
+                return pos, at
+            duration = header[5] / header[4]
+            if at + duration > seconds:
+                return pos, at
+            at += duration
+            pos += header[-1]
+
+def audio_span(fd, size):
+    """(start, end) byte offsets of the audio in an open MP3, tags left out
+
+    ID3v2 tags at the start, and ID3v1, APEv2, Lyrics3v2 and appended
+    ID3v2 tags at the end, in any order, are stepped over by reading their
+    headers. Nothing in between is read.
+    """
+    start = 0
+    while True:
+        head = os.pread(fd, 10, start)
+        if len(head) < 10 or head[:3] != b"ID3":
+            break
+        start += 10 + synchsafe(head[6:10]) + (10 if head[5] & 0x10 else 0)
+
+    end = size
+    while end > start:
+        if end - start >= 128 and os.pread(fd, 3, end - 128) == b"TAG":
+            end -= 128
+            if end - start >= 227 and os.pread(fd, 4, end - 227) == b"TAG+":
+                end -= 227
+            continue
+        footer = os.pread(fd, 32, max(start, end - 32))
+        if footer[:8] == b"APETAGEX":
+            flags = int.from_bytes(footer[20:24], "little")
+            if flags & 0x20000000:
+                # A header whose footer didn't own up to it
+                end -= 32
+            else:
+                tag_size = int.from_bytes(footer[12:16], "little")
+                if tag_size < 32 or tag_size > end - start:
+                    # The size takes in the footer itself, anything else
+                    # isn't an APE tag and would never move end
+                    break
+                end -= tag_size + (32 if flags & 0x80000000 else 0)
+            continue
+        if footer[-9:] == b"LYRICS200" and footer[-15:-9].isdigit():
+            end -= int(footer[-15:-9]) + 15
+            continue
+        if footer[-10:-7] == b"3DI":
+            end -= 20 + synchsafe(footer[-4:])
+            continue
+        break
+    return start, max(start, end)
+
+class FileSlice(io.RawIOBase):
+    """A file read from `start` on, so the mixer can play from a given frame"""
+
+    def __init__(self, path, start):
+        super().__init__()
+        self.file = open(path, "rb")
+        self.start = start
+        self.file.seek(start)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        return self.file.readinto(buffer)
+
+    def seek(self, pos, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            pos += self.start
+        return self.file.seek(pos, whence) - self.start
+
+    def tell(self):
+        return self.file.tell() - self.start
+
+    def close(self):
+        self.file.close()
+        super().close()
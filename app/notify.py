@@ -0,0 +1,110 @@
+import os
+import shutil
+import subprocess
+import threading
+import time
+
+class NullBackend:
+    """Drops notifications, for headless runs"""
+
+    def send(self, summary, body):
+        pass
+
+class NotifySendBackend:
+    """Runs notify-send with an argument list, never through a shell"""
+
+    def __init__(self, timeout_ms=2000):
+        self.timeout_ms = timeout_ms
+
+    def send(self, summary, body):
+        try:
+            subprocess.run(
+                ["notify-send", "-t", str(self.timeout_ms), "--", summary, body],
+                stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL, timeout=5)
+        except (OSError, subprocess.SubprocessError):
+            pass
+
+class DBusBackend:
+    """Talks to org.freedesktop.Notifications directly, replacing our last popup"""
+
+    def __init__(self, timeout_ms=2000):
+        import dbus
+        self.timeout_ms = timeout_ms
+        bus = dbus.SessionBus()
+        proxy = bus.get_object("org.freedesktop.Notifications", "/org/freedesktop/Notifications")
+        self.interface = dbus.Interface(proxy, "org.freedesktop.Notifications")
+        self.last_id = 0
+
+    def send(self, summary, body):
+        try:
+            self.last_id = int(self.interface.Notify(
+                "pytermusic", self.last_id, "", summary, body, [], {}, self.timeout_ms))
+        except Exception:
+            pass
+
+def choose_backend(name=None):
+    """Pick a backend by name ('dbus', 'notify-send', 'none') or whatever is available"""
+    name = name or os.environ.get("PYTERMUSIC_NOTIFY", "auto")
+    if name == "none":
+        return NullBackend()
+    if name in ("auto", "dbus"):
+        try:
+            return DBusBackend()
+        except Exception:
+            if name == "dbus":
+                return NullBackend()
+    if name in ("auto", "notify-send") and shutil.which("notify-send"):
+        return NotifySendBackend()
+    return NullBackend()
+
+class Notifier(threading.Thread):
+    """Sends notifications from a worker thread
+
+    Requests arriving within `settle` seconds of each other collapse into
+    one for the latest, so skipping through songs only announces the one
+    that ends up playing. At most one notification goes out per
+    `min_interval` seconds.
+    """
+
+    def __init__(self, backend, settle=0.4, min_interval=1.0):
+        super().__init__(daemon=True)
+        self.backend = backend
+        self.settle = settle
+        self.min_interval = min_interval
+        self.pending = None
+        self.requested = 0.0
+        self.last_sent = float("-inf")
+        self.condition = threading.Condition()
+        self.stopped = False
+
+    def notify(self, summary, body):
+        """Queue a notification, replacing any not yet sent"""
+        with self.condition:
+            self.pending = (summary, body)
+            self.requested = time.monotonic()
+            self.condition.notify()
+
+    def stop(self):
+        with self.condition:
+            self.stopped = True
+            self.condition.notify()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.pending is None and not self.stopped:
+                    self.condition.wait()
+                if self.stopped:
+                    return
+
+                # Wait for a quiet spell and for the rate limit to allow it
+                now = time.monotonic()
+                ready_at = max(self.requested + self.settle, self.last_sent + self.min_interval)
+                if now < ready_at:
+                    self.condition.wait(ready_at - now)
+                    continue
+                summary, body = self.pending
+                self.pending = None
+                self.last_sent = now
+            self.backend.send(summary, body)
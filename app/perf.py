@@ -0,0 +1,204 @@
+import cProfile
+import os
+import resource
+import time
+from collections import deque
+from app.cache import cache_dir
+
+PHASES = ("update", "tags", "layout", "record", "draw", "flush")
+
+class PerfMonitor:
+    """Per-frame timings for the HUD, the log and profile captures
+
+    The main loop calls begin(), mark(phase) after each part of a frame and
+    end() once it is on screen. Time spent in the player's load_titles,
+    fetching tags from the daemon, is counted as tag I/O instead of the
+    phase it happened in. While nothing is watching, those calls are no-op
+    stubs and load_titles is left unwrapped.
+
+    The log also gets the cells the renderer wrote and the process's peak
+    resident memory for each frame. watched stays set once any of them was
+    on, for the counters printed on exit.
+    """
+
+    def __init__(self, player, log_path=None, profile_frames=100, window=60, renderer=None):
+        self.player = player
+        self.renderer = renderer
+        self.profile_frames = profile_frames
+        self.frames = deque(maxlen=window)
+        self.hud = False
+        self.log = open(log_path, "a", buffering=1) if log_path else None
+        self.profiler = None
+        self.profiled = 0
+        self.dumps = []
+        self.key_at = None
+        self.tag_time = 0.0
+        self.watched = False
+        self.update_hooks()
+
+    def skip(self, *args):
+        pass
+
+    def update_hooks(self):
+        """Swap the timing calls in or out depending on who is watching"""
+        if self.hud or self.log or self.profiler:
+            self.watched = True
+            self.begin = self.start_frame
+            self.mark = self.add_phase
+            self.end = self.end_frame
+            self.key_pressed = self.press
+            if "load_titles" not in vars(self.player):
+                self.player.load_titles = self.timed_load_titles
+        else:
+            self.begin = self.mark = self.end = self.key_pressed = self.skip
+            vars(self.player).pop("load_titles", None)
+
+    def timed_load_titles(self, track_ids):
+        start = time.perf_counter()
+        try:
+            return type(self.player).load_titles(self.player, track_ids)
+        finally:
+            self.tag_time += time.perf_counter() - start
+
+    def toggle_hud(self):
+        self.hud = not self.hud
+        self.update_hooks()
+        return self.hud
+
+    def start_profile(self):
+        """Profile the next profile_frames frames"""
+        if self.profiler is None:
+            self.profiler = cProfile.Profile()
+            self.profiled = 0
+            self.update_hooks()
+
+    def press(self):
+        """Note when a key arrived, for key-to-screen latency"""
+        if self.key_at is None:
+            self.key_at = time.perf_counter()
+
+    def start_frame(self):
+        if self.profiler is not None:
+            self.profiler.enable()
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.misses = self.player.cache.misses
+        self.tag_time = 0.0
+        self.tags_marked = 0.0
+        self.started = self.last_mark = time.perf_counter()
+
+    def add_phase(self, phase):
+        """Charge the time since the last mark to phase, minus tag I/O"""
+        now = time.perf_counter()
+        tags = self.tag_time - self.tags_marked
+        self.phases[phase] += now - self.last_mark - tags
+        self.phases["tags"] += tags
+        self.tags_marked = self.tag_time
+        self.last_mark = now
+
+    def end_frame(self):
+        now = time.perf_counter()
+        if self.profiler is not None:
+            self.profiler.disable()
+            self.profiled += 1
+            if self.profiled >= self.profile_frames:
+                self.dump_profile()
+
+        latency = None
+        if self.key_at is not None:
+            latency = now - self.key_at
+            self.key_at = None
+        frame = (now, now - self.started, self.phases,
+                 self.player.cache.misses - self.misses, latency)
+        self.frames.append(frame)
+        if self.log:
+            self.write_log(frame)
+
+    def dump_profile(self):
+        """Write the capture as a pstats file, read it with python -m pstats"""
+        os.makedirs(cache_dir(), exist_ok=True)
+        path = os.path.join(cache_dir(), time.strftime("profile-%Y%m%d-%H%M%S.pstats"))
+        self.profiler.dump_stats(path)
+        self.dumps.append(path)
+        self.profiler = None
+        self.update_hooks()
+
+    def write_log(self, frame):
+        at, total, phases, parses, latency = frame
+        fields = [f"{at:.3f}", f"total={total * 1000:.2f}"]
+        fields.extend(f"{phase}={phases[phase] * 1000:.2f}" for phase in PHASES)
+        fields.append(f"parses={parses}")
+        if self.renderer is not None:
+            fields.append(f"cells={self.renderer.last_frame_cells}")
+        fields.append(f"maxrss={resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}")
+        if latency is not None:
+            fields.append(f"key={latency * 1000:.2f}")
+        self.log.write(" ".join(fields) + "\n")
+
+    def hud_lines(self):
+        """Averages over the recent frames, one HUD row each"""
+        frames = self.frames
+        if not frames:
+            return ["waiting for frames"]
+        count = len(frames)
+        span = frames[-1][0] - frames[0][0]
+        fps = (count - 1) / span if span > 0 else 0.0
+        lines = [f"fps      {fps:7.1f}",
+                 f"frame    {sum(f[1] for f in frames) / count * 1000:7.2f} ms"]
+        for phase in PHASES:
+            average = sum(f[2][phase] for f in frames) / count
+            lines.append(f" {phase:8}{average * 1000:7.2f} ms")
+        lines.append(f"parses   {sum(f[3] for f in frames) / count:7.2f} /frame")
+
+        cache = self.player.cache
+        lookups = cache.hits + cache.misses
+        rate = cache.hits / lookups * 100 if lookups else 0.0
+        lines.append(f"cache    {rate:7.1f} % hits")
+
+        latencies = [f[4] for f in frames if f[4] is not None]
+        if latencies:
+            lines.append(f"key      {latencies[-1] * 1000:7.2f} ms")
+        else:
+            lines.append("key          -")
+        if self.profiler is not None:
+            lines.append(f"profiling {self.profiled}/{self.profile_frames}")
+        elif self.dumps:
+            lines.append(f"saved {os.path.basename(self.dumps[-1])}")
+        return lines
+
+    def close(self):
+        if self.profiler is not None:
+            self.dump_profile()
+        if self.log:
+            self.log.close()
+            self.log = None
+
+    def stats(self):
+        """Where profile captures went, if any were taken"""
+        return "\n".join(f"Profile saved to {path}" for path in self.dumps)
+
+class StartupTrace:
+    """Time spent in each phase of startup, for --startup-trace
+
+    mark(phase) charges the time since the previous mark to phase. The
+    clock starts at `started`, taken before the heavy imports.
+    """
+
+    def __init__(self, started=None):
+        self.started = self.last = started if started is not None else time.perf_counter()
+        self.phases = []
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last))
+        self.last = now
+
+    def report(self, title):
+        return format_phases(title, self.phases)
+
+def format_phases(title, phases, later=()):
+    """A StartupTrace's phases as a table, then work put off until after startup"""
+    lines = [f"{title}:"]
+    lines.extend(f"  {phase:24}{seconds * 1000:8.1f} ms" for phase, seconds in phases)
+    lines.append(f"  {'total':24}{sum(seconds for _, seconds in phases) * 1000:8.1f} ms")
+    lines.extend(f"  {phase:24}{seconds * 1000:8.1f} ms" for phase, seconds in later)
+    return "\n".join(lines)
@@ -0,0 +1,107 @@
+import json
+import os
+from urllib.parse import unquote, urlparse
+from app.library import split_path
+from app.session import state_dir, write_atomic
+
+def read_m3u(path):
+    """Track paths listed in an M3U or M3U8 file, relative ones taken from its directory"""
+    base = os.path.dirname(os.path.abspath(path))
+    with open(path, encoding="utf-8", errors="surrogateescape") as f:
+        for line in f:
+            line = line.strip().lstrip("\ufeff")
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("file://"):
+                line = unquote(urlparse(line).path)
+            yield os.path.normpath(os.path.join(base, line))
+
+class PlaylistStore:
+    """Named playlists, one small file each
+
+    A playlist is kept the way the library keeps paths: each directory
+    once, relative to the music directory when it's inside it, and each
+    track as an index into those directories and a file name. Loading one
+    reads only its own file, and the player looks each track up by
+    directory and name, so it costs the length of the playlist and never
+    the size of the library.
+    """
+
+    SUFFIX = ".json"
+
+    def __init__(self, music_dir, directory=None):
+        self.root = os.path.join(music_dir, "")
+        self.directory = directory or os.path.join(state_dir(), "playlists")
+
+    def file(self, name):
+        if not name or "/" in name or name.startswith(".") or "\0" in name:
+            raise ValueError(f"can't name a playlist {name!r}")
+        return os.path.join(self.directory, name + self.SUFFIX)
+
+    def names(self):
+        try:
+            files = os.listdir(self.directory)
+        except OSError:
+            return []
+        return sorted(file[:-len(self.SUFFIX)] for file in files
+                      if file.endswith(self.SUFFIX) and not file.startswith("."))
+
+    def save(self, name, paths):
+        """Store paths under name, replacing any playlist of that name"""
+        dirs = []
+        dir_ids = {}
+        tracks = []
+        for path in paths:
+            directory, file_name = split_path(path)
+            if directory.startswith(self.root):
+                directory = directory[len(self.root):]
+            dir_id = dir_ids.get(directory)
+            if dir_id is None:
+                dir_id = dir_ids[directory] = len(dirs)
+                dirs.append(directory)
+            tracks.extend((dir_id, file_name))
+        data = json.dumps({"dirs": dirs, "tracks": tracks}, separators=(",", ":"))
+        write_atomic(self.file(name), data.encode("utf-8", "surrogateescape"))
+
+    def load(self, name):
+        """(directory, file name) of each track of a playlist, in order"""
+        try:
+            with open(self.file(name), "rb") as f:
+                playlist = json.loads(f.read().decode("utf-8", "surrogateescape"))
+        except FileNotFoundError:
+            raise ValueError(f"no playlist called {name!r}")
+        dirs = [directory if os.path.isabs(directory) else self.root + directory
+                for directory in playlist["dirs"]]
+        tracks = playlist["tracks"]
+        return [(dirs[tracks[i]], tracks[i + 1]) for i in range(0, len(tracks), 2)]
+
+    def delete(self, name):
+        try:
+            os.unlink(self.file(name))
+        except FileNotFoundError:
+            raise ValueError(f"no playlist called {name!r}")
+
+    def import_m3u(self, path, name=None):
+        """Store an M3U file's tracks as a playlist, named after the file by default"""
+        name = name or os.path.splitext(os.path.basename(path))[0]
+        paths = list(read_m3u(path))
+        self.save(name, paths)
+        return name, len(paths)
+
+    def export_m3u(self, name, path, describe=None):
+        """Write a playlist out as an extended M3U file
+
+        describe(path) gives the (seconds, text) of a track's #EXTINF line,
+        or None to leave it out.
+        """
+        lines = ["#EXTM3U"]
+        tracks = self.load(name)
+        for directory, file_name in tracks:
+            track = directory + file_name
+            info = describe(track) if describe is not None else None
+            if info is not None:
+                lines.append(f"#EXTINF:{int(info[0])},{info[1]}")
+            lines.append(track)
+        write_atomic(os.path.abspath(path),
+                     ("\n".join(lines) + "\n").encode("utf-8", "surrogateescape"))
+        return len(tracks)
@@ -0,0 +1,46 @@
+import json
+import os
+import socket
+
+# Messages are JSON objects, one per line. Clients send {"cmd": name, ...}
+# with an optional "seq" that the reply repeats. Subscribed clients also get
+# {"state": {...}} pushes holding only the keys that changed. Nothing here
+# imports pygame, so one-shot commands start quickly.
+
+def socket_path():
+    """Where the daemon listens, PYTERMUSIC_SOCKET overrides it"""
+    path = os.environ.get("PYTERMUSIC_SOCKET")
+    if path:
+        return path
+    runtime = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime:
+        return os.path.join(runtime, "pytermusic.sock")
+    return f"/tmp/pytermusic-{os.getuid()}.sock"
+
+def encode(message):
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False).encode() + b"\n"
+
+def decode(line):
+    return json.loads(line)
+
+def connect(path=None, timeout=None):
+    """A blocking connection to the daemon, raises OSError if none is running"""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(path or socket_path())
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+def call(command, path=None, timeout=5.0, **args):
+    """Send one command and wait for its reply"""
+    with connect(path, timeout) as sock:
+        sock.sendall(encode(dict(args, cmd=command, seq=1)))
+        with sock.makefile("rb") as stream:
+            for line in stream:
+                reply = decode(line)
+                if reply.get("seq") == 1:
+                    return reply
+    raise ConnectionError("daemon closed the connection")
@@ -0,0 +1,87 @@
+import curses
+
+class Pane:
+    """A curses window that remembers what it last drew
+
+    put() only touches the window when the text or attribute at a position
+    changed, so unchanged rows cost nothing to redraw and nothing is sent to
+    the terminal for them.
+    """
+
+    def __init__(self, win, boxed=False):
+        self.win = win
+        self.boxed = boxed
+        self.drawn = {}
+        self.dirty = True
+        self.cells = 0
+        if boxed:
+            self.win.box()
+
+    def put(self, y, x, text, attr=0):
+        """Draw text at (y, x) if it differs from what is already there"""
+        key = (y, x)
+        previous = self.drawn.get(key)
+        if previous == (text, attr):
+            return
+        self.drawn[key] = (text, attr)
+        self.win.addstr(y, x, text, attr)
+        self.cells += len(text)
+
+        # Blank out whatever was left over from a longer previous string
+        if previous is not None and len(previous[0]) > len(text):
+            padding = " " * (len(previous[0]) - len(text))
+            self.win.addstr(y, x + len(text), padding)
+            self.cells += len(padding)
+        self.dirty = True
+
+    def invalidate(self):
+        """Forget everything drawn, forcing a full repaint"""
+        self.win.erase()
+        if self.boxed:
+            self.win.box()
+        self.drawn.clear()
+        self.dirty = True
+
+    def touch(self):
+        """Repaint the window as-is after something was drawn over it"""
+        self.win.touchwin()
+        self.dirty = True
+
+    def refresh(self):
+        """Queue the window for the next doupdate if anything changed"""
+        if self.dirty:
+            self.win.noutrefresh()
+            self.dirty = False
+            return True
+        return False
+
+class Renderer:
+    """Flushes a set of panes and counts the cells written per frame"""
+
+    def __init__(self, *panes):
+        self.panes = list(panes)
+        self.frames = 0
+        self.last_frame_cells = 0
+        self.total_cells = 0
+
+    def flush(self):
+        """Refresh only the panes that changed, then update the terminal"""
+        cells = sum(pane.cells for pane in self.panes)
+        changed = False
+        for pane in self.panes:
+            pane.cells = 0
+            changed = pane.refresh() or changed
+        if changed:
+            curses.doupdate()
+        self.frames += 1
+        self.last_frame_cells = cells
+        self.total_cells += cells
+
+    def touch(self):
+        for pane in self.panes:
+            pane.touch()
+
+    def stats(self):
+        """Average cells written per frame"""
+        average = self.total_cells / self.frames if self.frames else 0.0
+        return f"Renderer: {self.frames} frames, {average:.1f} cells/frame"
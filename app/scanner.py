@@ -0,0 +1,111 @@
+import os
+import queue
+import threading
+import time
+
+def is_mp3(name):
+    return name.lower().endswith(".mp3")
+
+class LibraryScanner(threading.Thread):
+    """Walk the music directory on a worker thread, posting batches of tracks
+
+    Directories whose mtime matches the last scan are not listed again, their
+    cached file and subdirectory names are used instead. batch_size and delay
+    (seconds slept after each batch) throttle the walk on slow mounts.
+    """
+
+    def __init__(self, music_dir, cache, batch_size=500, delay=0.0, notify=None):
+        super().__init__(daemon=True)
+        self.music_dir = music_dir
+        self.cache = cache
+        self.batch_size = batch_size
+        self.delay = delay
+        self.notify = notify
+        self.batches = queue.Queue()
+        self.found = 0
+        self.dirs = []
+        self.finished = threading.Event()
+        self.cancelled = threading.Event()
+
+    def run(self):
+        batch = []
+        try:
+            for path in self.walk(self.music_dir):
+                if self.cancelled.is_set():
+                    return
+                batch.append(path)
+                if len(batch) >= self.batch_size:
+                    self.post(batch)
+                    batch = []
+                    if self.delay:
+                        time.sleep(self.delay)
+            if batch:
+                self.post(batch)
+        finally:
+            self.finished.set()
+            if self.notify is not None:
+                self.notify()
+
+    def post(self, batch):
+        self.found += len(batch)
+        self.batches.put(batch)
+        if self.notify is not None:
+            self.notify()
+
+    def walk(self, directory):
+        """Yield mp3 paths under directory, depth first in name order"""
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+        except OSError:
+            return
+        self.dirs.append(directory)
+
+        cached = self.cache.get_dir(directory)
+        if cached is not None and cached[0] == mtime:
+            files, subdirs = cached[1], cached[2]
+        else:
+            files, subdirs = self.list_dir(directory)
+            self.cache.store_dir(directory, mtime, files, subdirs)
+
+        # Merge files and subdirectories so the result comes out sorted by path
+        entries = sorted([(name, False) for name in files] + [(name, True) for name in subdirs])
+        for name, is_dir in entries:
+            path = os.path.join(directory, name)
+            if is_dir:
+                yield from self.walk(path)
+            else:
+                yield path
+
+    def list_dir(self, directory):
+        """Return the mp3 names and subdirectory names in one directory"""
+        files = []
+        subdirs = []
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir():
+                            subdirs.append(entry.name)
+                        elif is_mp3(entry.name) and entry.is_file():
+                            files.append(entry.name)
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+        return files, subdirs
+
+    def get_batches(self):
+        """Drain every batch posted since the last call"""
+        songs = []
+        while True:
+            try:
+                songs.extend(self.batches.get_nowait())
+            except queue.Empty:
+                return songs
+
+    def cancel(self):
+        self.cancelled.set()
+
+    @property
+    def scanning(self):
+        return not self.finished.is_set() or not self.batches.empty()
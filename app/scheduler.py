@@ -0,0 +1,78 @@
+import os
+import selectors
+import time
+
+class Scheduler:
+    """Sleep until there is input, a worker wakes us, or a timer is due
+
+    Repeating timers drive the record animation and progress bar while a
+    song plays, one-shot deadlines handle things like the expected end of
+    a track. With no timers set, wait() blocks until input arrives.
+    """
+
+    def __init__(self, input_fd):
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(input_fd, selectors.EVENT_READ, "input")
+
+        # Self-pipe so other threads can interrupt the wait
+        self.wake_r, self.wake_w = os.pipe()
+        os.set_blocking(self.wake_r, False)
+        os.set_blocking(self.wake_w, False)
+        self.selector.register(self.wake_r, selectors.EVENT_READ, "wake")
+
+        self.timers = {}
+
+    def set_timer(self, name, interval):
+        """Fire name every interval seconds, leaving a running timer alone"""
+        timer = self.timers.get(name)
+        if timer is None or timer[0] != interval:
+            self.timers[name] = (interval, time.monotonic() + interval)
+
+    def set_deadline(self, name, delay):
+        """Fire name once, delay seconds from now"""
+        self.timers[name] = (None, time.monotonic() + delay)
+
+    def cancel(self, *names):
+        for name in names:
+            self.timers.pop(name, None)
+
+    def wake(self):
+        """Interrupt wait() from any thread"""
+        try:
+            os.write(self.wake_w, b"\0")
+        except BlockingIOError:
+            pass
+
+    def wait(self):
+        """Block until something happens, returns (input_ready, due timer names)"""
+        timeout = None
+        if self.timers:
+            next_due = min(deadline for _, deadline in self.timers.values())
+            timeout = max(0.0, next_due - time.monotonic())
+
+        input_ready = False
+        for key, _ in self.selector.select(timeout):
+            if key.data == "input":
+                input_ready = True
+            else:
+                try:
+                    while os.read(self.wake_r, 4096):
+                        pass
+                except BlockingIOError:
+                    pass
+
+        now = time.monotonic()
+        due = set()
+        for name, (interval, deadline) in list(self.timers.items()):
+            if deadline <= now:
+                due.add(name)
+                if interval is None:
+                    del self.timers[name]
+                else:
+                    self.timers[name] = (interval, max(deadline + interval, now))
+        return input_ready, due
+
+    def close(self):
+        self.selector.close()
+        os.close(self.wake_r)
+        os.close(self.wake_w)
@@ -0,0 +1,241 @@
+import os
+import threading
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+from functools import partial
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+def insert(ids, track_id):
+    """Add a track ID to a sorted postings array, unless it's there"""
+    at = bisect_left(ids, track_id)
+    if at == len(ids) or ids[at] != track_id:
+        ids.insert(at, track_id)
+
+def discard(postings, key, track_id):
+    """Take a track ID out of a postings list, dropping the list once empty"""
+    ids = postings.get(key)
+    if ids is None:
+        return
+    at = bisect_left(ids, track_id)
+    if at < len(ids) and ids[at] == track_id:
+        del ids[at]
+        if not ids:
+            del postings[key]
+
+class SearchIndex:
+    """Trigram and word-prefix postings over title, artist, album and path
+
+    Terms of three or more characters look up the rarest of their trigrams
+    and check only those tracks. Shorter terms match the start of a word
+    through a sorted vocabulary. Either way the work per keystroke follows
+    the number of candidates, not the library size. Each query narrows the
+    results of the one before it when it extends it.
+    """
+
+    MIN_QUERY = 2
+
+    def __init__(self, library, cache, music_dir):
+        self.library = library
+        self.cache = cache
+        self.music_dir = music_dir
+        self.haystacks = []
+        self.postings = defaultdict(partial(array, "I"))
+        self.words = defaultdict(partial(array, "I"))
+        self.vocabulary = []
+        self.indexed = 0
+        # (track ID, old text) of tracks whose text changed since indexing
+        self.stale = []
+        self.ready = threading.Event()
+        self.lock = threading.Lock()
+        self.history = []
+
+    def build(self):
+        """Index any new or changed tracks on a worker thread"""
+        if (self.indexed < self.library.id_limit or self.stale) and not self.lock.locked():
+            threading.Thread(target=self.update, daemon=True).start()
+
+    def update(self):
+        """Index tracks added since the last call, and reindex changed ones"""
+        with self.lock:
+            postings = self.postings
+            words = self.words
+            vocabulary_size = len(words)
+            reworded = False
+            done = 0
+            for track_id, old in self.stale:
+                text = self.haystacks[track_id]
+                new_grams, old_grams = trigrams(text), trigrams(old)
+                new_words, old_words = set(text.split()), set(old.split())
+                for gram in old_grams - new_grams:
+                    discard(postings, gram, track_id)
+                for gram in new_grams - old_grams:
+                    insert(postings[gram], track_id)
+                for word in old_words - new_words:
+                    discard(words, word, track_id)
+                for word in new_words - old_words:
+                    insert(words[word], track_id)
+                reworded = reworded or old_words != new_words
+                done += 1
+            for track_id in range(self.indexed, self.library.id_limit):
+                text = self.haystack(track_id)
+                self.haystacks.append(text)
+                for gram in trigrams(text):
+                    postings[gram].append(track_id)
+                for word in set(text.split()):
+                    words[word].append(track_id)
+            self.indexed = self.library.id_limit
+            if reworded or len(words) != vocabulary_size:
+                self.vocabulary = sorted(words)
+            # Left until now so searches check every track in the meantime,
+            # anything refreshed since stays for the next update
+            del self.stale[:done]
+        self.ready.set()
+
+    def haystack(self, track_id):
+        """Lowercased searchable text for a track, empty if it was removed"""
+        path = self.library.path(track_id)
+        if path is None:
+            return ""
+        if self.library.has_tags(track_id):
+            tags = self.library.tags(track_id)
+        else:
+            # Don't stat every file just to search, stale tags are fine here
+            tags = self.cache.peek(path)
+        fields = [path[len(self.music_dir):].replace(os.sep, " ")]
+        if tags is not None:
+            fields.extend(field for field in tags[:3] if field)
+        return " ".join(fields).lower()
+
+    def candidates(self, term):
+        """Track IDs that may contain term, from the smallest postings list"""
+        if len(term) >= 3:
+            smallest = None
+            for gram in trigrams(term):
+                postings = self.postings.get(gram)
+                if not postings:
+                    return ()
+                if smallest is None or len(postings) < len(smallest):
+                    smallest = postings
+            return smallest
+
+        # Short terms match word prefixes
+        found = set()
+        start = bisect_left(self.vocabulary, term)
+        for word in self.vocabulary[start:]:
+            if not word.startswith(term):
+                break
+            found.update(self.words[word])
+        return found
+
+    def refresh(self, track_id):
+        """Recompute the text of a renamed, retagged or removed track
+
+        Also for tags read after the track was indexed. The text is swapped
+        at once, its postings are redone on the worker thread, and searches
+        check every track until then.
+        """
+        if track_id >= len(self.haystacks):
+            # Not indexed yet, update() will read the new text
+            return
+        text = self.haystack(track_id)
+        if text == self.haystacks[track_id]:
+            return
+        self.stale.append((track_id, self.haystacks[track_id]))
+        self.haystacks[track_id] = text
+        self.history.clear()
+
+    def filter(self, pool, term):
+        """Keep the IDs in pool whose text matches term"""
+        haystacks = self.haystacks
+        if len(term) >= 3:
+            return [track_id for track_id in pool if term in haystacks[track_id]]
+        prefix = " " + term
+        return [track_id for track_id in pool
+                if prefix in haystacks[track_id] or haystacks[track_id].startswith(term)]
+
+    def in_order(self, ids):
+        """Sort IDs into browse order, leaving out hidden tracks"""
+        hidden = self.library.hidden
+        if 1 in hidden:
+            ids = [track_id for track_id in ids if not hidden[track_id]]
+        if self.library.id_ordered:
+            return sorted(ids)
+        return sorted(ids, key=self.library.positions.__getitem__)
+
+    def search(self, query):
+        """Return matching track IDs in browse order"""
+        query = query.lower()
+        terms = query.split()
+        if not terms or len(query.strip()) < self.MIN_QUERY:
+            # Too short to narrow anything down, show the whole list
+            self.history.clear()
+            return None
+
+        # Reuse the results of the query this one extends
+        while self.history and not query.startswith(self.history[-1][0]):
+            self.history.pop()
+        if self.history and self.history[-1][0] == query:
+            return self.history[-1][1]
+
+        if self.history:
+            previous = self.history[-1][0].split()
+            if len(previous) == len(terms) and len(previous[-1]) < 3 <= len(terms[-1]):
+                # A short term matched word prefixes only, so its results
+                # can't be narrowed once it becomes a substring search.
+                # Start again from the results for the earlier terms.
+                for query_before, earlier in reversed(self.history):
+                    if query_before.split() == terms[:-1]:
+                        results = self.filter(earlier, terms[-1])
+                        break
+                else:
+                    results = self.fresh(terms)
+            elif previous == terms:
+                results = self.history[-1][1]
+            else:
+                # Earlier terms are unchanged, only the last one needs checking
+                results = self.filter(self.history[-1][1], terms[-1])
+        else:
+            results = self.fresh(terms)
+        self.history.append((query, results))
+        return results
+
+    def fresh(self, terms):
+        """Search from the index rather than earlier results"""
+        if not self.ready.is_set() or self.indexed < self.library.id_limit or self.stale:
+            # Index still building, fall back to checking everything
+            self.build()
+            return [track_id for track_id in self.library.order
+                    if self.matches(track_id, terms)]
+
+        # Start from whichever term has the fewest candidates
+        pools = [(self.candidates(term), term) for term in terms if len(term) >= 2]
+        if pools:
+            pool, first = min(pools, key=lambda item: len(item[0]))
+        else:
+            first = terms[0]
+            pool = self.candidates(first)
+        results = self.filter(pool, first)
+        for term in terms:
+            if term != first:
+                results = self.filter(results, term)
+        return self.in_order(results)
+
+    def matches(self, track_id, terms):
+        text = self.haystack(track_id)
+        if not text:
+            return False
+        for term in terms:
+            if len(term) >= 3:
+                if term not in text:
+                    return False
+            elif not text.startswith(term) and " " + term not in text:
+                return False
+        return True
+
+    def reset(self):
+        """Drop remembered results after the library changed"""
+        self.history.clear()
+        self.build()
@@ -0,0 +1,59 @@
+import json
+import os
+import tempfile
+
+# Seconds between saves of the session while the daemon runs
+SAVE_INTERVAL = 30
+
+# Tracks of the play history kept across runs, for b and shuffle
+SAVED_HISTORY = 100
+
+def state_dir():
+    """Directory for the session and playlists, kept apart from the caches"""
+    base = os.environ.get("XDG_STATE_HOME") or os.path.expanduser("~/.local/state")
+    return os.path.join(base, "pytermusic")
+
+def write_atomic(path, data):
+    """Replace a file with data in one step, a crash leaves the old one or the new one"""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, temp = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp, path)
+    except BaseException:
+        os.unlink(temp)
+        raise
+
+class Session:
+    """What was playing, queued and set when the player last ran
+
+    Tracks are kept by path, which outlives the track IDs of one run.
+    save() only writes when something changed since the last save.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(state_dir(), "session.json")
+        self.saved = None
+
+    def load(self):
+        """The saved state as a dict, empty if there is none or it can't be read"""
+        try:
+            with open(self.path, "rb") as f:
+                state = json.loads(f.read())
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(state, dict):
+            return {}
+        self.saved = state
+        return dict(state)
+
+    def save(self, state):
+        if state == self.saved:
+            return False
+        write_atomic(self.path, json.dumps(state, separators=(",", ":")).encode())
+        self.saved = state
+        return True
@@ -0,0 +1,125 @@
+import random
+from collections import deque
+
+# Tracks remembered for b, oldest dropped first
+HISTORY_SIZE = 1000
+
+# Candidates a weighted draw looks at before it takes whatever comes next
+MAX_TRIES = 8
+
+class Shuffler:
+    """Shuffled play order, drawn one track at a time without repeats
+
+    A Fisher-Yates shuffle of the track IDs run lazily: each draw swaps a
+    random undrawn slot into the drawn part, so starting costs nothing and
+    only slots moved so far are stored. Slot i holds track ID i until it's
+    swapped, which lets tracks added later join the undrawn part as they
+    get IDs. Removed tracks are skipped. Once every track has been drawn a
+    new round starts, never with the track that ended the last one.
+
+    weight, if given, maps a track ID to the chance (0 to 1) it's taken when
+    drawn. Tracks passed over stay in the round for a later draw.
+    """
+
+    def __init__(self, library, current=None, weight=None, rng=None):
+        self.library = library
+        self.weight = weight
+        self.random = rng or random.Random()
+        self.swapped = {}
+        self.drawn = 0
+        self.pending = None
+        self.last = current
+        if current is not None:
+            # The song playing now counts as drawn
+            self.consume(current)
+
+    def slot(self, index):
+        return self.swapped.get(index, index)
+
+    def consume(self, index):
+        """Move the track in slot index into the drawn part"""
+        self.swapped[index] = self.slot(self.drawn)
+        # The drawn part is never read again
+        self.swapped.pop(self.drawn, None)
+        self.drawn += 1
+
+    def peek(self):
+        """The track the next take() returns, drawn if need be"""
+        if self.pending is None or self.library.position(self.pending) is None:
+            self.pending = self.draw()
+        return self.pending
+
+    def take(self):
+        track_id = self.peek()
+        self.pending = None
+        self.last = track_id
+        return track_id
+
+    def draw(self):
+        library = self.library
+        if not len(library):
+            return None
+        tries = 0
+        while True:
+            size = library.id_limit
+            if self.drawn >= size:
+                self.swapped.clear()
+                self.drawn = 0
+            index = self.random.randrange(self.drawn, size)
+            track_id = self.slot(index)
+            if library.position(track_id) is None:
+                self.consume(index)
+                continue
+            if track_id == self.last and len(library) > 1:
+                continue
+            tries += 1
+            if (self.weight is not None and tries < MAX_TRIES
+                    and self.random.random() >= self.weight(track_id)):
+                continue
+            self.consume(index)
+            return track_id
+
+class History:
+    """The last HISTORY_SIZE tracks that played, with a cursor for b
+
+    back counts steps from the newest entry. Stepping back and forward
+    moves the cursor, and a track played any other way goes on the end.
+    """
+
+    def __init__(self, size=HISTORY_SIZE):
+        self.tracks = deque(maxlen=size)
+        self.back = 0
+
+    def played(self, track_id):
+        """Note a track starting, unless the cursor just moved to it"""
+        if self.back and self.tracks[-1 - self.back] == track_id:
+            return
+        self.back = 0
+        if not self.tracks or self.tracks[-1] != track_id:
+            self.tracks.append(track_id)
+
+    def previous(self):
+        """Step back, returning the track played before, or None"""
+        if self.back + 1 >= len(self.tracks):
+            return None
+        self.back += 1
+        return self.tracks[-1 - self.back]
+
+    def following(self):
+        """The track stepping forward goes to, None at the newest"""
+        return self.tracks[-self.back] if self.back else None
+
+    def forward(self):
+        track_id = self.following()
+        if track_id is not None:
+            self.back -= 1
+        return track_id
+
+    def restore(self, track_ids):
+        """Put tracks played in an earlier run before the ones played since"""
+        self.tracks = deque(list(track_ids) + list(self.tracks), maxlen=self.tracks.maxlen)
+
+    def recent(self, count):
+        """The last count tracks played, up to the one at the cursor"""
+        end = len(self.tracks) - self.back
+        return [self.tracks[i] for i in range(max(0, end - count), end)]
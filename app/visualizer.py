@@ -0,0 +1,141 @@
+import math
+import queue
+import threading
+from collections import OrderedDict
+import pygame
+from app.decode import decode, numpy
+from app.levels import BANDS, FLOOR_DB, FPS, ROW
+
+# Seconds decoded at a time, which bounds the memory a long mix needs
+CHUNK_SECONDS = 5
+CHUNK_FRAMES = CHUNK_SECONDS * FPS
+
+# Envelopes kept in memory, by path
+KEEP_TRACKS = 8
+
+# Band edges in Hz, log spaced
+LOW_HZ = 40
+HIGH_HZ = 16000
+
+class Envelope:
+    """Level and band energies of a track, FPS rows of ROW bytes per second"""
+
+    def __init__(self, duration):
+        frames = int(math.ceil(duration * FPS)) + 1
+        self.data = numpy.zeros((frames, ROW), dtype=numpy.uint8)
+        self.done = numpy.zeros(-(-frames // CHUNK_FRAMES), dtype=bool)
+
+    def available(self, start, count):
+        """The analysed rows from start on, stopping at the first gap"""
+        end = min(start + count, len(self.data))
+        if start >= end or not self.done[start // CHUNK_FRAMES]:
+            return b""
+        chunk = start // CHUNK_FRAMES
+        while chunk * CHUNK_FRAMES < end and self.done[chunk]:
+            chunk += 1
+        return self.data[start:min(end, chunk * CHUNK_FRAMES)].tobytes()
+
+class Visualizer(threading.Thread):
+    """Works out a track's levels and spectrum on a worker thread
+
+    The track is decoded CHUNK_SECONDS at a time, starting from the frame
+    index, and each chunk's FFT band energies are written into the track's
+    Envelope. Analysis starts at the chunk being asked for and runs on to
+    the end, then fills in the start. Envelopes are kept per track, so
+    replays and seeks only read what is already there.
+    """
+
+    def __init__(self, cache):
+        super().__init__(daemon=True)
+        self.cache = cache
+        self.jobs = queue.Queue()
+        self.envelopes = OrderedDict()
+        self.lock = threading.Lock()
+        self.wanted = None
+        self.windows = {}
+
+    def levels(self, path, duration, start, count):
+        """Rows from frame start on as bytes, empty until they are analysed"""
+        with self.lock:
+            envelope = self.envelopes.get(path)
+            if envelope is not None:
+                self.envelopes.move_to_end(path)
+        rows = envelope.available(start, count) if envelope is not None else b""
+        if not rows:
+            self.want(path, duration, start // CHUNK_FRAMES)
+        return rows
+
+    def want(self, path, duration, chunk):
+        if (path, chunk) != self.wanted and duration > 0:
+            self.wanted = (path, chunk)
+            self.jobs.put((path, duration, chunk))
+
+    def stop(self):
+        self.jobs.put(None)
+
+    def run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            try:
+                self.analyse(*job)
+            except (OSError, ValueError, pygame.error):
+                pass
+
+    def analyse(self, path, duration, first):
+        with self.lock:
+            envelope = self.envelopes.get(path)
+            if envelope is None:
+                envelope = self.envelopes[path] = Envelope(duration)
+                while len(self.envelopes) > KEEP_TRACKS:
+                    self.envelopes.popitem(last=False)
+        index = self.cache.get_seek_index(path)
+        if index is None:
+            return
+
+        chunks = len(envelope.done)
+        for chunk in list(range(first, chunks)) + list(range(first)):
+            if not self.jobs.empty():
+                return  # another track or a seek, this one keeps what it has
+            if not envelope.done[chunk]:
+                self.analyse_chunk(path, index, envelope, chunk)
+                envelope.done[chunk] = True
+
+    def analyse_chunk(self, path, index, envelope, chunk):
+        samples, rate = decode(path, index, chunk * CHUNK_SECONDS, CHUNK_SECONDS)
+        samples = samples.mean(axis=1)
+        hop = rate // FPS
+        first = chunk * CHUNK_FRAMES
+        count = min(CHUNK_FRAMES, len(envelope.data) - first, len(samples) // hop)
+        if count <= 0:
+            return
+        windows = samples[:count * hop].reshape(count, hop)
+        envelope.data[first:first + count] = self.rows(windows, rate)
+
+    def rows(self, windows, rate):
+        """Level and band energies of each window, scaled to 0-255"""
+        hop = windows.shape[1]
+        window, edges = self.window(hop, rate)
+        spectrum = numpy.abs(numpy.fft.rfft(windows * window, axis=1)) ** 2
+        bands = numpy.add.reduceat(spectrum[:, :edges[-1]], edges[:-1], axis=1)
+        # Full scale in a band is about a full scale sine's peak bin
+        bands_db = 10 * numpy.log10(bands / (hop / 4) ** 2 + 1e-12)
+        level_db = 10 * numpy.log10(numpy.mean(windows ** 2, axis=1) + 1e-12)
+
+        rows = numpy.empty((len(windows), ROW))
+        rows[:, 0] = level_db
+        rows[:, 1:] = bands_db
+        return numpy.clip((rows - FLOOR_DB) * (255 / -FLOOR_DB), 0, 255).astype(numpy.uint8)
+
+    def window(self, hop, rate):
+        """Hann window and FFT bin band edges for a window length, made once"""
+        if hop not in self.windows:
+            high = min(HIGH_HZ, rate / 2)
+            hz = numpy.geomspace(LOW_HZ, high, BANDS + 1)
+            edges = numpy.round(hz * hop / rate).astype(int)
+            # At least one bin per band
+            for i in range(1, len(edges)):
+                edges[i] = max(edges[i], edges[i - 1] + 1)
+            self.windows[hop] = (numpy.hanning(hop), edges)
+        return self.windows[hop]
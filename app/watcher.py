@@ -0,0 +1,413 @@
+import ctypes
+import ctypes.util
+import errno
+import os
+import queue
+import select
+import struct
+import threading
+import time
+from app.scanner import is_mp3
+
+# inotify constants from <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE
+              | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+
+EVENT_HEADER = struct.Struct("iIII")
+
+def under(path, directory):
+    return path.startswith(directory) and path[len(directory):len(directory) + 1] == os.sep
+
+class Changes:
+    """A coalesced set of library changes
+
+    dirs lists (old, new) for directories renamed and (old, None) for ones
+    deleted, in the order it happened. They come before the rest, whose
+    paths are the ones after every directory change.
+    """
+
+    def __init__(self):
+        self.added = set()
+        self.removed = set()
+        self.modified = set()
+        self.renamed = {}
+        self.dirs = []
+
+    def add(self, path):
+        if path in self.removed:
+            # Deleted and recreated, treat as rewritten
+            self.removed.discard(path)
+            self.modified.add(path)
+        else:
+            self.added.add(path)
+
+    def remove(self, path):
+        self.modified.discard(path)
+        if path in self.added:
+            self.added.discard(path)
+            return
+        # Removing a rename target removes the original track
+        for old, new in self.renamed.items():
+            if new == path:
+                del self.renamed[old]
+                self.removed.add(old)
+                return
+        self.removed.add(path)
+
+    def modify(self, path):
+        if path not in self.added:
+            self.modified.add(path)
+
+    def rename(self, old, new):
+        if old in self.added:
+            self.added.discard(old)
+            self.added.add(new)
+            return
+        # Chained renames collapse to one
+        for first, target in self.renamed.items():
+            if target == old:
+                old = first
+                break
+        self.renamed[old] = new
+
+    def move_dir(self, old, new):
+        """A directory renamed, every path below it follows"""
+        def moved(path):
+            return new + path[len(old):] if under(path, old) else path
+        self.added = {moved(path) for path in self.added}
+        self.removed = {moved(path) for path in self.removed}
+        self.modified = {moved(path) for path in self.modified}
+        self.renamed = {moved(first): moved(target) for first, target in self.renamed.items()}
+        self.dirs.append((old, new))
+
+    def remove_dir(self, directory):
+        """A directory deleted with everything below it"""
+        for old, new in list(self.renamed.items()):
+            if under(new, directory):
+                del self.renamed[old]
+                self.removed.add(old)
+            elif under(old, directory):
+                # Whatever was at old goes with the directory
+                del self.renamed[old]
+                self.added.add(new)
+        self.added = {path for path in self.added if not under(path, directory)}
+        self.removed = {path for path in self.removed if not under(path, directory)}
+        self.modified = {path for path in self.modified if not under(path, directory)}
+        self.dirs.append((directory, None))
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.modified or self.renamed or self.dirs)
+
+def load_inotify():
+    """Return libc if it exposes inotify, otherwise None"""
+    name = ctypes.util.find_library("c")
+    if name is None:
+        return None
+    try:
+        libc = ctypes.CDLL(name, use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+class LibraryWatcher(threading.Thread):
+    """Watch the library directories and post debounced Changes
+
+    Uses inotify when the platform has it, otherwise re-lists any directory
+    whose mtime moved every poll_interval seconds. A burst of events is
+    posted as one Changes once debounce seconds pass without a new event.
+    """
+
+    def __init__(self, dirs, cache, debounce=0.5, poll_interval=5.0, use_inotify=True, notify=None):
+        super().__init__(daemon=True)
+        self.dirs = set(dirs)
+        self.cache = cache
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.notify = notify
+        self.changes = queue.Queue()
+        self.stopped = threading.Event()
+        self.pending = Changes()
+        self.last_event = 0.0
+        self.libc = load_inotify() if use_inotify else None
+        self.fd = -1
+        self.watches = {}
+        self.moves = {}
+        self.dir_moves = {}
+
+    def run(self):
+        if self.libc is not None and self.start_inotify():
+            self.run_inotify()
+        else:
+            self.run_polling()
+
+    def stop(self):
+        self.stopped.set()
+
+    def flush(self, force=False):
+        """Post pending changes once the burst has gone quiet"""
+        if not self.pending and not self.moves and not self.dir_moves:
+            return
+        if force or time.monotonic() - self.last_event >= self.debounce:
+            # A move whose other half never arrived is a plain delete
+            for path in self.moves.values():
+                self.pending.remove(path)
+            self.moves.clear()
+            for path in self.dir_moves.values():
+                self.remove_tree(path)
+            self.dir_moves.clear()
+            self.changes.put(self.pending)
+            self.pending = Changes()
+            if self.notify is not None:
+                self.notify()
+
+    def get_changes(self):
+        """Merge every Changes posted since the last call, or None"""
+        merged = None
+        while True:
+            try:
+                changes = self.changes.get_nowait()
+            except queue.Empty:
+                return merged
+            if merged is None:
+                merged = changes
+                continue
+            for old, new in changes.dirs:
+                if new is None:
+                    merged.remove_dir(old)
+                else:
+                    merged.move_dir(old, new)
+            for old, new in changes.renamed.items():
+                merged.rename(old, new)
+            for path in changes.removed:
+                merged.remove(path)
+            for path in changes.added:
+                merged.add(path)
+            for path in changes.modified:
+                merged.modify(path)
+
+    # inotify backend
+
+    def start_inotify(self):
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            return False
+        for directory in sorted(self.dirs):
+            if not self.add_watch(directory):
+                # Probably out of watches, poll everything instead
+                os.close(self.fd)
+                self.fd = -1
+                self.watches.clear()
+                return False
+        return True
+
+    def add_watch(self, directory):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            return ctypes.get_errno() == errno.ENOENT
+        self.watches[wd] = directory
+        self.dirs.add(directory)
+        return True
+
+    def run_inotify(self):
+        try:
+            while not self.stopped.is_set():
+                timeout = self.debounce if self.pending else 1.0
+                ready, _, _ = select.select([self.fd], [], [], timeout)
+                if ready:
+                    self.read_events()
+                self.flush()
+        finally:
+            os.close(self.fd)
+
+    def read_events(self):
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset < len(data):
+            wd, mask, cookie, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            self.handle_event(wd, mask, cookie, os.fsdecode(name))
+        self.last_event = time.monotonic()
+
+    def handle_event(self, wd, mask, cookie, name):
+        if mask & IN_Q_OVERFLOW:
+            # Events were dropped, fall back to diffing every directory
+            for directory in list(self.dirs):
+                self.rescan_dir(directory)
+            return
+        directory = self.watches.get(wd)
+        if directory is None:
+            return
+        if mask & IN_IGNORED:
+            del self.watches[wd]
+            return
+        if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+            return
+        path = os.path.join(directory, name)
+
+        if mask & IN_ISDIR:
+            if mask & IN_MOVED_FROM:
+                self.dir_moves[cookie] = path
+            elif mask & IN_MOVED_TO:
+                old = self.dir_moves.pop(cookie, None)
+                if old is not None:
+                    self.move_tree(old, path)
+                else:
+                    self.add_tree(path)
+            elif mask & IN_CREATE:
+                self.add_tree(path)
+            elif mask & IN_DELETE:
+                self.remove_tree(path)
+            return
+
+        if not is_mp3(name):
+            return
+        if mask & IN_MOVED_FROM:
+            self.moves[cookie] = path
+        elif mask & IN_MOVED_TO:
+            old = self.moves.pop(cookie, None)
+            if old is not None:
+                self.pending.rename(old, path)
+            else:
+                self.pending.add(path)
+        elif mask & IN_DELETE:
+            self.pending.remove(path)
+        elif mask & IN_CLOSE_WRITE:
+            if path in self.cache.entries:
+                self.pending.modify(path)
+            else:
+                self.pending.add(path)
+
+    def add_tree(self, directory):
+        """Start watching a new directory and add everything under it"""
+        if self.fd >= 0:
+            self.add_watch(directory)
+        else:
+            self.dirs.add(directory)
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+            with os.scandir(directory) as it:
+                entries = list(it)
+        except OSError:
+            return
+        files = []
+        subdirs = []
+        for entry in entries:
+            try:
+                if entry.is_dir():
+                    subdirs.append(entry.name)
+                    self.add_tree(entry.path)
+                elif is_mp3(entry.name):
+                    files.append(entry.name)
+                    self.pending.add(entry.path)
+            except OSError:
+                continue
+        self.cache.store_dir(directory, mtime, files, subdirs)
+
+    def move_tree(self, old, new):
+        """Follow a directory renamed within the library, its tracks keep their IDs"""
+        def moved(path):
+            return new + path[len(old):]
+        for wd, path in self.watches.items():
+            if path == old or under(path, old):
+                # The watch stays on the directory wherever it goes
+                self.watches[wd] = moved(path)
+        for path in [d for d in self.dirs if d == old or under(d, old)]:
+            self.dirs.discard(path)
+            self.dirs.add(moved(path))
+            cached = self.cache.get_dir(path)
+            if cached is not None:
+                self.cache.store_dir(moved(path), *cached)
+        self.pending.move_dir(old, new)
+
+    def remove_tree(self, directory):
+        """Remove every track under a deleted directory
+
+        Which tracks those are is left to the library, the cached listings
+        miss files added since they were stored.
+        """
+        for wd, path in list(self.watches.items()):
+            if path == directory or under(path, directory):
+                self.libc.inotify_rm_watch(self.fd, wd)
+                del self.watches[wd]
+        for path in [d for d in self.dirs if d == directory or under(d, directory)]:
+            self.dirs.discard(path)
+        self.pending.remove_dir(directory)
+
+    # Polling backend
+
+    def run_polling(self):
+        mtimes = {}
+        for directory in self.dirs:
+            cached = self.cache.get_dir(directory)
+            if cached is not None:
+                mtimes[directory] = cached[0]
+        next_poll = time.monotonic() + self.poll_interval
+        while not self.stopped.wait(min(self.debounce, self.poll_interval)):
+            if time.monotonic() >= next_poll:
+                for directory in list(self.dirs):
+                    try:
+                        mtime = os.stat(directory).st_mtime_ns
+                    except OSError:
+                        self.remove_tree(directory)
+                        continue
+                    if mtimes.get(directory) != mtime:
+                        mtimes[directory] = mtime
+                        self.rescan_dir(directory)
+                next_poll = time.monotonic() + self.poll_interval
+            self.flush()
+
+    def rescan_dir(self, directory):
+        """Diff one directory against its cached listing"""
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+            with os.scandir(directory) as it:
+                entries = list(it)
+        except OSError:
+            self.remove_tree(directory)
+            return
+        files = []
+        subdirs = []
+        for entry in entries:
+            try:
+                if entry.is_dir():
+                    subdirs.append(entry.name)
+                elif is_mp3(entry.name):
+                    files.append(entry.name)
+            except OSError:
+                continue
+
+        cached = self.cache.get_dir(directory)
+        old_files = set(cached[1]) if cached else set()
+        old_subdirs = set(cached[2]) if cached else set()
+        for name in set(files) - old_files:
+            self.pending.add(os.path.join(directory, name))
+        for name in old_files - set(files):
+            self.pending.remove(os.path.join(directory, name))
+        for name in set(subdirs) - old_subdirs:
+            self.add_tree(os.path.join(directory, name))
+        for name in old_subdirs - set(subdirs):
+            self.remove_tree(os.path.join(directory, name))
+        self.cache.store_dir(directory, mtime, files, subdirs)
+        if self.pending:
+            self.last_event = time.monotonic()
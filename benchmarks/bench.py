@@ -0,0 +1,370 @@
+"""Benchmark scanning, tag reads, indexing, playback start, seeking, list ordering and memory
+
+Run from the repository root:
+
+    python -m benchmarks.bench --output results.json
+    python -m benchmarks.bench --compare old.json --output new.json
+
+Libraries are generated in a temporary directory and audio goes to SDL's
+dummy driver, so this runs offline on a headless machine.
+"""
+import os
+import sys
+
+# Must be set before pygame is imported
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ["PYTERMUSIC_NOTIFY"] = "none"
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from benchmarks.synth import (FRAME_SIZE, SAMPLE_RATE, SAMPLES_PER_FRAME, id3_tag, make_library,
+                              silent_frames, synthetic_paths, write_vbr_mix)
+from benchmarks.tagreader import compare_readers
+
+def log(message):
+    print(message, file=sys.stderr, flush=True)
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+def summary(samples):
+    """Median, 95th percentile and max of a list of timings"""
+    samples = sorted(samples)
+    return {
+        "n": len(samples),
+        "median_s": statistics.median(samples),
+        "p95_s": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        "max_s": samples[-1],
+    }
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def scan(player):
+    """Rescan the player's music directory to completion"""
+    player.scan_songs()
+    player.scanner.join()
+    player.poll_scan()
+
+def bench_scan(player, root, count):
+    """Cold scan lists every directory, warm scan reuses cached listings"""
+    player.music_dir = root
+    cold = timed(scan, player)
+    assert len(player.library) == count, (len(player.library), count)
+    warm = timed(scan, player)
+    return {"tracks": count, "cold_s": cold, "warm_s": warm}
+
+def bench_tags(paths, db_path):
+    """Cold reads parse every file, warm reads only stat it"""
+    from app.cache import MetadataCache
+
+    def read_all(cache):
+        for path in paths:
+            cache.get(path)
+        cache.flush()
+
+    cache = MetadataCache(db_path)
+    cold = timed(read_all, cache)
+    cache.close()
+
+    cache = MetadataCache(db_path)
+    warm = timed(read_all, cache)
+    hits = cache.hits
+    cache.close()
+    return {"tracks": len(paths), "cold_s": cold, "warm_s": warm, "warm_hits": hits}
+
+def bench_index(paths, tmp, workers):
+    """Bulk tag extraction with one worker and with several"""
+    from app.cache import MetadataCache
+    from app.indexer import BulkIndexer
+    result = {"tracks": len(paths)}
+    for count in sorted({1, workers}):
+        cache = MetadataCache(os.path.join(tmp, f"index-{len(paths)}-{count}.db"))
+        indexer = BulkIndexer(paths, cache, count)
+        result[f"workers_{count}_s"] = timed(indexer.run)
+        cache.close()
+    return result
+
+def bench_play(player, samples):
+    """Time from play() to the mixer playing, one sample per track"""
+    import pygame
+    timings = []
+    for position in range(min(samples, len(player.library))):
+        player.stop()
+        player.current_id = player.library.id_at(position)
+        timings.append(timed(player.play))
+        assert pygame.mixer.music.get_busy()
+    player.stop()
+    return summary(timings)
+
+def bench_seek(tmp, minutes, samples=50):
+    """Build the seek index of a long mix and time seeks across it
+
+    One mix is constant bitrate with no Xing header, the other variable
+    bitrate behind a Xing TOC, whose entries are a percent of the mix apart
+    and only 1/256 of its size precise. The frame every seek lands on
+    is looked up in where the frames were written and checked against the
+    target, and against the time seek_offset() reported for it.
+    """
+    import random
+    from bisect import bisect_right
+    from app.cache import MetadataCache
+    from app.mp3info import seek_offset
+
+    frames = minutes * 60 * SAMPLE_RATE // SAMPLES_PER_FRAME
+    frame_time = SAMPLES_PER_FRAME / SAMPLE_RATE
+    tag = id3_tag("Mix", "Artist", "Album", 1)
+    results = {"minutes": minutes}
+    for kind in ("cbr", "toc"):
+        path = os.path.join(tmp, f"mix-{kind}.mp3")
+        with open(path, "wb") as f:
+            f.write(tag)
+            if kind == "cbr":
+                f.write(silent_frames(frames))
+                offsets = range(len(tag), len(tag) + frames * FRAME_SIZE, FRAME_SIZE)
+            else:
+                offsets = [len(tag) + offset for offset in write_vbr_mix(f, frames)]
+
+        cache = MetadataCache(os.path.join(tmp, f"seek-{kind}.db"))
+        build = timed(cache.get_seek_index, path)
+        cached = timed(cache.get_seek_index, path)
+        index = cache.get_seek_index(path)
+        cache.close()
+
+        rng = random.Random(0)
+        timings, errors, reported = [], [], []
+        for _ in range(samples):
+            target = rng.uniform(0, frames * frame_time)
+            start = time.perf_counter()
+            offset, at = seek_offset(path, index, target)
+            timings.append(time.perf_counter() - start)
+            frame = bisect_right(offsets, offset) - 1
+            assert offsets[frame] == offset, f"{kind} seek to {target:.2f}s missed a frame"
+            errors.append(abs(target - frame * frame_time) / frame_time)
+            reported.append(abs(at - frame * frame_time))
+        results[kind] = {"exact_index": index.exact, "build_s": build, "cached_s": cached,
+                         "seek": summary(timings), "max_error_frames": max(errors),
+                         "max_reported_error_s": max(reported)}
+        os.unlink(path)
+    return results
+
+# Where the paths of the in-memory libraries live, like the default ~/Music
+ORDER_ROOT = "/home/listener/Music"
+
+def resident():
+    """Resident memory of this process in MB"""
+    with open("/proc/self/statm") as f:
+        pages = int(f.read().split()[1])
+    return pages * os.sysconf("SC_PAGE_SIZE") / 1e6
+
+def path_memory(store, count):
+    """Resident MB a fresh process gains holding `count` tracks one way or the other
+
+    "library" is the whole Library, "strings" just a list of full paths and
+    a path to ID dict, the way the Library used to hold them.
+    """
+    import gc
+    from app.library import Library
+    from benchmarks.synth import iter_synthetic_paths
+    gc.collect()
+    before = resident()
+    if store == "library":
+        library = Library()
+        for path in iter_synthetic_paths(count, ORDER_ROOT):
+            library.add(path)
+    else:
+        paths, ids = [], {}
+        for path in iter_synthetic_paths(count, ORDER_ROOT):
+            ids[path] = len(paths)
+            paths.append(path)
+    gc.collect()
+    return resident() - before
+
+def deep_size(*containers):
+    """Bytes held by lists, dicts and arrays and what's in them, shared strings once"""
+    seen = set()
+    size = 0
+    stack = list(containers)
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        size += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, list):
+            stack.extend(item)
+    return size
+
+def bench_order(count):
+    """Sort and shuffle an in-memory library, against keeping full path strings,
+    and sort it by tags"""
+    from app.library import Library
+    library = Library()
+    paths = synthetic_paths(count, ORDER_ROOT)
+    add = timed(lambda: [library.add(path) for path in paths])
+    shuffle = timed(library.shuffle)
+    sort = timed(library.sort)
+    library.shuffle()
+    # What sort() did when the library held full path strings
+    strings_sort = timed(lambda: library.set_order(sorted(range(count), key=paths.__getitem__)))
+
+    ids = {path: track_id for track_id, path in enumerate(paths)}
+    result = {"tracks": count, "add_s": add, "shuffle_s": shuffle, "sort_s": sort,
+              "strings_sort_s": strings_sort,
+              "path_store_mb": deep_size(library.dirs, library.dir_ids, library.dir_files,
+                                         library.track_dirs, library.file_names,
+                                         library.file_starts, library.file_lengths,
+                                         library.file_hashes, library.slots) / 1e6,
+              "strings_store_mb": deep_size(paths, ids) / 1e6}
+
+    # Shuffle play: turning it on, then drawing tracks one at a time
+    from app.shuffle import Shuffler
+    result["shuffle_on_s"] = timed(lambda: Shuffler(library, library.id_at(0)))
+    shuffler = Shuffler(library)
+    result["shuffle_draw_s"] = timed(lambda: [shuffler.take() for _ in range(1000)]) / 1000
+
+    # Tag orders, worked out from scratch and then from the kept permutation
+    from app.cache import Tags
+    for track_id, path in enumerate(paths):
+        artist, album, name = path.split(os.sep)[-3:]
+        library.set_tags(track_id, Tags(name, artist, album, track_id % 10 + 1,
+                                        float(track_id % 600), None, 1), track_id)
+    for by in ("artist", "duration"):
+        result[f"sort_{by}_s"] = timed(lambda: library.sort(by))
+        library.shuffle()
+        result[f"sort_{by}_cached_s"] = timed(lambda: library.sort(by))
+
+    if os.path.exists("/proc/self/statm"):
+        # Each measured in a new process, so nothing freed earlier is counted
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        for store in ("library", "strings"):
+            with ProcessPoolExecutor(1, multiprocessing.get_context("spawn")) as pool:
+                result[f"{store}_mb"] = pool.submit(path_memory, store, count).result()
+    return result
+
+def compare(old, new):
+    """Print how each timing changed between two result files"""
+    def timings(results, prefix=""):
+        if isinstance(results, dict):
+            key = results.get("tracks")
+            for name, value in results.items():
+                label = f"{prefix}{name}" if key is None else f"{prefix}{key}.{name}"
+                yield from timings(value, label + ".")
+        elif isinstance(results, list):
+            for item in results:
+                yield from timings(item, prefix)
+        elif prefix.endswith("_s.") and isinstance(results, (int, float)):
+            yield prefix[:-1], results
+
+    before = dict(timings(old["results"]))
+    for name, value in timings(new["results"]):
+        if name in before and before[name] > 0:
+            print(f"{name:40} {before[name]:10.4f}s -> {value:10.4f}s  ({value / before[name]:5.2f}x)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000",
+                        help="library sizes written to disk for scan and tag benchmarks")
+    parser.add_argument("--order-sizes", default="1000,10000,100000,1000000",
+                        help="in-memory library sizes for shuffle and sort")
+    parser.add_argument("--layout", choices=("deep", "flat"), default="deep")
+    parser.add_argument("--tagged", type=float, default=0.7,
+                        help="fraction of generated files with ID3 tags")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="processes for the bulk indexing benchmark")
+    parser.add_argument("--play-samples", type=int, default=50)
+    parser.add_argument("--mix-minutes", type=int, default=120,
+                        help="length of the generated mix for the seek benchmark")
+    parser.add_argument("--output", help="write JSON results here instead of stdout")
+    parser.add_argument("--compare", help="earlier JSON results to compare against")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    order_sizes = [int(size) for size in args.order_sizes.split(",") if size]
+    results = {"scan": [], "tags": [], "readers": [], "index": [], "play": None, "seek": None,
+               "order": []}
+
+    with tempfile.TemporaryDirectory(prefix="pytermusic-bench-") as tmp:
+        os.environ["XDG_CACHE_HOME"] = os.path.join(tmp, "cache")
+        # No saved session of the user's to start from or write over
+        os.environ["XDG_STATE_HOME"] = os.path.join(tmp, "state")
+        empty = os.path.join(tmp, "empty")
+        os.makedirs(empty)
+
+        from app.application import MP3Player
+        player = MP3Player(empty)
+        scan(player)
+
+        for count in sizes:
+            root = os.path.join(tmp, f"library-{count}")
+            log(f"Generating {count} tracks ({args.layout})")
+            paths = make_library(root, count, args.layout, args.tagged)
+
+            log(f"Scanning {count} tracks")
+            results["scan"].append(bench_scan(player, root, count))
+
+            log(f"Reading tags of {count} tracks")
+            results["tags"].append(bench_tags(paths, os.path.join(tmp, f"tags-{count}.db")))
+
+            log(f"Comparing tag readers on {count} tracks")
+            results["readers"].append(compare_readers(paths, repeat=1)[0])
+
+            log(f"Bulk indexing {count} tracks")
+            results["index"].append(bench_index(paths, tmp, args.workers))
+
+            if results["play"] is None and args.play_samples:
+                log(f"Starting playback of {args.play_samples} tracks")
+                results["play"] = bench_play(player, args.play_samples)
+
+        player.notifier.stop()
+        if player.watcher is not None:
+            player.watcher.stop()
+        player.cache.close()
+
+        if args.mix_minutes:
+            log(f"Seeking in a {args.mix_minutes} minute mix")
+            results["seek"] = bench_seek(tmp, args.mix_minutes)
+
+    for count in order_sizes:
+        log(f"Ordering {count} tracks")
+        results["order"].append(bench_order(count))
+
+    report = {
+        "commit": git_commit(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "layout": args.layout,
+        "tagged": args.tagged,
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+if __name__ == "__main__":
+    main()
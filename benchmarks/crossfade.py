@@ -0,0 +1,149 @@
+"""Check the crossfade engine keeps up and stays within its buffers
+
+Run from the repository root:
+
+    python -m benchmarks.crossfade --fade 2 --tracks 3
+
+Plays a few generated tracks back to back through app.crossfade.Crossfader
+on SDL's dummy audio driver, in real time, and checks the channel never ran
+dry and an end event was posted for every song it moved on to. Then mixes a
+long pair of tracks offline and checks the memory it took doesn't grow with
+their length. The exit status is 1 if either check fails.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from benchmarks.synth import frames_duration, id3_tag, silent_frames
+
+def write_track(path, frames, number):
+    with open(path, "wb") as f:
+        f.write(id3_tag(f"Track {number}", "Crossfade", "Check", number))
+        f.write(silent_frames(frames))
+    return path
+
+def frames_for(seconds):
+    return int(seconds / frames_duration(1)) + 1
+
+def play_through(paths, cache, fade):
+    """Play paths with the crossfader queued as MP3Player does, in real time"""
+    import pygame
+    from app.crossfade import Crossfader
+
+    end_event = pygame.USEREVENT + 1
+    crossfader = Crossfader(fade, cache, end_event)
+    crossfader.start()
+    ends = 0
+    start = time.perf_counter()
+    crossfader.load(paths[0])
+    crossfader.play()
+    upcoming = list(paths[1:])
+    if upcoming:
+        crossfader.queue(upcoming.pop(0))
+    while crossfader.get_busy():
+        for _ in pygame.event.get(end_event):
+            ends += 1
+            if upcoming:
+                crossfader.queue(upcoming.pop(0))
+        time.sleep(0.02)
+    ends += len(pygame.event.get(end_event))
+    elapsed = time.perf_counter() - start
+    crossfader.close()
+    return {
+        "tracks": len(paths),
+        "fade_s": crossfader.fade,
+        "played_s": elapsed,
+        "end_events": ends,
+        "underruns": crossfader.underruns,
+    }
+
+def mix_offline(paths, cache, fade):
+    """Render two tracks crossfading as fast as possible, tracking memory"""
+    import pygame
+    from app.crossfade import Crossfader, Stream
+
+    # Never started, render() is called here instead of by the feeder
+    crossfader = Crossfader(fade, cache, pygame.USEREVENT + 2)
+    crossfader.current = Stream(paths[0], cache)
+    crossfader.queued = paths[1]
+    tracemalloc.start()
+    start = time.perf_counter()
+    blocks = 0
+    with crossfader.lock:
+        while crossfader.render():
+            blocks += 1
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    pygame.event.clear(pygame.USEREVENT + 2)
+    audio = blocks * len(crossfader.pcm) / crossfader.rate
+    return {
+        "audio_s": audio,
+        "render_s": elapsed,
+        "realtime_factor": audio / elapsed if elapsed else 0.0,
+        "peak_memory_bytes": peak,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fade", type=float, default=2.0, help="crossfade seconds")
+    parser.add_argument("--tracks", type=int, default=3, help="tracks played in real time")
+    parser.add_argument("--length", type=float, default=5.0, help="seconds per real time track")
+    parser.add_argument("--long", type=float, default=600.0,
+                        help="seconds per track of the offline mix")
+    parser.add_argument("--output", help="write JSON results here instead of stdout")
+    args = parser.parse_args()
+
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import pygame
+    from app.cache import MetadataCache
+    from app.crossfade import CHUNK_SECONDS, numpy
+    if numpy is None:
+        raise SystemExit("the crossfade engine needs numpy")
+    pygame.display.init()
+    pygame.mixer.init()
+
+    failed = False
+    with tempfile.TemporaryDirectory(prefix="pytermusic-crossfade-") as tmp:
+        cache = MetadataCache(os.path.join(tmp, "library.db"))
+        short = [write_track(os.path.join(tmp, f"{n:02d}.mp3"), frames_for(args.length), n)
+                 for n in range(1, args.tracks + 1)]
+        long = [write_track(os.path.join(tmp, f"long{n}.mp3"), frames_for(args.long), n)
+                for n in (1, 2)]
+
+        results = {"realtime": play_through(short, cache, args.fade)}
+        if results["realtime"]["underruns"]:
+            failed = True
+            print(f"channel ran dry {results['realtime']['underruns']} times", file=sys.stderr)
+        if results["realtime"]["end_events"] != args.tracks:
+            failed = True
+            print(f"{results['realtime']['end_events']} end events for {args.tracks} tracks",
+                  file=sys.stderr)
+
+        results["offline"] = mix_offline(long, cache, args.fade)
+        # Two decoded chunks per track and their conversion buffers, with room to spare
+        # for the decoder; a whole track would be many times this
+        rate, _, channels = pygame.mixer.get_init()
+        bound = 8 * 2 * CHUNK_SECONDS * rate * channels * 8
+        results["offline"]["memory_bound_bytes"] = bound
+        if results["offline"]["peak_memory_bytes"] > bound:
+            failed = True
+            print(f"offline mix peaked at {results['offline']['peak_memory_bytes']} bytes",
+                  file=sys.stderr)
+        cache.close()
+    pygame.mixer.quit()
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
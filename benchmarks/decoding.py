@@ -0,0 +1,152 @@
+"""Check decoded windows of a Xing TOC file are the right length and in the right place
+
+Run from the repository root:
+
+    python -m benchmarks.decoding
+
+Builds an MP3 from real audio, pygame's house_lo.mp3 unless --source says
+otherwise, repeated into a longer track behind a Xing header with a table
+of contents. Then decodes windows of it through app.decode.decode(), as
+the crossfade engine and the visualizer do. A window must hold `seconds`
+of samples, or whatever is left of the track's duration, and line up at
+no offset with the same span of the audio frames decoded in one go. The
+frames are decoded without the Xing header for that, since the decoder
+treats a whole file with one differently from the pieces decode() hands
+it. Loudness analysis's chunks() must add up to the duration. The exit
+status is 1 if any check fails.
+"""
+import argparse
+import json
+import os
+import struct
+import sys
+import tempfile
+
+# Offsets searched either way for where a window best lines up
+MAX_LAG = 1200
+
+def frame_offsets(data):
+    """Offsets of the audio frames of an MP3, after any Xing header frame"""
+    from app.mp3info import Unusual, audio_span, frame_header, sync, xing_offset
+    with tempfile.TemporaryFile() as f:
+        f.write(data)
+        f.flush()
+        start, end = audio_span(f.fileno(), len(data))
+    pos = sync(data, start)
+    header = frame_header(data, pos)
+    if data[xing_offset(data, pos, header[0], header[2]):][:4] in (b"Xing", b"Info"):
+        pos += header[-1]
+    offsets = []
+    while pos < end:
+        try:
+            length = frame_header(data, pos)[-1]
+        except Unusual:
+            break
+        offsets.append(pos)
+        pos += length
+    return offsets, pos
+
+def write_toc_track(path, source, repeat):
+    """The frames of source `repeat` times over, behind a Xing frame with a TOC
+
+    Returns (duration, the audio frames alone).
+    """
+    from app.mp3info import frame_header, xing_offset
+    with open(source, "rb") as f:
+        data = f.read()
+    offsets, end = frame_offsets(data)
+    audio = data[offsets[0]:end] * repeat
+    starts = [offset - offsets[0] + copy * (end - offsets[0])
+              for copy in range(repeat) for offset in offsets]
+    frames = len(starts)
+    toc = bytes(starts[frames * i // 100] * 256 // len(audio) for i in range(100))
+
+    # A frame like the first audio one, silent but for the Xing header
+    header = frame_header(data, offsets[0])
+    first = bytearray(header[-1])
+    first[:4] = data[offsets[0]:offsets[0] + 4]
+    xing = xing_offset(first, 0, header[0], header[2])
+    body = b"Xing" + struct.pack(">III", 0x07, frames, len(audio)) + toc
+    first[xing:xing + len(body)] = body
+    with open(path, "wb") as f:
+        f.write(bytes(first) + audio)
+    return frames * header[5] / header[4], audio
+
+def best_lag(whole, window, at):
+    """Offset from `at` where window matches the whole decode most closely"""
+    def distance(lag):
+        if at + lag < 0 or at + lag + len(window) > len(whole):
+            return float("inf")
+        return float(abs(whole[at + lag:at + lag + len(window)] - window).mean())
+    return min(range(-MAX_LAG, MAX_LAG + 1), key=distance)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--source", help="MP3 to take the audio from")
+    parser.add_argument("--repeat", type=int, default=10, help="copies of the source audio")
+    parser.add_argument("--seconds", type=float, default=1.0, help="length of each window")
+    parser.add_argument("--step", type=float, default=3.7, help="seconds between window starts")
+    parser.add_argument("--output", help="write JSON results here instead of stdout")
+    args = parser.parse_args()
+
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+    import pygame
+    from app.decode import decode, decode_file, numpy
+    from app.loudness import chunks
+    from app.mp3info import build_seek_index
+    if numpy is None:
+        raise SystemExit("decoding windows needs numpy")
+    source = args.source or os.path.join(os.path.dirname(pygame.__file__),
+                                         "examples", "data", "house_lo.mp3")
+    if not os.path.exists(source):
+        raise SystemExit(f"no audio to build the track from, {source} is missing")
+    pygame.mixer.init()
+
+    failed = []
+    with tempfile.TemporaryDirectory(prefix="pytermusic-decoding-") as tmp:
+        path = os.path.join(tmp, "toc.mp3")
+        duration, audio = write_toc_track(path, source, args.repeat)
+        index = build_seek_index(path)
+        frames_only = os.path.join(tmp, "frames.mp3")
+        with open(frames_only, "wb") as f:
+            f.write(audio)
+        whole, rate = decode_file(frames_only)
+        total = int(round(duration * rate))
+
+        windows = []
+        start = 0.0
+        while start < duration:
+            window, _ = decode(path, index, start, args.seconds)
+            at = int(round(start * rate))
+            expected = min(int(round(args.seconds * rate)), total - at)
+            # The decoder leaves a little off the end of the whole track
+            shown = window[:max(0, len(whole) - at)]
+            lag = best_lag(whole, shown, at) if len(shown) else 0
+            windows.append({"start": round(start, 3), "samples": len(window),
+                            "expected": expected, "lag": lag})
+            if abs(len(window) - expected) > 1 or lag:
+                failed.append(f"window at {start:.2f}s: {len(window)} samples "
+                              f"for {expected}, {lag} samples out")
+            start += args.step
+
+        chunked = sum(len(samples) for samples, _ in chunks(path))
+        if abs(chunked - total) > 1:
+            failed.append(f"loudness chunks hold {chunked} samples of {total}")
+
+    pygame.mixer.quit()
+    results = {"source": source, "duration_s": duration, "samples": total,
+               "chunked_samples": chunked, "windows": windows}
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    for failure in failed:
+        print(failure, file=sys.stderr)
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Check the search index stays right as tracks are renamed, retagged and removed
+
+Run from the repository root:
+
+    python -m benchmarks.search
+
+Indexes a generated library against a cold tag cache, so the index starts
+out without any tags, then reads every track's tags, renames some files
+and removes others, refreshing the index after each change the way the
+player does. After each step every query must give the same results as an
+index built from scratch, both while the changed postings are still being
+redone and once they are, and a renamed track must turn up under its new
+name and no longer under its old one. Also reports how long the refreshes
+took next to a full rebuild. The exit status is 1 if any check fails.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+QUERIES = ("zebra", "ze", "zebra q1", "artist 3", "album 12", "al", "love", "lo",
+           "night fire", "disc", "mp3")
+
+def search(index, query):
+    index.history.clear()
+    results = index.search(query)
+    return list(results) if results is not None else None
+
+def compare(index, step, failed):
+    """Check index against one built from scratch on the same library"""
+    from app.search import SearchIndex
+    reference = SearchIndex(index.library, index.cache, index.music_dir)
+    reference.update()
+    for query in QUERIES:
+        got, expected = search(index, query), search(reference, query)
+        if got != expected:
+            failed.append(f"{step}: {query!r} found {len(got or ())} tracks, "
+                          f"a fresh index {len(expected or ())}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tracks", type=int, default=5000, help="tracks in the library")
+    parser.add_argument("--renames", type=int, default=200, help="tracks renamed")
+    parser.add_argument("--removals", type=int, default=200, help="tracks removed")
+    parser.add_argument("--output", help="write JSON results here instead of stdout")
+    args = parser.parse_args()
+
+    from app.cache import MetadataCache
+    from app.library import Library
+    from app.search import SearchIndex
+    from benchmarks.synth import make_library
+
+    failed = []
+    timings = {}
+    with tempfile.TemporaryDirectory(prefix="pytermusic-search-") as tmp:
+        root = os.path.join(tmp, "music")
+        paths = make_library(root, args.tracks, layout="flat")
+        cache = MetadataCache(os.path.join(tmp, "library.db"))
+        library = Library()
+        for path in paths:
+            library.add(path)
+        index = SearchIndex(library, cache, os.path.join(root, ""))
+        start = time.perf_counter()
+        index.update()
+        timings["build_s"] = time.perf_counter() - start
+
+        def step(name, change):
+            start = time.perf_counter()
+            change()
+            refreshed = time.perf_counter() - start
+            compare(index, name + ", before update", failed)
+            start = time.perf_counter()
+            index.update()
+            timings[name + "_s"] = refreshed + time.perf_counter() - start
+            compare(index, name, failed)
+
+        # Tags read after indexing, as the player reads them lazily
+        def read_tags():
+            for track_id in library.order:
+                library.set_tags(track_id, cache.get(library.path(track_id)))
+                index.refresh(track_id)
+        step("read_tags", read_tags)
+
+        renamed = list(library.order[:args.renames])
+        old_names = {track_id: os.path.splitext(os.path.basename(library.path(track_id)))[0]
+                     for track_id in renamed}
+        def rename():
+            for track_id in renamed:
+                old = library.path(track_id)
+                library.rename(old, os.path.join(root, f"zebra q{track_id}q.mp3"))
+                index.refresh(track_id)
+        step("rename", rename)
+        for track_id in renamed[:20]:
+            if search(index, f"q{track_id}q") != [track_id]:
+                failed.append(f"renamed track {track_id} not found by its new name")
+            if track_id in (search(index, old_names[track_id]) or ()):
+                failed.append(f"renamed track {track_id} still found by its old name")
+
+        removed = list(library.order[-args.removals:])
+        def remove():
+            library.remove([library.path(track_id) for track_id in removed])
+            for track_id in removed:
+                index.refresh(track_id)
+        step("remove", remove)
+
+    results = {"tracks": args.tracks, "renames": args.renames, "removals": args.removals,
+               **{name: round(seconds, 4) for name, seconds in timings.items()}}
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    for failure in failed:
+        print(failure, file=sys.stderr)
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
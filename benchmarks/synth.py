@@ -0,0 +1,204 @@
+"""Generate synthetic MP3 libraries for benchmarking
+
+Files are a few silent MPEG-1 Layer III frames, optionally behind an ID3v2.3
+tag. They decode and parse like real MP3s but carry no audio.
+"""
+import os
+import random
+import struct
+
+# MPEG-1 Layer III, 128 kbps, 44.1 kHz, no padding, no CRC
+FRAME_HEADER = b"\xff\xfb\x90\x64"
+FRAME_SIZE = 417
+SAMPLES_PER_FRAME = 1152
+SAMPLE_RATE = 44100
+
+WORDS = ("love night dance fire heart rain blue city dream light moon star "
+         "road home time river gold summer shadow echo").split()
+
+def silent_frames(count):
+    frame = FRAME_HEADER + bytes(FRAME_SIZE - len(FRAME_HEADER))
+    return frame * count
+
+def frames_duration(count):
+    return count * SAMPLES_PER_FRAME / SAMPLE_RATE
+
+def synchsafe(n):
+    return bytes([(n >> 21) & 0x7F, (n >> 14) & 0x7F, (n >> 7) & 0x7F, n & 0x7F])
+
+def text_frame(frame_id, text):
+    data = b"\x00" + text.encode("latin-1")
+    return frame_id.encode() + struct.pack(">I", len(data)) + b"\x00\x00" + data
+
+def id3_tag(title, artist, album, track):
+    """An ID3v2.3 tag with title, artist, album and track number frames"""
+    frames = (text_frame("TIT2", title) + text_frame("TPE1", artist)
+              + text_frame("TALB", album) + text_frame("TRCK", str(track)))
+    return b"ID3\x03\x00\x00" + synchsafe(len(frames)) + frames
+
+def make_library(root, count, layout="deep", tagged=0.7, frames=40, seed=0):
+    """Write count tracks under root, returning their paths
+
+    layout "deep" nests artist/album/disc directories, "flat" puts every
+    file in root. A `tagged` fraction of the files get ID3 tags.
+    """
+    rng = random.Random(seed)
+    audio = silent_frames(frames)
+    paths = []
+    for i in range(count):
+        artist = f"Artist {i % max(1, count // 100)}"
+        album = f"Album {i % max(1, count // 10)}"
+        track = i % 10 + 1
+        title = f"{rng.choice(WORDS)} {rng.choice(WORDS)} {i}"
+        if layout == "flat":
+            directory = root
+        else:
+            directory = os.path.join(root, artist, album, f"Disc {i % 2 + 1}")
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{track:02d} {title}.mp3")
+        with open(path, "wb") as f:
+            if rng.random() < tagged:
+                f.write(id3_tag(title, artist, album, track))
+            f.write(audio)
+        paths.append(path)
+    return paths
+
+def synthetic_paths(count, root="/music", seed=0):
+    """Realistic looking paths for in-memory benchmarks, no files written"""
+    return list(iter_synthetic_paths(count, root, seed))
+
+def iter_synthetic_paths(count, root="/music", seed=0):
+    """synthetic_paths one at a time, so only what the caller keeps is held"""
+    rng = random.Random(seed)
+    for i in range(count):
+        yield os.path.join(root, f"Artist {i % max(1, count // 100)}",
+                           f"Album {i % max(1, count // 10)}",
+                           f"{i % 10 + 1:02d} {rng.choice(WORDS)} {rng.choice(WORDS)} {i}.mp3")
+
+def xing_frame(frames, delay=576, padding=1000, info=False, size=None, toc=None):
+    """First frame carrying a Xing/Info header and a LAME tag"""
+    body = (b"Info" if info else b"Xing") + struct.pack(">II", 0x0F, frames)
+    body += struct.pack(">I", size or frames * FRAME_SIZE) + (toc or bytes(range(100)))
+    body += struct.pack(">I", 50)
+    lame = bytearray(27)
+    lame[12:15] = bytes([delay >> 4, (delay & 0xF) << 4 | padding >> 8, padding & 0xFF])
+    body += b"LAME3.99r" + bytes(lame)
+    frame = FRAME_HEADER + bytes(32) + body
+    return frame + bytes(FRAME_SIZE - len(frame))
+
+# MPEG-1 Layer III at 44.1 kHz, no padding: 64, 128 and 192 kbps headers and frame sizes
+VBR_FRAMES = ((b"\xff\xfb\x50\x64", 208), (FRAME_HEADER, FRAME_SIZE), (b"\xff\xfb\xb0\x64", 626))
+
+def write_vbr_mix(f, frames, seed=0):
+    """Write a variable bitrate stream of silent frames behind a Xing TOC
+
+    The frames come in runs of 64, 128 and 192 kbps, and the TOC holds
+    where each percent of them really starts. Returns the offset of every
+    audio frame from the start of what was written.
+    """
+    rng = random.Random(seed)
+    runs = []
+    left = frames
+    while left:
+        count = min(left, rng.randint(1, 400))
+        runs.append((rng.randrange(len(VBR_FRAMES)), count))
+        left -= count
+    offsets = []
+    pos = 0
+    for kind, count in runs:
+        size = VBR_FRAMES[kind][1]
+        offsets.extend(range(pos, pos + count * size, size))
+        pos += count * size
+    toc = bytes(offsets[frames * i // 100] * 256 // pos for i in range(100))
+    f.write(xing_frame(frames, size=pos, toc=toc))
+    for kind, count in runs:
+        header, size = VBR_FRAMES[kind]
+        f.write((header + bytes(size - len(header))) * count)
+    return [FRAME_SIZE + offset for offset in offsets]
+
+def vbri_frame(frames):
+    """First frame carrying a Fraunhofer VBRI header"""
+    toc = bytes(2 * 10)
+    body = b"VBRI" + struct.pack(">HHHIIHHHH", 1, 0, 75, frames * FRAME_SIZE, frames, 10, 1, 2, 1) + toc
+    frame = FRAME_HEADER + bytes(32) + body
+    return frame + bytes(FRAME_SIZE - len(frame))
+
+def mpeg2_frames(count):
+    """MPEG-2 Layer III, 64 kbps, 22.05 kHz, mono"""
+    frame = b"\xff\xf3\x80\xc4" + bytes(208 - 4)
+    return frame * count
+
+def id3v22_tag(title, artist, album, track):
+    def frame(frame_id, text):
+        data = b"\x00" + text.encode("latin-1")
+        return frame_id.encode() + len(data).to_bytes(3, "big") + data
+    frames = (frame("TT2", title) + frame("TP1", artist)
+              + frame("TAL", album) + frame("TRK", track))
+    return b"ID3\x02\x00\x00" + synchsafe(len(frames)) + frames
+
+def id3v1_tag(title, artist, album, track):
+    def field(text):
+        return text.encode("latin-1")[:30].ljust(30, b"\x00")
+    return b"TAG" + field(title) + field(artist) + field(album) + b"2001" + bytes(28) + bytes([0, track, 12])
+
+def write_mutagen_tags(path, version, encoding, title, artist, album, track, picture=0,
+                       albumartist=None, disc=None):
+    """Tag path with mutagen itself, to cover what real taggers write"""
+    from mutagen.id3 import ID3, APIC, TALB, TIT2, TPE1, TPE2, TPOS, TRCK
+    tags = ID3()
+    tags.add(TIT2(encoding=encoding, text=title))
+    tags.add(TPE1(encoding=encoding, text=artist))
+    tags.add(TALB(encoding=encoding, text=album))
+    tags.add(TRCK(encoding=encoding, text=track))
+    if albumartist:
+        tags.add(TPE2(encoding=encoding, text=albumartist))
+    if disc:
+        tags.add(TPOS(encoding=encoding, text=disc))
+    if picture:
+        tags.add(APIC(encoding=0, mime="image/jpeg", type=3, desc="", data=bytes(picture)))
+    tags.save(path, v2_version=version)
+
+def make_corpus(root, copies=1, frames=40):
+    """Write MP3s covering the header layouts the fast tag reader handles, or
+    should hand to mutagen, returning their paths
+    """
+    os.makedirs(root, exist_ok=True)
+    audio = silent_frames(frames)
+    title, artist, album = "Café night", "Artist Å", "Album ü"
+    variants = {
+        "v23-latin1": lambda: id3_tag(title, artist, album, 3) + audio,
+        "v22": lambda: id3v22_tag(title, artist, album, "4/12") + audio,
+        "untagged": lambda: audio,
+        "xing-lame": lambda: id3_tag(title, artist, album, 5) + xing_frame(frames - 1) + audio[FRAME_SIZE:],
+        "info-cbr": lambda: xing_frame(frames - 1, info=True) + audio[FRAME_SIZE:],
+        "vbri": lambda: id3_tag(title, artist, album, 6) + vbri_frame(frames - 1) + audio[FRAME_SIZE:],
+        "mpeg2-mono": lambda: id3_tag(title, artist, album, 7) + mpeg2_frames(frames),
+        "id3v1": lambda: audio + id3v1_tag(title, artist, album, 8),
+        "junk-before-audio": lambda: id3_tag(title, artist, album, 9) + bytes(300) + audio,
+        "garbage": lambda: random.Random(1).randbytes(frames * FRAME_SIZE),
+        "truncated": lambda: id3_tag(title, artist, album, 10)[:20],
+    }
+    mutagen_variants = {
+        "v24-utf8": (4, 3, [title], "1"),
+        "v24-multi-artist": (4, 3, [title], "2/9"),
+        "v23-utf16": (3, 1, [title], "11"),
+        "v24-utf16": (4, 1, [title], "12"),
+        "v23-picture": (3, 0, [title], "13"),
+    }
+    paths = []
+    for copy in range(copies):
+        for name, build in variants.items():
+            path = os.path.join(root, f"{name}-{copy}.mp3")
+            with open(path, "wb") as f:
+                f.write(build())
+            paths.append(path)
+        for name, (version, encoding, titles, track) in mutagen_variants.items():
+            path = os.path.join(root, f"{name}-{copy}.mp3")
+            with open(path, "wb") as f:
+                f.write(xing_frame(frames - 1) + audio[FRAME_SIZE:] if "picture" in name else audio)
+            artists = [artist, "Other"] if "multi" in name else [artist]
+            picture = 200 * 1024 if "picture" in name else 0
+            write_mutagen_tags(path, version, encoding, titles, artists, [album], [track], picture,
+                               ["Various Artists"], ["2/3"])
+            paths.append(path)
+    return paths
@@ -0,0 +1,84 @@
+"""Check the fast tag reader against mutagen and time both
+
+Run from the repository root:
+
+    python -m benchmarks.tagreader --copies 200
+
+Every file of a generated corpus is read with app.cache.read_tags (the
+fast path with its mutagen fallback) and with mutagen alone. Any file where
+the two disagree is listed and the exit status is 1.
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+from benchmarks.synth import make_corpus, make_library
+
+def same(a, b):
+    """Tags match, allowing for float rounding in the duration"""
+    return a[:4] == b[:4] and a[5:] == b[5:] and math.isclose(a.duration or 0.0, b.duration or 0.0, abs_tol=1e-6)
+
+def compare_readers(paths, repeat=3):
+    """Per-file timings of both readers, the fallback rate and any mismatches"""
+    from app.cache import read_tags, read_tags_mutagen
+    from app.mp3info import read_fast
+
+    mismatches = [(path, fast, slow) for path, fast, slow in
+                  ((path, read_tags(path), read_tags_mutagen(path)) for path in paths)
+                  if not same(fast, slow)]
+    fallbacks = sum(read_fast(path) is None for path in paths)
+
+    def best(reader):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for path in paths:
+                reader(path)
+            timings.append(time.perf_counter() - start)
+        return min(timings) / len(paths)
+
+    fast = best(read_tags)
+    slow = best(read_tags_mutagen)
+    return {
+        "tracks": len(paths),
+        "fast_per_file_s": fast,
+        "mutagen_per_file_s": slow,
+        "speedup": slow / fast if fast else 0.0,
+        "fallbacks": fallbacks,
+        "mismatches": len(mismatches),
+    }, mismatches
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--copies", type=int, default=100, help="copies of each corpus file")
+    parser.add_argument("--library", type=int, default=2000,
+                        help="also compare on a synthetic library of this many tracks")
+    parser.add_argument("--output", help="write JSON results here instead of stdout")
+    args = parser.parse_args()
+
+    results = {}
+    failed = False
+    with tempfile.TemporaryDirectory(prefix="pytermusic-tags-") as tmp:
+        corpus = make_corpus(os.path.join(tmp, "corpus"), args.copies)
+        sets = {"corpus": corpus}
+        if args.library:
+            sets["library"] = make_library(os.path.join(tmp, "library"), args.library)
+        for name, paths in sets.items():
+            results[name], mismatches = compare_readers(paths)
+            for path, fast, slow in mismatches[:20]:
+                failed = True
+                print(f"{os.path.basename(path)}: fast {fast} != mutagen {slow}", file=sys.stderr)
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""Replay scripted keystrokes through the UI and check frame costs against a baseline
+
+Run from the repository root:
+
+    python -m benchmarks.uireplay --output baseline.json
+    python -m benchmarks.uireplay --baseline baseline.json
+
+For each scenario a daemon is started on a generated library with a cold
+cache and SDL's dummy audio driver, and the player runs in a pseudo-terminal
+of a fixed size and is typed a script of keys: scrolling the whole list
+with j, jumping to either end, editing the queue in insert mode and
+skipping songs as fast as keys repeat. The frames each script caused are read back from
+PYTERMUSIC_PERF_LOG: frame time, key-to-screen latency, cells written, tag
+parses and peak memory. With --baseline every metric is checked against
+the stored run, and the exit status is 1 if any went past its threshold.
+"""
+import argparse
+import fcntl
+import json
+import os
+import platform
+import select
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import termios
+import time
+from benchmarks.synth import make_library
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Terminal the player is drawn in, rows by columns
+SCREEN = (60, 200)
+
+ESC = "\x1b"
+
+def scroll(rows):
+    # Down the whole list a row at a time, then to either end
+    return "j" * (rows - 1) + "gG"
+
+def queue_edit(rows):
+    # Queue songs from the list, then move, play and remove them in insert mode
+    return "aj" * 50 + "i" + "j" * 30 + "k" * 10 + "r" * 20 + " " + "c" + ESC
+
+def skip(rows):
+    # Skip songs as fast as keys repeat, then back through them
+    return "n" * 200 + "b" * 50 + "s"
+
+SCENARIOS = {"scroll": scroll, "queue": queue_edit, "next": skip}
+
+# A metric fails when it comes in above baseline * ratio + slack
+THRESHOLDS = {
+    "frame_mean_ms": (1.5, 0.5),
+    "frame_p95_ms": (1.5, 1.0),
+    "key_p95_ms": (1.5, 2.0),
+    "cells_per_frame": (1.1, 5.0),
+    "parses_per_frame": (1.1, 0.1),
+    "peak_rss_mb": (1.2, 5.0),
+}
+
+def log(message):
+    print(message, file=sys.stderr, flush=True)
+
+def percentile(samples, fraction):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))] if samples else 0.0
+
+def read_frames(path, skip=0):
+    """Fields of each PYTERMUSIC_PERF_LOG line after the first skip lines"""
+    frames = []
+    try:
+        with open(path) as f:
+            lines = f.readlines()[skip:]
+    except FileNotFoundError:
+        return frames
+    for line in lines:
+        fields = dict(field.split("=") for field in line.split()[1:])
+        frames.append({name: float(value) for name, value in fields.items()})
+    return frames
+
+def wait_for(condition, timeout, what):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise SystemExit(f"timed out waiting for {what}")
+        time.sleep(0.05)
+
+def library_ready(rows):
+    """The daemon is up and has every track listed"""
+    from app.protocol import call
+    try:
+        state = call("status")["state"]
+    except OSError:
+        return False
+    return state["tracks"] >= rows and not state["scanning"]
+
+class Terminal:
+    """The player running in a pseudo-terminal, with its output thrown away"""
+
+    def __init__(self, env):
+        self.fd, slave = os.openpty()
+        fcntl.ioctl(self.fd, termios.TIOCSWINSZ, struct.pack("HHHH", *SCREEN, 0, 0))
+        self.process = subprocess.Popen([sys.executable, os.path.join(ROOT, "pytermusic.py")],
+                                        stdin=slave, stdout=slave, stderr=slave, env=env,
+                                        cwd=ROOT, start_new_session=True)
+        os.close(slave)
+
+    def drain(self, timeout=0.0):
+        """Read whatever the player drew, so it never blocks on a full terminal"""
+        deadline = time.monotonic() + timeout
+        while True:
+            ready, _, _ = select.select([self.fd], [], [], max(0.0, deadline - time.monotonic()))
+            if not ready:
+                return
+            try:
+                os.read(self.fd, 65536)
+            except OSError:
+                return
+
+    def type(self, keys, pace):
+        for key in keys:
+            os.write(self.fd, key.encode())
+            self.drain(pace)
+
+    def close(self):
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        self.drain()
+        os.close(self.fd)
+
+def start_daemon(env, rows, log_path):
+    """A daemon on the library with an empty cache, once it has listed every track"""
+    os.makedirs(env["XDG_CACHE_HOME"])
+    with open(log_path, "wb") as daemon_log:
+        daemon = subprocess.Popen([sys.executable, os.path.join(ROOT, "pytermusic.py"), "--daemon"],
+                                  stdin=subprocess.DEVNULL, stdout=daemon_log, stderr=daemon_log,
+                                  env=env, cwd=ROOT)
+    try:
+        wait_for(lambda: library_ready(rows), 120, "the daemon to list the library")
+    except SystemExit:
+        daemon.kill()
+        raise
+    return daemon
+
+def run_scenario(name, keys, env, perf_log, pace):
+    """Type keys into a fresh player, returning the metrics of the frames they caused"""
+    terminal = Terminal(dict(env, PYTERMUSIC_PERF_LOG=perf_log))
+    try:
+        # Startup frames aren't part of the script
+        wait_for(lambda: (terminal.drain(0.05), read_frames(perf_log))[1], 30, "the first frame")
+        terminal.drain(0.5)
+        skip = len(read_frames(perf_log))
+
+        started = time.perf_counter()
+        terminal.type(keys, pace)
+
+        def keys_seen():
+            terminal.drain(0.05)
+            return sum("key" in frame for frame in read_frames(perf_log, skip)) >= len(keys)
+
+        wait_for(keys_seen, 120, f"the {name} keys to be handled")
+        elapsed = time.perf_counter() - started
+        frames = read_frames(perf_log, skip)
+        terminal.type("q", 0.0)
+    finally:
+        terminal.close()
+
+    totals = [frame["total"] for frame in frames]
+    latencies = [frame["key"] for frame in frames if "key" in frame]
+    return {
+        "keys": len(keys),
+        "frames": len(frames),
+        "elapsed_s": elapsed,
+        "frame_mean_ms": sum(totals) / len(totals),
+        "frame_p95_ms": percentile(totals, 0.95),
+        "frame_max_ms": max(totals),
+        "key_p95_ms": percentile(latencies, 0.95),
+        "cells_per_frame": sum(frame.get("cells", 0) for frame in frames) / len(frames),
+        "parses_per_frame": sum(frame["parses"] for frame in frames) / len(frames),
+        "peak_rss_mb": max(frame["maxrss"] for frame in frames) / 1024,
+    }
+
+def regressions(baseline, results):
+    """(scenario, metric, baseline, now, limit) for every metric past its threshold"""
+    failed = []
+    for name, metrics in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        for metric, (ratio, slack) in THRESHOLDS.items():
+            if metric not in before:
+                continue
+            limit = before[metric] * ratio + slack
+            if metrics[metric] > limit:
+                failed.append((name, metric, before[metric], metrics[metric], limit))
+    return failed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000, help="tracks in the generated library")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help="comma separated, from " + ", ".join(SCENARIOS))
+    parser.add_argument("--pace", type=float, default=0.002, help="seconds between keys")
+    parser.add_argument("--baseline", help="earlier JSON results to check against")
+    parser.add_argument("--output", help="write JSON results here instead of stdout")
+    args = parser.parse_args()
+
+    names = [name for name in args.scenarios.split(",") if name]
+    for name in names:
+        if name not in SCENARIOS:
+            raise SystemExit(f"unknown scenario {name}")
+
+    tmp = tempfile.mkdtemp(prefix="pytermusic-ui-")
+    env = dict(os.environ, SDL_AUDIODRIVER="dummy", SDL_VIDEODRIVER="dummy",
+               PYTERMUSIC_NOTIFY="none", PYGAME_HIDE_SUPPORT_PROMPT="1",
+               TERM="xterm-256color", ESCDELAY="25",
+               MUSIC_DIR=os.path.join(tmp, "music"),
+               XDG_CACHE_HOME=os.path.join(tmp, "cache"),
+               XDG_STATE_HOME=os.path.join(tmp, "state"),
+               PYTERMUSIC_SOCKET=os.path.join(tmp, "pytermusic.sock"))
+    os.environ["PYTERMUSIC_SOCKET"] = env["PYTERMUSIC_SOCKET"]
+    results = {}
+    try:
+        log(f"Generating {args.rows} tracks")
+        make_library(env["MUSIC_DIR"], args.rows)
+        for name in names:
+            keys = SCENARIOS[name](args.rows)
+            log(f"Replaying {name}: {len(keys)} keys")
+            # Each scenario starts from the same cold cache and no saved
+            # session, whatever ran before
+            scenario_env = dict(env, XDG_CACHE_HOME=os.path.join(tmp, f"cache-{name}"),
+                                XDG_STATE_HOME=os.path.join(tmp, f"state-{name}"))
+            daemon = start_daemon(scenario_env, args.rows, os.path.join(tmp, f"{name}-daemon.log"))
+            try:
+                results[name] = run_scenario(name, keys, scenario_env,
+                                             os.path.join(tmp, f"{name}.log"), args.pace)
+            finally:
+                daemon.terminate()
+                daemon.wait()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    from benchmarks.bench import git_commit
+    report = {
+        "commit": git_commit(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "rows": args.rows,
+        "screen": list(SCREEN),
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            failed = regressions(json.load(f)["results"], results)
+        for name, metric, before, now, limit in failed:
+            print(f"{name}.{metric}: {before:.2f} -> {now:.2f}, over the {limit:.2f} allowed",
+                  file=sys.stderr)
+        if failed:
+            sys.exit(1)
+        log("No regressions")
+
+if __name__ == "__main__":
+    main()
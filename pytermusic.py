@@ -1,18 +1,265 @@
-import os
-from app.application import MP3Player
 import time
+
+# Taken before anything else is imported, --startup-trace counts from here
+STARTED = time.perf_counter()
+
+import argparse
+import os
+import subprocess
+import sys
+from app.cache import MetadataCache, cache_dir
+from app.client import RemotePlayer
+from app.levels import FPS, LevelFeed, level_meter, spectrum_lines
+from app.library import SORT_ORDERS
+from app.perf import PerfMonitor, StartupTrace
+from app.protocol import call, connect, socket_path
+from app.record import Record
+from app.render import Pane, Renderer
+from app.scanner import LibraryScanner
+from app.scheduler import Scheduler
 import curses
-import mutagen
-from mutagen.mp3 import MP3
-import pygame
 import random
 
+# pytermusic ctl actions and the daemon commands they send
+CONTROLS = {
+    "play": "play", "pause": "pause", "stop": "stop",
+    "next": "next", "prev": "prev",
+    "shuffle": "shuffle", "sort": "sort",
+    "vol+": "volume_up", "vol-": "volume_down",
+    "index": "index", "analyze": "analyze", "status": "status", "quit": "quit",
+    "duplicates": "find_duplicates", "hide": "hide_duplicates",
+    "playlists": "playlists", "save": "save_playlist", "load": "load_playlist",
+    "delete": "delete_playlist", "import": "import_playlist", "export": "export_playlist",
+    "seek": "seek",
+}
+
 def format_time(seconds):
     """Format seconds into mm:ss format"""
     m, s = divmod(int(seconds), 60)
     return f"{m:02d}:{s:02d}"
 
-def main(stdscr):
+def view_position(player, view, default):
+    """Where the current song sits in the displayed list"""
+    if view is player.library.order:
+        return player.current_position or 0
+    try:
+        return view.index(player.current_id)
+    except ValueError:
+        return default
+
+def list_rows(library, view, offset, count):
+    """Rows of the song list from offset on, view positions and album headers
+
+    A header goes above the first song of each album when the list is sorted
+    by artist, and above the top row so the album in view is always named.
+    """
+    rows = []
+    position = offset
+    while len(rows) < count and position < len(view):
+        group = library.group_at(position) if view is library.order else None
+        if group is not None and (group[0] == position or position == offset):
+            rows.append(group[1])
+            if len(rows) == count:
+                break
+        rows.append(position)
+        position += 1
+    return rows
+
+def duplicate_list(player):
+    """Every copy of each duplicate, one set after another, for the song list"""
+    return [track_id for group in player.duplicate_groups() for track_id in group]
+
+def get_music_dir():
+    """Music directory from the environment, or ~/Music"""
+    return os.environ.get("MUSIC_DIR", os.path.expanduser("~/Music"))
+
+def index_only(workers=None):
+    """Scan the library and read every track's tags without starting the UI"""
+    from app.indexer import BulkIndexer
+    cache = MetadataCache()
+    scanner = LibraryScanner(get_music_dir(), cache)
+    scanner.run()
+    indexer = BulkIndexer(scanner.get_batches(), cache, workers)
+    indexer.start()
+    try:
+        while indexer.running:
+            indexer.finished.wait(0.5)
+            print(f"\rIndexing tags: {indexer.progress()}", end="", flush=True)
+    except KeyboardInterrupt:
+        # Everything written so far is kept, the next run resumes from there
+        indexer.cancel()
+        indexer.join()
+        print("\nInterrupted, run again to resume")
+    else:
+        print(f"\nIndexed {indexer.done} tracks, {indexer.failed} unreadable")
+    finally:
+        cache.close()
+
+def analyze_only(workers=None):
+    """Scan the library and work out the gain of every new or changed track"""
+    os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+    from app.loudness import LoudnessAnalyzer, numpy
+    if numpy is None:
+        raise SystemExit("--analyze needs numpy")
+    cache = MetadataCache()
+    scanner = LibraryScanner(get_music_dir(), cache)
+    scanner.run()
+    analyzer = LoudnessAnalyzer(scanner.get_batches(), cache, workers)
+    analyzer.start()
+    try:
+        while analyzer.running:
+            analyzer.finished.wait(0.5)
+            print(f"\rMeasuring loudness: {analyzer.progress()}", end="", flush=True)
+    except KeyboardInterrupt:
+        analyzer.cancel()
+        analyzer.join()
+        print("\nInterrupted, run again to resume")
+    else:
+        print(f"\nAnalysed {analyzer.done} tracks, {analyzer.failed} unreadable")
+    finally:
+        cache.close()
+
+def find_duplicates_only(workers=None):
+    """Scan the library and list the tracks holding the same audio"""
+    from app.duplicates import DuplicateFinder
+    cache = MetadataCache()
+    scanner = LibraryScanner(get_music_dir(), cache)
+    scanner.run()
+    finder = DuplicateFinder(scanner.get_batches(), cache, workers)
+    finder.start()
+    try:
+        while finder.running:
+            finder.finished.wait(0.5)
+            print(f"\rLooking for duplicates: {finder.progress()}", end="", flush=True)
+    except KeyboardInterrupt:
+        finder.cancel()
+        finder.join()
+        print("\nInterrupted, run again to resume")
+        cache.close()
+        return
+    groups = finder.duplicates()
+    cache.close()
+    print()
+    for paths in groups:
+        print("\n".join(paths), end="\n\n")
+    copies = sum(len(paths) - 1 for paths in groups)
+    print(f"{len(groups)} tracks with duplicates, {copies} extra copies, "
+          f"{finder.done} files hashed, {finder.failed} unreadable")
+
+def scan_settings():
+    """Throttle the library scan on slow mounts"""
+    scan_batch = int(os.environ.get("PYTERMUSIC_SCAN_BATCH", 500))
+    scan_delay = float(os.environ.get("PYTERMUSIC_SCAN_DELAY", 0))
+    return scan_batch, scan_delay
+
+def run_daemon(workers=None, startup_trace=False):
+    """Play music headless, taking commands on the control socket"""
+    # Only the daemon needs pygame, the UI and ctl start without it
+    os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+    trace = StartupTrace(STARTED)
+    from app.daemon import Daemon
+    trace.mark("imports")
+    scan_batch, scan_delay = scan_settings()
+    Daemon(get_music_dir(), scan_batch, scan_delay, workers,
+           trace=trace, print_trace=startup_trace).run()
+
+def attach(wakeup, workers=None, startup_trace=False):
+    """Connect to the daemon, starting one in the background if none is running
+
+    Returns the player and whether this process started the daemon.
+    """
+    try:
+        return RemotePlayer(connect(), wakeup), False
+    except OSError:
+        pass
+
+    os.makedirs(cache_dir(), exist_ok=True)
+    command = [sys.executable, os.path.abspath(__file__), "--daemon"]
+    if workers:
+        command += ["--workers", str(workers)]
+    if startup_trace:
+        command.append("--startup-trace")
+    with open(os.path.join(cache_dir(), "daemon.log"), "ab") as log:
+        daemon = subprocess.Popen(command, stdin=subprocess.DEVNULL, stdout=log, stderr=log,
+                                  start_new_session=True)
+    while True:
+        try:
+            return RemotePlayer(connect(), wakeup), True
+        except OSError:
+            if daemon.poll() is not None:
+                raise RuntimeError(f"the daemon exited, see {os.path.join(cache_dir(), 'daemon.log')}")
+            time.sleep(0.05)
+
+def seek_args(value):
+    """Daemon arguments for a ctl seek: +5 or -30 seconds, 50% or 90 seconds in"""
+    if value is None:
+        raise SystemExit("seek needs a value, e.g. +5, -30, 50% or 90")
+    try:
+        if value.endswith("%"):
+            return {"percent": float(value[:-1])}
+        if value[0] in "+-":
+            return {"offset": float(value)}
+        return {"position": float(value)}
+    except ValueError:
+        raise SystemExit(f"can't seek to {value!r}")
+
+def control(action, value=None, extra=None):
+    """Send one command to the running daemon, for key bindings and scripts"""
+    args = {}
+    if action == "seek":
+        args = seek_args(value)
+    elif action == "sort" and value is not None:
+        args = {"by": value}
+    elif action in ("save", "load", "delete"):
+        if value is None:
+            raise SystemExit(f"{action} needs a playlist name")
+        args = {"name": value}
+    elif action == "import":
+        if value is None:
+            raise SystemExit("import needs an M3U file")
+        # The daemon may be running somewhere else
+        args = {"file": os.path.abspath(value)}
+        if extra is not None:
+            args["name"] = extra
+    elif action == "export":
+        if value is None or extra is None:
+            raise SystemExit("export needs a playlist name and the file to write")
+        args = {"name": value, "file": os.path.abspath(extra)}
+    try:
+        reply = call(CONTROLS[action], **args)
+    except OSError:
+        print(f"pytermusic is not running ({socket_path()})", file=sys.stderr)
+        return 1
+    if "error" in reply:
+        print(reply["error"], file=sys.stderr)
+        return 1
+    if action == "status":
+        state = reply["state"]
+        status = "PLAYING" if state["playing"] else "PAUSED" if state["paused"] else "STOPPED"
+        print(status, state["title"] or "-")
+        if state["artist"] or state["album"]:
+            print(f"{state['artist'] or 'N/A'} - {state['album'] or 'N/A'}")
+        gain = f" ({state['gain']:+.1f} dB)" if state["gain"] is not None else ""
+        print(f"{format_time(state['position'])} / {format_time(state['length'])}, volume {state['volume']}%{gain}")
+        order = f", sorted by {state['sort']}" if state["sort"] else ""
+        if state["shuffle"]:
+            order += ", shuffling"
+        if state["hiding"]:
+            order += ", duplicates hidden"
+        print(f"{state['tracks']} tracks{order}, {len(state['queue'])} queued")
+    elif action == "playlists":
+        for name in reply["playlists"]:
+            print(name)
+    elif action == "load" and reply["missing"]:
+        print(f"{reply['missing']} tracks of {value} aren't in the library")
+    elif action == "import":
+        print(f"Imported {reply['tracks']} tracks as {reply['name']}")
+    elif action == "export":
+        print(f"Wrote {reply['tracks']} tracks to {args['file']}")
+    return 0
+
+def main(stdscr, workers=None, trace=None, startup_trace=False):
+    trace = trace or StartupTrace(STARTED)
     curses.curs_set(0)  # Hide cursor
 
     # Color variables
@@ -42,10 +289,8 @@ def main(stdscr):
     if hasattr(curses, 'use_default_colors'):
         curses.use_default_colors()
 
-    # Get music directory from environment or use default
-    music_dir = os.environ.get("MUSIC_DIR", os.path.expanduser("~/Music"))
-    player = MP3Player(music_dir)
-    
+    trace.mark("curses")
+
     # Get screen dimensions
     height, width = stdscr.getmaxyx()
     
@@ -73,181 +318,387 @@ def main(stdscr):
     q_list_offset = 0
     q_max_list_display = queue_height - 6
 
-    current_volume = player.current_volume
-    volume_up = player.volume_up()
-    volume_down = player.volume_down()
-
     # Input mode
     command_mode = True
+
+    # Search filter, results is None when the full list is shown
+    search_mode = False
+    search_query = ""
+    results = None
+
+    # The song list shows every copy of each duplicate instead
+    duplicates_view = False
+
+    # Typing the name of a playlist to load or to save the queue as, and
+    # the outcome, shown until the next key
+    playlist_prompt = None
+    playlist_name = ""
+    playlist_names = []
+    message = ""
+
+    # The cursor goes back where the last player left it, once its song is found
+    cursor_restored = False
+
+    # Seek steps in seconds, and ' then a digit jumps to that tenth of the song
+    seek_keys = {curses.KEY_LEFT: -5, curses.KEY_RIGHT: 5, ord(','): -5, ord('.'): 5,
+                 ord('<'): -30, ord('>'): 30}
+    jump_mode = False
     
+    # Panes only redraw what changed since the last frame
+    screen = Pane(stdscr)
+    record_pane = Pane(record_win)
+    info_pane = Pane(info_win, boxed=True)
+    list_pane = Pane(list_win, boxed=True)
+    queue_pane = Pane(queue_win, boxed=True)
+    renderer = Renderer(screen, record_pane, info_pane, list_pane, queue_pane)
+    record = Record()
+
+    # Draw the frame before connecting, which may mean starting the daemon
+    screen.put(0, 0, "MP3 Player - Press ? for help", curses.A_BOLD)
+    for i, line in enumerate(record.frame(False)):
+        if i + 1 < record_height:
+            record_pane.put(i + 1, 1, line, yellow)
+    info_pane.put(0, 2, "Now Playing:", curses.A_BOLD)
+    info_pane.put(2, 2, "Starting the player…")
+    list_pane.put(0, 2, "Songs", curses.A_BOLD)
+    queue_pane.put(0, 2, "Queue", curses.A_BOLD)
+    renderer.flush()
+    trace.mark("first frame")
+
+    # Playback lives in the daemon, this is one of its clients
+    scheduler = Scheduler(sys.stdin.fileno())
+    player, spawned = attach(scheduler.wake, workers, startup_trace)
+    trace.mark("started daemon" if spawned else "connected")
+    info_pane.put(2, 2, "")
+
+    # The level meter and spectrum shown instead of the record, from levels
+    # the daemon works out
+    visualizer = False
+    levels = LevelFeed(player.fetch_levels)
+    spectrum_height = 20
+
+    # Frame timings for the F12 overlay, PYTERMUSIC_PERF_LOG and F11 profiles
+    perf = PerfMonitor(player, os.environ.get("PYTERMUSIC_PERF_LOG"),
+                       int(os.environ.get("PYTERMUSIC_PROFILE_FRAMES", 100)), renderer=renderer)
+    hud_width = 30
+    hud_pane = Pane(curses.newwin(15, hud_width, 1, width - hud_width - 1), boxed=True)
+
     # Main loop
+    view = player.library.order
+    first_frame = True
+    songs_listed = False
     running = True
     while running:
-        stdscr.addstr(0, 0, "MP3 Player - Press ? for help", curses.A_BOLD)
+        perf.begin()
+        screen.put(0, 0, "MP3 Player - Press ? for help", curses.A_BOLD)
         
+        # Take in what the daemon changed, from any client
+        if not player.connected:
+            raise ConnectionError("lost the pytermusic daemon")
+        selected_id = view[selected_index] if selected_index < len(view) else None
+        changed = player.poll()
+        if "queue" in changed:
+            q_selected_index = max(0, min(q_selected_index, len(player.queue) - 1))
+        if "order" in changed or "tags" in changed or (duplicates_view and "duplicates" in changed):
+            if results is None:
+                # Songs found, removed or reordered, stay on the same song
+                position = player.library.position(selected_id) if selected_id is not None else None
+                selected_index = position if position is not None else min(selected_index, max(len(player.library) - 1, 0))
+            elif duplicates_view:
+                results = duplicate_list(player)
+                selected_index = max(0, min(selected_index, len(results) - 1))
+            else:
+                results = player.search.search(search_query)
+                selected_index = max(0, min(selected_index, len(results) - 1))
+
+        if not cursor_restored and results is None and player.cursor_id is not None:
+            position = player.library.position(player.cursor_id)
+            if position is not None:
+                selected_index = position
+                cursor_restored = True
+
+        # The list shows search results when filtering
+        view = player.library.order if results is None else results
+
         # Update song position
         player.update_position()
+        perf.mark("update")
         
         # Draw record
-        record_win.clear()
-        record_frame = player.get_current_record_frame()
         record_height, record_width = record_win.getmaxyx()
-        for i, line in enumerate(record_frame):
-            if i + 1 < record_height:
-                display_line = line[:record_width-2]
-                record_win.addstr(i + 1, 1, line, curses.color_pair(3))
+        if visualizer:
+            row = None
+            if player.current_id is not None and (player.is_playing or player.paused):
+                row = levels.frame(player.current_id, player.song_position)
+            for i, line in enumerate(spectrum_lines(row, spectrum_height)):
+                record_pane.put(i + 1, 1, line, yellow)
+            record_pane.put(spectrum_height + 2, 1, level_meter(row, record_width - 2), green)
+            if not player.levels_supported:
+                record_pane.put(spectrum_height + 3, 1, "The daemon needs NumPy for this", red)
+        else:
+            record_frame = record.frame(player.is_playing)
+            for i, line in enumerate(record_frame):
+                if i + 1 < record_height:
+                    record_pane.put(i + 1, 1, line, curses.color_pair(3))
+        perf.mark("record")
             
         # Draw info
-        info_win.clear()
-        info_win.box()
-        info_win.addstr(0, 2, "Now Playing:", curses.A_BOLD)
+        info_pane.put(0, 2, "Now Playing:", curses.A_BOLD)
 
-        current_song = player.get_current_song_info()
         status = "PLAYING" if player.is_playing else "PAUSED" if player.paused else "STOPPED"
-        
-        # Exception if file does not have mp3 tags
-        try:
-            current_song = player.get_current_song_info()
-            info_win.addstr(2, 2, f"{str(current_song["title"])[2:-2]}", curses.A_BOLD)
-            info_win.addstr(4, 2, f"Ablum: {str(current_song["album"])[2:-2]}", yellow)
-            info_win.addstr(5, 2, f"Artist: {str(current_song["artist"])[2:-2]}", yellow)
-        except KeyError:
-            current_song = player.get_default_current_song_info()
-            info_win.addstr(2, 2, f"{str(current_song)}", curses.A_BOLD)
-            info_win.addstr(4, 2, f"Ablum: N/A", yellow)
-            info_win.addstr(5, 2, f"Artist: N/A", yellow)
+
+        # Fall back to the filename if the file does not have mp3 tags
+        current_song = player.get_current_song_info()
+        if current_song is not None:
+            # The daemon sends the title with the filename fallback, the
+            # titles of listed songs only cover the rows on screen
+            info_pane.put(2, 2, current_song.title or player.get_song_title(player.current_id),
+                          curses.A_BOLD)
+            info_pane.put(4, 2, f"Ablum: {current_song.album or 'N/A'}", yellow)
+            info_pane.put(5, 2, f"Artist: {current_song.artist or 'N/A'}", yellow)
 
         if player.is_playing:
-            info_win.addstr(7, 2, status, green)
+            info_pane.put(7, 2, status, green)
         elif player.paused:
-            info_win.addstr(7, 2, status, yellow)
+            info_pane.put(7, 2, status, yellow)
         else:
-            info_win.addstr(7, 2, status, red)
+            info_pane.put(7, 2, status, red)
+        info_pane.put(7, 12, "SHUFFLE" if player.shuffling else "", cyan)
  
         # Show position/duration
         if player.is_playing or player.paused:
             position_str = f"{format_time(player.song_position)} / {format_time(player.song_length)}"
-            info_win.addstr(9, 2, position_str)
+            info_pane.put(9, 2, position_str)
+        else:
+            info_pane.put(9, 2, "")
 
         # Progress bar
         progress_width = info_width - 8
         if player.song_length > 0:
             progress = int((player.song_position / player.song_length) * progress_width)
             progress_bar = "#" * progress + "-" * (progress_width - progress)
-            info_win.addstr(11, 2, f"[{progress_bar}]")
+            info_pane.put(11, 2, f"[{progress_bar}]")
 
         # Volume
-        info_win.addstr(13, 2, f"Volume: {current_volume}%", cyan)
+        gain = f" ({player.gain:+.1f} dB)" if player.gain is not None else ""
+        info_pane.put(13, 2, f"Volume: {player.current_volume}%{gain}", cyan)
         
         # Draw song list
-        list_win.clear()
-        list_win.box()
-        list_win.addstr(0, 2, f"Songs ({len(player.songs)})", curses.A_BOLD)
+        if duplicates_view and player.duplicate_progress():
+            list_pane.put(0, 2, f"Duplicates ({player.duplicate_progress()})", curses.A_BOLD)
+        elif duplicates_view:
+            list_pane.put(0, 2, f"Duplicates ({len(results)} files)", curses.A_BOLD)
+        elif results is not None:
+            list_pane.put(0, 2, f"Songs ({len(results)} of {len(player.library)} matching)", curses.A_BOLD)
+        elif player.scanning:
+            list_pane.put(0, 2, f"Songs (scanning… {len(player.library)} found)", curses.A_BOLD)
+        elif player.indexing:
+            list_pane.put(0, 2, f"Songs ({len(player.library)}, reading tags {player.index_progress()})", curses.A_BOLD)
+        elif player.analysis_progress():
+            list_pane.put(0, 2, f"Songs ({len(player.library)}, measuring loudness {player.analysis_progress()})", curses.A_BOLD)
+        elif player.sorted_by:
+            list_pane.put(0, 2, f"Songs ({len(player.library)}, by {player.sorted_by})", curses.A_BOLD)
+        else:
+            list_pane.put(0, 2, f"Songs ({len(player.library)})", curses.A_BOLD)
+        perf.mark("draw")
         
-        # Calculate which songs to display
+        # Calculate which songs to display, album headers take rows too
         if selected_index >= list_offset + max_list_display:
             list_offset = selected_index - max_list_display + 1
         elif selected_index < list_offset:
             list_offset = selected_index
+        rows = list_rows(player.library, view, list_offset, max_list_display)
+        while len(view) and selected_index not in rows:
+            list_offset += 1
+            rows = list_rows(player.library, view, list_offset, max_list_display)
+        player.load_titles([view[row] for row in rows if not isinstance(row, str)])
+        perf.mark("layout")
             
-        # Display songs
-        for i in range(min(max_list_display, len(player.songs) - list_offset)):
-            idx = i + list_offset
-            try:
-                song_name = mutagen.File(player.songs[idx], easy=True)
-                song_name = str(song_name["title"])[2:-2]
-            except KeyError:
-                song_name = os.path.basename(player.songs[idx])
-                song_name = song_name.strip(".mp3")
-                song_name = song_name[:45]
+        # Display songs, blanking rows past the end of the list
+        for i in range(max_list_display):
+            if i >= len(rows):
+                list_pane.put(i + 1, 2, "")
+                continue
+            if isinstance(rows[i], str):
+                list_pane.put(i + 1, 2, f"-- {rows[i]}"[:47], blue | curses.A_BOLD)
+                continue
+            idx = rows[i]
+            track_id = view[idx]
+            song_name = player.get_song_title(track_id)[:45]
             
             if command_mode == True:
                 # Highlight if current song or selected
-                if idx == player.current_song_index and idx == selected_index:
-                    list_win.addstr(i + 1, 2, f"> {song_name}", curses.color_pair(1) | curses.A_BOLD)
-                elif idx == player.current_song_index:
-                    list_win.addstr(i + 1, 2, f"* {song_name}", curses.color_pair(1))
+                if track_id == player.current_id and idx == selected_index:
+                    list_pane.put(i + 1, 2, f"> {song_name}", curses.color_pair(1) | curses.A_BOLD)
+                elif track_id == player.current_id:
+                    list_pane.put(i + 1, 2, f"* {song_name}", curses.color_pair(1))
                 elif idx == selected_index:
-                    list_win.addstr(i + 1, 2, f"> {song_name}", curses.A_BOLD)
+                    list_pane.put(i + 1, 2, f"> {song_name}", curses.A_BOLD)
                 else:
-                    list_win.addstr(i + 1, 2, f"  {song_name}")
+                    list_pane.put(i + 1, 2, f"  {song_name}")
             else:
-                list_win.addstr(i + 1, 2, f"  {song_name}")
+                list_pane.put(i + 1, 2, f"  {song_name}")
 
         mode_text = "NORMAL" if command_mode else "INSERT"
-        stdscr.addstr(height - 1, 0, f" {mode_text} ", curses.A_REVERSE)
+        screen.put(height - 1, 0, f" {mode_text} ", curses.A_REVERSE)
+        if playlist_prompt is not None:
+            known = f" [{', '.join(playlist_names)}]" if playlist_names else ""
+            screen.put(height - 1, 10, f"{playlist_prompt} playlist{known}: {playlist_name}"[:width - 11])
+        elif message:
+            screen.put(height - 1, 10, message[:width - 11])
+        elif duplicates_view:
+            screen.put(height - 1, 10, "duplicates, hidden from the list" if player.hiding_duplicates else "duplicates")
+        elif search_mode or results is not None:
+            screen.put(height - 1, 10, f"/{search_query}")
+        else:
+            screen.put(height - 1, 10, "")
 
         # Draw Queue
-        queue_win.clear()
-        queue_win.box()
-        queue_win.addstr(0, 2, f"Queue ({len(player.queue)})", curses.A_BOLD)
+        queue_pane.put(0, 2, f"Queue ({len(player.queue)})", curses.A_BOLD)
+        perf.mark("draw")
 
         # Calculate queue display
         if q_selected_index >= q_list_offset + q_max_list_display:
             q_list_offset = q_selected_index - q_max_list_display + 1
         elif q_selected_index < q_list_offset:
             q_list_offset = q_selected_index
+        player.load_titles(player.queue[q_list_offset:q_list_offset + q_max_list_display])
+        perf.mark("layout")
 
         # Display queue
-        for i in range(min(q_max_list_display, len(player.queue) - q_list_offset)):
+        for i in range(q_max_list_display):
             q_idx = i + q_list_offset
-            q_current_idx = player.queue[q_idx]
+            if q_idx >= len(player.queue):
+                queue_pane.put(i + 1, 2, "")
+                continue
+            q_current_id = player.queue[q_idx]
 
-            try:
-                song_name = mutagen.File(player.songs[q_current_idx], easy=True)
-                song_name = str(song_name["title"])[2:-2]
-            except KeyError:
-                song_name = os.path.basename(player.songs[q_current_idx])
-                song_name = song_name.strip(".mp3")
+            song_name = player.get_song_title(q_current_id)
 
             # Allow selection in edit mode
             if command_mode == False:
                 
                 # Highlight queue song if selected
-                if q_current_idx == player.current_song_index and q_idx == q_selected_index:
-                    queue_win.addstr(i + 1, 2, f"> {song_name}", curses.color_pair(1) | curses.A_BOLD)
-                elif q_current_idx == player.current_song_index:
-                    queue_win.addstr(i + 1, 2, f"* {song_name}", curses.color_pair(1))
+                if q_current_id == player.current_id and q_idx == q_selected_index:
+                    queue_pane.put(i + 1, 2, f"> {song_name}", curses.color_pair(1) | curses.A_BOLD)
+                elif q_current_id == player.current_id:
+                    queue_pane.put(i + 1, 2, f"* {song_name}", curses.color_pair(1))
                 elif q_idx == q_selected_index:
-                    queue_win.addstr(i + 1, 2, f"> {song_name}", curses.A_BOLD)
-                else: queue_win.addstr(i + 1, 2, f"{q_idx+1}. {song_name}")
+                    queue_pane.put(i + 1, 2, f"> {song_name}", curses.A_BOLD)
+                else: queue_pane.put(i + 1, 2, f"{q_idx+1}. {song_name}")
 
             else:
-                queue_win.addstr(i + 1, 2, f"{q_idx+1}. {song_name}")
+                queue_pane.put(i + 1, 2, f"{q_idx+1}. {song_name}")
 
-        # Refresh windows
-        stdscr.noutrefresh()
-        record_win.noutrefresh()
-        info_win.noutrefresh()
-        list_win.noutrefresh()
-        queue_win.noutrefresh()
+        if perf.hud:
+            hud_pane.put(0, 2, "Perf (F12)", curses.A_BOLD)
+            for i, line in enumerate(perf.hud_lines()[:13]):
+                hud_pane.put(i + 1, 2, line.ljust(hud_width - 4))
+            # Keep the overlay on top of panes refreshed underneath it
+            hud_pane.touch()
+        perf.mark("draw")
 
-        curses.doupdate()
+        # Refresh only the windows that changed
+        renderer.flush()
+        perf.mark("flush")
+        perf.end()
+        if first_frame:
+            first_frame = False
+            trace.mark("first full frame")
+        if not songs_listed and len(player.library):
+            songs_listed = True
+            trace.mark("songs listed")
         
+        # Only run the animation and progress timers while a song plays
+        if player.is_playing:
+            scheduler.set_timer("animation", 1 / FPS if visualizer else 0.2)
+            scheduler.set_timer("progress", 0.5)
+            scheduler.set_deadline("track_end", max(player.time_remaining(), 0.05))
+        else:
+            scheduler.cancel("animation", "progress", "track_end")
+
         # Handle input
-        stdscr.timeout(200)  # Timeout for animation
         try:
             key = stdscr.getch()
         except:
             continue
             
         if key == -1:
-            continue  # Timeout, just update the screen
-            
-        if command_mode:
+            # Nothing typed, sleep until a key, timer or background update
+            input_ready, due = scheduler.wait()
+            if "animation" in due:
+                record.next_frame(player.is_playing)
+            continue
+
+        perf.key_pressed()
+        cursor_restored = True
+        message = ""
+        if key == curses.KEY_F12:
+            # Performance overlay
+            if perf.toggle_hud():
+                hud_pane.invalidate()
+                renderer.panes.append(hud_pane)
+            else:
+                renderer.panes.remove(hud_pane)
+                renderer.touch()
+        elif key == curses.KEY_F11:
+            # Profile the next frames to a pstats file
+            perf.start_profile()
+        elif playlist_prompt is not None:
+            if key == 27:  # ESC key
+                playlist_prompt = None
+            elif key == ord('\n'):
+                try:
+                    if playlist_prompt == "load":
+                        missing = player.load_playlist(playlist_name)
+                        message = f"Loaded {playlist_name}" + (f", {missing} tracks missing" if missing else "")
+                    else:
+                        player.save_playlist(playlist_name)
+                        message = f"Saved the queue as {playlist_name}"
+                except ValueError as e:
+                    message = str(e)
+                playlist_prompt = None
+            elif key in (curses.KEY_BACKSPACE, 127, 8):
+                playlist_name = playlist_name[:-1]
+            elif 32 <= key < 127:
+                playlist_name += chr(key)
+        elif search_mode:
+            if key == 27:  # ESC key
+                search_mode = False
+                search_query = ""
+                results = None
+                selected_index = player.current_position or 0
+            elif key == ord('\n'):
+                search_mode = False
+            elif key in (curses.KEY_BACKSPACE, 127, 8):
+                search_query = search_query[:-1]
+                results = player.search.search(search_query)
+                selected_index = 0
+            elif 32 <= key < 127:
+                search_query += chr(key)
+                results = player.search.search(search_query)
+                selected_index = 0
+        elif jump_mode:
+            jump_mode = False
+            if ord('0') <= key <= ord('9'):
+                player.seek_percent((key - ord('0')) * 10)
+        elif key in seek_keys:
+            player.seek_by(seek_keys[key])
+        elif key == ord("'"):
+            jump_mode = True
+        elif command_mode:
             if key == ord('q'):
                 running = False
             elif key == ord('j'):
-                selected_index = min(selected_index + 1, len(player.songs) - 1)
+                selected_index = min(selected_index + 1, len(view) - 1)
             elif key == ord('k'):
                 selected_index = max(selected_index - 1, 0)
             elif key == ord('g'):
                 selected_index = 0
             elif key == ord('G'):
-                selected_index = len(player.songs) - 1
-            elif key == ord('\n') or key == ord(' '):
-                player.current_song_index = selected_index
-                player.play()
+                selected_index = len(view) - 1
+            elif (key == ord('\n') or key == ord(' ')) and len(view):
+                player.play_track(view[selected_index])
             elif key == ord('p'):
                 player.pause()
             elif key == ord('s'):
@@ -256,27 +707,65 @@ def main(stdscr):
                 player.shuffle()
             elif key == ord('l'):
                 player.volume_up()
-                current_volume = player.current_volume
             elif key == ord('h'):
                 player.volume_down()
-                current_volume = player.current_volume
             elif key == ord('n'):
                 player.next_song()
-                selected_index = player.current_song_index
+                selected_index = view_position(player, view, selected_index)
             elif key == ord('b'):
                 player.prev_song()
-                selected_index = player.current_song_index
+                selected_index = view_position(player, view, selected_index)
             elif key == ord('1'):
                 player.sort()
+                if results is not None and not duplicates_view:
+                    player.search.reset()
+                    results = player.search.search(search_query)
             elif key == ord('a'):
-                player.addsong(selected_index)
+                if len(view):
+                    player.addsong(view[selected_index])
             elif key == ord('c'):
-                player.queue.clear()
+                player.clear_queue()
+            elif key == ord('v'):
+                # Swap the record for the level meter and spectrum
+                visualizer = not visualizer
+                record_pane.invalidate()
+            elif key == ord('I'):
+                # Read all tags up front in a process pool
+                player.index_tags(workers)
             elif key == ord('i'):
                 command_mode = False
+            elif key == ord('/'):
+                # Filter the song list as you type
+                search_mode = True
+                duplicates_view = False
+                results = None
+                player.search.build()
+            elif key == ord('D'):
+                # List the copies of each song, looking for them if nobody has
+                if player.duplicate_count is None and not player.duplicate_progress():
+                    player.find_duplicates()
+                duplicates_view = True
+                search_query = ""
+                results = duplicate_list(player)
+                selected_index = 0
+            elif key == ord('d'):
+                # Hide all but one copy of each duplicate from the list and shuffle
+                player.hide_duplicates()
+            elif key in (ord('P'), ord('W')):
+                # Replace the queue with a playlist, or save the queue as one
+                playlist_prompt = "load" if key == ord('P') else "save"
+                playlist_name = ""
+                playlist_names = player.playlists()
+            elif key == 27 and results is not None:
+                # Drop the filter, keeping the cursor on the same song
+                track_id = view[selected_index] if len(view) else player.current_id
+                search_query = ""
+                results = None
+                duplicates_view = False
+                selected_index = player.library.position(track_id) or 0
             elif key == ord('?'):
                 # Display help
-                help_win = curses.newwin(20, 50, height // 2 - 8, width // 2 - 25)
+                help_win = curses.newwin(33, 50, height // 2 - 9, width // 2 - 25)
                 help_win.clear()
                 help_win.box()
                 help_win.addstr(0, 20, "HELP", curses.A_BOLD)
@@ -288,23 +777,40 @@ def main(stdscr):
                     "p           - Pause/Resume",
                     "s           - Stop playback",
                     "n           - Next song",
-                    "b           - Previous song",
-                    "shift + s   - Shuffle song list",
-                    "1           - Sort song list",
+                    "b           - Back through what played",
+                    "Left/Right  - Seek 5 seconds (also , and .)",
+                    "< / >       - Seek 30 seconds",
+                    "' then 0-9  - Jump to 0%-90% of the song",
+                    "shift + s   - Shuffle on/off",
+                    "1           - Next sort: path, artist, album",
+                    "              artist, duration, date added",
+                    "/           - Search, Esc clears",
+                    "shift + d   - List duplicates, Esc clears",
+                    "d           - Hide/show extra copies",
                     "c           - Clear queue",
+                    "shift + p   - Load a playlist into the queue",
+                    "shift + w   - Save the queue as a playlist",
+                    "shift + i   - Read all tags now",
+                    "v           - Toggle the spectrum visualizer",
                     "i           - Enter queue edit mode",
                     " While in edit mode ",
                     "r           - Remove selected song from queue",
                     "q           - Quit program",
-                    "?           - Show this help"
+                    "?           - Show this help",
+                    "F12         - Performance overlay",
+                    "F11         - Profile the next frames",
                 ]
                 
                 for i, line in enumerate(help_lines):
                     help_win.addstr(i + 2, 2, line)
                     
-                help_win.addstr(17, 2, "Press any key to close")
+                help_win.addstr(31, 2, "Press any key to close")
                 help_win.refresh()
                 help_win.getch()
+
+                # Repaint whatever the help window covered
+                del help_win
+                renderer.touch()
         else:  # queue edit mode
             if key == 27:  # ESC key
                 command_mode = True
@@ -314,24 +820,85 @@ def main(stdscr):
                 q_selected_index = min(q_selected_index + 1, len(player.queue) - 1)
             elif key == ord('k'):
                 q_selected_index = max(q_selected_index - 1, 0)
-            elif key == ord('\n') or key == ord(' '):
-                player.current_song_index = player.queue[q_selected_index]
-                player.play()
+            elif (key == ord('\n') or key == ord(' ')) and player.queue:
+                player.play_track(player.queue[q_selected_index])
             elif key == ord('r'):
-                player.queue.pop(q_selected_index)
+                player.remove_from_queue(q_selected_index)
             elif key == ord('c'):
-                player.queue.clear()
+                player.clear_queue()
+
+    # Counters only for someone who asked for timings
+    report = [player.cache.stats(), renderer.stats(), perf.stats()] if perf.watched else []
+    if startup_trace:
+        report.append(trace.report("UI startup"))
+        report.append(player.startup_report())
+
+    # The next player to start puts the cursor back here
+    if len(view):
+        try:
+            player.remember_cursor(view[selected_index])
+        except (OSError, ValueError):
+            pass
+
+    # Leave the music playing for other clients, unless this UI started it alone
+    player.close(quit=spawned and player.clients == 1)
+    perf.close()
+    scheduler.close()
+    return "\n".join(line for line in report if line)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Terminal MP3 player")
+    parser.add_argument("--index-only", action="store_true",
+                        help="read the tags of every track into the cache and exit")
+    parser.add_argument("--analyze", action="store_true",
+                        help="measure the loudness of every new or changed track and exit")
+    parser.add_argument("--find-duplicates", action="store_true",
+                        help="list tracks with the same audio under different paths and exit")
+    parser.add_argument("--daemon", action="store_true",
+                        help="play headless, controlled over the socket")
+    parser.add_argument("--startup-trace", action="store_true",
+                        help="print how long each phase of startup took, on exit for the UI")
+    parser.add_argument("--workers", type=int,
+                        help="processes used to read tags, measure loudness or hash audio "
+                             "(default: one per CPU)")
+    commands = parser.add_subparsers(dest="command")
+    ctl = commands.add_parser("ctl", help="send a command to the running player")
+    ctl.add_argument("action", choices=list(CONTROLS))
+    ctl.add_argument("value", nargs="?",
+                     help="for seek: +5, -30, 50%% or 90 (seconds in), for sort: "
+                          + ", ".join(SORT_ORDERS) + " (default: the next one), "
+                          "for save, load, delete and export: a playlist name, "
+                          "for import: an M3U file")
+    ctl.add_argument("extra", nargs="?",
+                     help="for export: the M3U file to write, for import: the playlist name "
+                          "(default: the file's name)")
+    args = parser.parse_args()
+    if args.command == "ctl":
+        sys.exit(control(args.action, args.value, args.extra))
+    if args.index_only:
+        index_only(args.workers)
+        sys.exit()
+    if args.analyze:
+        analyze_only(args.workers)
+        sys.exit()
+    if args.find_duplicates:
+        find_duplicates_only(args.workers)
+        sys.exit()
+    if args.daemon:
+        run_daemon(args.workers, args.startup_trace)
+        sys.exit()
+
+    trace = StartupTrace(STARTED)
+    trace.mark("imports")
     try:
-        curses.wrapper(main)
+        print(curses.wrapper(main, args.workers, trace, args.startup_trace))
     except KeyboardInterrupt:
         pass
+    except (ConnectionError, RuntimeError) as e:
+        print(f"\n{e}\n")
     # Display info for window size error
     except curses.error as e:
         print("\nTerminal is too small\n")
         print("Try launching again in a larger window size\n")
     finally:
-        # Clean up pygame
-        pygame.mixer.quit()
         print("Pytermusic closed.")